@@ -0,0 +1,11 @@
+"""
+ASGI entry point, for serving the async payment endpoints natively:
+
+    uvicorn alx_travel_app.asgi:application --workers 4
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'alx_travel_app.settings')
+
+application = get_asgi_application()
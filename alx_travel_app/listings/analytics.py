@@ -0,0 +1,231 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import AggregateWatermark, Booking, Listing, ListingDailyStats, Payment, StaleListingStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'listing_daily_stats'
+# Bookings that occupy their nights; pending ones only hold the dates
+OCCUPIED_STATUSES = ('confirmed', 'completed')
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def compute_listing_stats(listing_ids):
+    """
+    Daily stats for ``listing_ids`` straight from the raw tables.
+
+    A night is occupied when a confirmed or completed booking covers it.
+    Each booking's successful payments are spread evenly over its nights,
+    to the cent, so daily revenue sums back to the amounts paid.
+    """
+    paid = dict(
+        Payment.objects.filter(booking__listing_id__in=listing_ids, status='success')
+        .values('booking_id').annotate(total=Sum('amount')).values_list('booking_id', 'total')
+    )
+    bookings = (
+        Booking.objects.filter(listing_id__in=listing_ids)
+        .filter(Q(status__in=OCCUPIED_STATUSES) | Q(id__in=list(paid)))
+        .values_list('id', 'listing_id', 'check_in', 'check_out', 'status')
+    )
+
+    stats = defaultdict(lambda: [0, 0])
+    for booking_id, listing_id, check_in, check_out, status in bookings:
+        nights = (check_out - check_in).days
+        if nights <= 0:
+            continue
+        occupied = status in OCCUPIED_STATUSES
+        cents = int(paid.get(booking_id, 0) * 100)
+        share, remainder = divmod(cents, nights)
+        for night in range(nights):
+            day = stats[(listing_id, check_in + timedelta(days=night))]
+            day[0] += occupied
+            day[1] += share + (night < remainder)
+
+    return [
+        ListingDailyStats(
+            listing_id=listing_id, date=date, occupied_nights=nights, revenue=Decimal(cents).scaleb(-2)
+        )
+        for (listing_id, date), (nights, cents) in stats.items()
+    ]
+
+
+def rebuild_listings(listing_ids):
+    """Replace the stored stats of ``listing_ids``; call inside a transaction"""
+    rows = compute_listing_stats(listing_ids)
+    ListingDailyStats.objects.filter(listing_id__in=listing_ids).delete()
+    ListingDailyStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def mark_stale(listing_ids):
+    """Queue listings for the next refresh; commits or rolls back with the caller's write"""
+    now = timezone.now()
+    StaleListingStats.objects.bulk_create(
+        [StaleListingStats(listing_id=listing_id, marked_at=now) for listing_id in set(listing_ids) if listing_id],
+        update_conflicts=True, unique_fields=['listing_id'], update_fields=['marked_at'],
+    )
+
+
+def booking_deleted(sender, instance, **kwargs):
+    """post_delete handler for Booking"""
+    mark_stale([instance.listing_id])
+
+
+def payment_deleted(sender, instance, **kwargs):
+    """post_delete handler for Payment; a cascade from its booking is marked by the booking"""
+    mark_stale(Booking.objects.filter(pk=instance.booking_id).values_list('listing_id', flat=True))
+
+
+def changed_listings(since):
+    """Listings with a booking or payment written after ``since``, or one deleted"""
+    listing_ids = set(Booking.objects.filter(updated_at__gt=since).values_list('listing_id', flat=True))
+    listing_ids.update(
+        Payment.objects.filter(updated_at__gt=since).values_list('booking__listing_id', flat=True)
+    )
+    listing_ids.update(StaleListingStats.objects.values_list('listing_id', flat=True))
+    # A deleted listing's stats went with it
+    return sorted(Listing.objects.filter(pk__in=listing_ids).values_list('pk', flat=True), key=str)
+
+
+def _locked_watermark():
+    watermark, _ = AggregateWatermark.objects.get_or_create(
+        name=WATERMARK, defaults={'updated_through': datetime(1970, 1, 1, tzinfo=dt_timezone.utc)}
+    )
+    return AggregateWatermark.objects.select_for_update().get(pk=watermark.pk)
+
+
+def refresh_aggregates():
+    """
+    Bring the daily stats up to date with writes since the last watermark.
+
+    Every listing touched since then is recomputed whole, so moved dates
+    and status changes are picked up, as is every listing marked stale by a
+    deleted booking or payment. The window starts AGGREGATE_REFRESH_LAG
+    seconds before the watermark to catch transactions that committed after
+    the previous run but carry earlier timestamps; stale marks are kept for
+    the same lag before they are cleared.
+    """
+    started = timezone.now()
+    lag = timedelta(seconds=getattr(settings, 'AGGREGATE_REFRESH_LAG', 300))
+    batch_size = getattr(settings, 'AGGREGATE_BATCH_SIZE', 200)
+
+    # The row lock keeps two refreshes from rebuilding the same listings at once
+    with transaction.atomic():
+        watermark = _locked_watermark()
+        listing_ids = changed_listings(watermark.updated_through - lag)
+        rows = 0
+        for chunk in _chunks(listing_ids, batch_size):
+            rows += rebuild_listings(chunk)
+        StaleListingStats.objects.filter(marked_at__lt=started - lag).delete()
+        watermark.updated_through = started
+        watermark.save()
+
+    logger.info(f"Refreshed daily stats for {len(listing_ids)} listings ({rows} rows)")
+    return {'listings': len(listing_ids), 'rows': rows, 'updated_through': started.isoformat()}
+
+
+def rebuild_aggregates():
+    """Recompute every listing's daily stats from scratch and reset the watermark"""
+    started = timezone.now()
+    batch_size = getattr(settings, 'AGGREGATE_BATCH_SIZE', 200)
+    with transaction.atomic():
+        watermark = _locked_watermark()
+        ListingDailyStats.objects.all().delete()
+        StaleListingStats.objects.filter(marked_at__lt=started).delete()
+        listing_ids = list(Listing.objects.order_by('pk').values_list('pk', flat=True))
+        rows = 0
+        for chunk in _chunks(listing_ids, batch_size):
+            rows += rebuild_listings(chunk)
+        watermark.updated_through = started
+        watermark.save()
+    return {'listings': len(listing_ids), 'rows': rows, 'updated_through': started.isoformat()}
+
+
+def verify_aggregates():
+    """
+    Compare per-listing totals in the aggregates with the raw tables.
+
+    Returns a list of human readable mismatches; empty means they agree.
+    """
+    raw_nights = defaultdict(int)
+    bookings = Booking.objects.filter(status__in=OCCUPIED_STATUSES).values_list('listing_id', 'check_in', 'check_out')
+    for listing_id, check_in, check_out in bookings.iterator(chunk_size=2000):
+        raw_nights[listing_id] += max((check_out - check_in).days, 0)
+    raw_revenue = dict(
+        Payment.objects.filter(status='success')
+        .values('booking__listing_id').annotate(total=Sum('amount'))
+        .values_list('booking__listing_id', 'total')
+    )
+    stored = {
+        listing_id: (nights, revenue)
+        for listing_id, nights, revenue in ListingDailyStats.objects.values('listing_id')
+        .annotate(nights=Sum('occupied_nights'), total=Sum('revenue'))
+        .values_list('listing_id', 'nights', 'total')
+    }
+
+    # Sums come back as floats on some backends (sqlite); compare whole cents
+    cent = Decimal('0.01')
+    mismatches = []
+    for listing_id in set(raw_nights) | set(raw_revenue) | set(stored):
+        nights, revenue = stored.get(listing_id, (0, None))
+        revenue = Decimal(revenue or 0).quantize(cent)
+        expected_nights = raw_nights.get(listing_id, 0)
+        expected_revenue = Decimal(raw_revenue.get(listing_id) or 0).quantize(cent)
+        if nights != expected_nights:
+            mismatches.append(f'{listing_id}: {nights} occupied nights stored, {expected_nights} booked')
+        if revenue != expected_revenue:
+            mismatches.append(f'{listing_id}: revenue {revenue} stored, {expected_revenue} paid')
+    return sorted(mismatches)
+
+
+def listing_daily_series(listing_id, start, end):
+    """One entry per night from start to end inclusive, zeros where nothing happened"""
+    stored = {
+        row['date']: row
+        for row in ListingDailyStats.objects.filter(listing_id=listing_id, date__range=(start, end))
+        .values('date', 'occupied_nights', 'revenue')
+    }
+    series = []
+    day = start
+    while day <= end:
+        row = stored.get(day)
+        series.append({
+            'date': day,
+            'occupied': bool(row and row['occupied_nights']),
+            'revenue': str(row['revenue'] if row else Decimal('0.00')),
+        })
+        day += timedelta(days=1)
+    return series
+
+
+def listing_totals(listing_ids, start, end):
+    """Occupied nights, occupancy rate and revenue per listing over the range"""
+    days = (end - start).days + 1
+    totals = {
+        listing_id: (nights, revenue)
+        for listing_id, nights, revenue in ListingDailyStats.objects
+        .filter(listing_id__in=listing_ids, date__range=(start, end))
+        .values('listing_id').annotate(nights=Sum('occupied_nights'), total=Sum('revenue'))
+        .values_list('listing_id', 'nights', 'total')
+    }
+    results = []
+    for listing_id in listing_ids:
+        nights, revenue = totals.get(listing_id, (0, Decimal('0.00')))
+        results.append({
+            'listing_id': str(listing_id),
+            'occupied_nights': nights,
+            'occupancy_rate': round(nights / days, 4),
+            'revenue': str(Decimal(revenue).quantize(Decimal('0.01'))),
+        })
+    return results
@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+class ListingsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'listings'
+
+    def ready(self):
+        from .availability import ensure_period_index
+        post_migrate.connect(ensure_period_index, sender=self)
+
+        from .caching import invalidate_listings
+        Listing = self.get_model('Listing')
+        post_save.connect(invalidate_listings, sender=Listing, dispatch_uid='listings.invalidate_on_save')
+        post_delete.connect(invalidate_listings, sender=Listing, dispatch_uid='listings.invalidate_on_delete')
+
+        from .analytics import booking_deleted, payment_deleted
+        post_delete.connect(booking_deleted, sender=self.get_model('Booking'), dispatch_uid='listings.stats_booking_deleted')
+        post_delete.connect(payment_deleted, sender=self.get_model('Payment'), dispatch_uid='listings.stats_payment_deleted')
+
+        from .authentication import revoke_cached_token
+        post_delete.connect(revoke_cached_token, sender=self.get_model('ApiToken'), dispatch_uid='listings.revoke_token')
+
+        # Connects the Celery signal handlers for task latency metrics and
+        # for reading the primary inside tasks
+        from . import db_router, task_metrics  # noqa: F401
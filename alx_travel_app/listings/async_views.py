@@ -0,0 +1,303 @@
+"""
+Async payment endpoints for ASGI deployments.
+
+Same flows as PaymentViewSet's initiate, verify and webhook actions, written
+as native async views: Chapa is called through the pooled httpx client and
+the database through Django's async ORM, so a request waiting on the
+gateway holds no thread. DRF views are sync-only, hence plain Django views;
+authentication still runs DRF's configured authenticators.
+"""
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .gateway import get_async_client
+from .idempotency import aidempotent_response, areusable_payment
+from .models import Booking, Payment, WebhookEvent
+from .resilience import GatewayUnavailable
+from .serializers import BookingSerializer, PaymentInitiateSerializer, PaymentSerializer
+from .tasks import process_webhook_event
+from .transitions import refresh_settled
+import httpx
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    response = JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+    # Kept for idempotent replays, like Response.data
+    response.data = data
+    return response
+
+
+def gateway_unavailable_response(exc):
+    response = json_response({
+        'success': False,
+        'message': 'Payment gateway temporarily unavailable',
+        'error': str(exc),
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def _authenticate(request):
+    """The user DRF's authenticators find for ``request``; raises APIException on bad credentials"""
+    authenticators = [authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    return Request(request, authenticators=authenticators).user
+
+
+def _parse_body(request):
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST.dict()
+
+
+def async_endpoint(methods, authenticated=True):
+    """
+    Wrap an async view with what APIView would do: method check, DRF
+    authentication (with its CSRF rules for sessions), body parsing into
+    ``request.data`` and a JSON 500 for unexpected errors.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response({'detail': f'Method "{request.method}" not allowed.'},
+                                     status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            try:
+                if authenticated:
+                    request.user = await sync_to_async(_authenticate)(request)
+                    if not request.user.is_authenticated:
+                        return json_response({'detail': 'Authentication credentials were not provided.'},
+                                             status=status.HTTP_403_FORBIDDEN)
+                request.data = _parse_body(request)
+            except APIException as e:
+                return json_response({'detail': e.detail}, status=e.status_code)
+            except ValueError:
+                return json_response({'detail': 'Malformed request body.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                return await view(request, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"{view.__name__} error: {str(e)}")
+                return json_response({
+                    'success': False,
+                    'message': 'Internal server error',
+                    'error': str(e),
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        # Like APIView: session requests are CSRF-checked by SessionAuthentication
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+@async_endpoint(['POST'])
+async def initiate_payment(request):
+    """Async twin of PaymentViewSet.initiate_payment"""
+    return await aidempotent_response(
+        request, 'payments-initiate', lambda: _initiate_payment(request), json_response
+    )
+
+
+async def _initiate_payment(request):
+    serializer = PaymentInitiateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        booking = await Booking.objects.aget(id=serializer.validated_data['booking_id'], user=request.user)
+    except Booking.DoesNotExist:
+        return json_response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    payment = await areusable_payment(booking)
+    if payment is not None:
+        return json_response({
+            'success': True,
+            'message': 'Payment already initiated',
+            'payment_id': str(payment.id),
+            'tx_ref': payment.tx_ref,
+            'checkout_url': payment.checkout_url,
+            'amount': payment.amount,
+            'currency': payment.currency,
+            'reused': True,
+        })
+
+    client = get_async_client()
+    try:
+        client.ensure_available()
+    except GatewayUnavailable as e:
+        return gateway_unavailable_response(e)
+
+    payment = await Payment.objects.acreate(
+        booking=booking,
+        user=request.user,
+        amount=booking.total_price,
+        currency='ETB',
+        customer_email=request.user.email,
+        customer_first_name=request.user.first_name or 'Customer',
+        customer_last_name=request.user.last_name or 'User',
+        customer_phone=serializer.validated_data.get('phone_number'),
+        description=f"Payment for booking #{booking.id}",
+        metadata={
+            'booking_id': str(booking.id),
+            'user_id': str(request.user.id),
+        }
+    )
+    payload = {
+        'amount': str(payment.amount),
+        'currency': payment.currency,
+        'email': payment.customer_email,
+        'first_name': payment.customer_first_name,
+        'last_name': payment.customer_last_name,
+        'tx_ref': payment.tx_ref,
+        'callback_url': f"{settings.CHAPA_WEBHOOK_URL}?tx_ref={payment.tx_ref}",
+        'return_url': serializer.validated_data.get('return_url', ''),
+        'customization': {
+            'title': 'Travel Booking Payment',
+            'description': payment.description,
+        }
+    }
+    if payment.customer_phone:
+        payload['phone_number'] = payment.customer_phone
+
+    try:
+        response = await client.initialize(payload)
+        response_data = response.json()
+    except (GatewayUnavailable, httpx.HTTPError, ValueError) as e:
+        logger.error(f"Chapa API request failed: {str(e)}")
+        payment.status = 'failed'
+        payment.error_message = str(e)
+        await payment.asave()
+        if isinstance(e, GatewayUnavailable):
+            return gateway_unavailable_response(e)
+        return json_response({
+            'success': False,
+            'message': 'Failed to connect to payment gateway',
+            'error': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if response.status_code == 200 and response_data.get('status') == 'success':
+        payment.checkout_url = response_data['data']['checkout_url']
+        payment.chapa_transaction_id = response_data['data'].get('transaction_id')
+        await payment.asave()
+        return json_response({
+            'success': True,
+            'message': 'Payment initiated successfully',
+            'payment_id': str(payment.id),
+            'tx_ref': payment.tx_ref,
+            'checkout_url': payment.checkout_url,
+            'amount': payment.amount,
+            'currency': payment.currency,
+        })
+
+    error_msg = response_data.get('message', 'Payment initiation failed')
+    payment.status = 'failed'
+    payment.error_message = error_msg
+    await payment.asave()
+    return json_response({
+        'success': False,
+        'message': error_msg,
+        'details': response_data
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _verified(payment, transaction_data):
+    # Transitions and nested serializers are sync ORM work; one thread hop for all of it
+    if transaction_data['status'] == 'success':
+        settled = payment.mark_as_paid(transaction_id=transaction_data.get('id'), payment_date=timezone.now())
+    elif transaction_data['status'] == 'failed':
+        settled = payment.mark_as_failed('Payment failed at gateway')
+    else:
+        settled = True
+    if not settled:
+        # A webhook or task settled it first; report what it recorded
+        refresh_settled(payment)
+
+    if payment.status == 'success':
+        return {
+            'success': True,
+            'message': 'Payment verified successfully',
+            'status': 'success',
+            'payment': PaymentSerializer(payment).data,
+            'booking': BookingSerializer(payment.booking).data
+        }
+    if payment.status == 'failed':
+        return {
+            'success': False,
+            'message': 'Payment failed',
+            'status': 'failed',
+            'payment': PaymentSerializer(payment).data
+        }
+    return {
+        'success': False,
+        'message': 'Payment is still pending',
+        'status': transaction_data['status'],
+        'payment': PaymentSerializer(payment).data
+    }
+
+
+@async_endpoint(['GET'])
+async def verify_payment(request, tx_ref):
+    """Async twin of PaymentViewSet.verify_payment"""
+    try:
+        payment = await Payment.objects.select_related('booking__listing').aget(user=request.user, tx_ref=tx_ref)
+    except Payment.DoesNotExist:
+        return json_response({'success': False, 'message': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        response = await get_async_client().verify(tx_ref)
+        response_data = response.json()
+    except (GatewayUnavailable, httpx.HTTPError, ValueError) as e:
+        logger.error(f"Chapa verification failed: {str(e)}")
+        if isinstance(e, GatewayUnavailable):
+            return gateway_unavailable_response(e)
+        return json_response({
+            'success': False,
+            'message': 'Failed to connect to payment gateway',
+            'error': str(e)
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    if response.status_code == 200 and response_data.get('status') == 'success':
+        return json_response(await sync_to_async(_verified)(payment, response_data['data']))
+
+    return json_response({
+        'success': False,
+        'message': response_data.get('message', 'Verification failed'),
+        'details': response_data
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@async_endpoint(['POST'], authenticated=False)
+async def payment_webhook(request):
+    """Async twin of PaymentViewSet.payment_webhook"""
+    event_data = request.data
+    if not isinstance(event_data, dict):
+        return json_response({'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    tx_ref = event_data.get('tx_ref')
+    if not tx_ref:
+        return json_response({'error': 'Missing tx_ref'}, status=status.HTTP_400_BAD_REQUEST)
+
+    event = WebhookEvent(
+        tx_ref=tx_ref,
+        event_id=WebhookEvent.event_id_from(event_data),
+        status=str(event_data.get('status') or '')[:20],
+        payload=event_data,
+    )
+    try:
+        # Autocommit: the row is committed once asave returns
+        await event.asave(force_insert=True)
+    except IntegrityError:
+        return json_response({'success': True, 'duplicate': True})
+
+    await sync_to_async(process_webhook_event.delay)(str(event.id))
+    return json_response({'success': True})
@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from .metrics import REGISTRY
+from .models import ApiToken
+import hmac
+
+TOKEN_AUTH_LOOKUPS = REGISTRY.counter(
+    'api_token_auth_total', 'API token authentications by credential cache outcome', ['result'])
+
+# User columns kept in the credential cache; never the password hash
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_key(key_hash):
+    return f'auth:token:v2:{key_hash}'
+
+
+def cached_user_fields():
+    """CACHED_USER_FIELDS the user model has, in column order"""
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+
+
+def build_user(values):
+    """
+    A user instance from its cached columns. Every other field is deferred,
+    so it is loaded on first access and never overwritten by save().
+    """
+    User = get_user_model()
+    fields = cached_user_fields()
+    return User.from_db(User.objects.db, fields, [values[field] for field in fields])
+
+
+def forget_token(key_hash):
+    """Drop a token from the credential cache, e.g. once it is revoked"""
+    get_cache().delete(cache_key(key_hash))
+
+
+def revoke_cached_token(sender, instance, **kwargs):
+    """post_delete handler: a deleted token stops working at once, not when its entry expires"""
+    forget_token(instance.key_hash)
+
+
+class CachedTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Token <key>`` against ApiToken, with the result cached.
+
+    The key is hashed once with SHA-256 and looked up by that hash, so no
+    comparison ever touches the secret. The token and its user are then
+    cached for AUTH_TOKEN_CACHE_TIMEOUT seconds, so most requests cost one
+    cache read and no SQL; only the user's non-sensitive columns are cached
+    (CACHED_USER_FIELDS). Revoking a token clears its entry; deactivating a
+    user takes effect once the entry expires.
+    """
+    keyword = 'Token'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+
+        key_hash = ApiToken.hash_key(key)
+        cache = get_cache()
+        entry = cache.get(cache_key(key_hash))
+        if entry is None:
+            TOKEN_AUTH_LOOKUPS.inc(result='miss')
+            entry = self.load(key_hash)
+            cache.set(cache_key(key_hash), entry, timeout=getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+        else:
+            TOKEN_AUTH_LOOKUPS.inc(result='hit')
+
+        # Cache backends compare keys however they like; check the hash in constant time
+        if not entry or not hmac.compare_digest(entry['key_hash'], key_hash):
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if entry['expires_at'] is not None and entry['expires_at'] <= timezone.now():
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        if not entry['user']['is_active']:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        return build_user(entry['user']), entry['token_id']
+
+    def load(self, key_hash):
+        """The cache entry for ``key_hash``; an empty dict (cached too) for unknown keys"""
+        fields = cached_user_fields()
+        token = ApiToken.objects.filter(key_hash=key_hash).values(
+            'pk', 'key_hash', 'expires_at', *(f'user__{field}' for field in fields)
+        ).first()
+        if token is None:
+            return {}
+        ApiToken.objects.filter(pk=token['pk']).update(last_used_at=timezone.now())
+        return {
+            'key_hash': token['key_hash'],
+            'token_id': token['pk'],
+            'expires_at': token['expires_at'],
+            'user': {field: token[f'user__{field}'] for field in fields},
+        }
+
+    def authenticate_header(self, request):
+        return self.keyword
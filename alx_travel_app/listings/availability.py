@@ -0,0 +1,74 @@
+from django.db import connection
+from django.db.models import Exists, OuterRef, Func, Value
+from .models import Booking, Listing
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Expression GiST index used for overlap probes on PostgreSQL. The half-open
+# '[)' bound matches the booking semantics: check_out day is free again.
+PG_PERIOD_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS booking_period_gist_idx
+    ON listings_booking USING gist (daterange(check_in, check_out, '[)'))
+    WHERE status IN ('pending', 'confirmed')
+"""
+
+
+class DateRange(Func):
+    """SQL daterange(lower, upper, '[)') constructor (PostgreSQL only)"""
+    function = 'daterange'
+
+    def __init__(self, lower, upper, **extra):
+        from django.contrib.postgres.fields import DateRangeField
+        super().__init__(lower, upper, Value('[)'), output_field=DateRangeField(), **extra)
+
+
+def ensure_period_index(sender=None, using='default', **kwargs):
+    """post_migrate hook creating the GiST range index where it is supported"""
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor != 'postgresql':
+        return
+
+    with conn.cursor() as cursor:
+        cursor.execute(PG_PERIOD_INDEX_SQL)
+    logger.info("Ensured booking period GiST index")
+
+
+def overlapping_bookings(check_in, check_out):
+    """Blocking bookings whose [check_in, check_out) overlaps the given stay"""
+    bookings = Booking.objects.filter(status__in=Booking.BLOCKING_STATUSES)
+
+    if connection.vendor == 'postgresql':
+        # Matches the expression of booking_period_gist_idx so the planner can use it
+        return bookings.alias(
+            period=DateRange('check_in', 'check_out')
+        ).filter(
+            period__overlap=DateRange(Value(check_in), Value(check_out))
+        )
+
+    # Sorted-interval probe on booking_listing_period_idx: bookings are ordered
+    # by check_out per listing, so only intervals ending after check_in are read
+    return bookings.filter(check_out__gt=check_in, check_in__lt=check_out)
+
+
+def available_listings(check_in, check_out, guests=1, city=None, queryset=None):
+    """Listings free for the whole stay, as a single anti-join query"""
+    if queryset is None:
+        queryset = Listing.objects.all()
+
+    queryset = queryset.filter(max_guests__gte=guests)
+    if city:
+        queryset = queryset.filter(city=city)
+
+    conflicts = overlapping_bookings(check_in, check_out).filter(listing=OuterRef('pk'))
+    return queryset.filter(~Exists(conflicts))
+
+
+def is_available(listing, check_in, check_out, exclude_booking=None):
+    """Check a single listing for the given stay"""
+    conflicts = overlapping_bookings(check_in, check_out).filter(listing=listing)
+    if exclude_booking is not None:
+        conflicts = conflicts.exclude(pk=exclude_booking.pk)
+    return not conflicts.exists()
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import json
+import math
+import platform
+import time
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back(using='default'):
+    """Run the block in a transaction that is always rolled back"""
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, elapsed, queries=None, errors=0):
+    """Latency percentiles (ms), throughput and queries per request for one run"""
+    count = len(latencies)
+    summary = {
+        'requests': count,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+        'requests_per_second': round(count / elapsed, 2) if elapsed else 0.0,
+    }
+    if queries is not None:
+        summary['queries_per_request'] = round(sum(queries) / count, 2) if count else 0.0
+    return summary
+
+
+def measure(func, iterations, warmup=5, using='default', ok=None):
+    """Call ``func(i)`` repeatedly, timing each call and counting its SQL"""
+    for i in range(warmup):
+        func(-1 - i)
+
+    latencies = []
+    queries = []
+    errors = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        with CaptureQueriesContext(connections[using]) as captured:
+            call_started = time.perf_counter()
+            result = func(i)
+            latencies.append(time.perf_counter() - call_started)
+        queries.append(len(captured))
+        if ok is not None and not ok(result):
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed, queries, errors)
+
+
+def run_metadata(**extra):
+    from django import get_version
+    meta = {
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': get_version(),
+        'database': connections['default'].vendor,
+    }
+    meta.update(extra)
+    return meta
+
+
+def save_results(path, results):
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Regressions between two result files, as human readable strings.
+
+    Latency (p95) and throughput regress past ``threshold`` (a fraction);
+    any increase in queries per request is a regression.
+    """
+    regressions = []
+    for name, now in current.get('results', {}).items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+
+        if before.get('p95_ms') and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if before.get('requests_per_second') and \
+                now['requests_per_second'] < before['requests_per_second'] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {before['requests_per_second']}/s -> {now['requests_per_second']}/s"
+            )
+        if now.get('queries_per_request', 0) > before.get('queries_per_request', 0):
+            regressions.append(
+                f"{name}: queries/request {before.get('queries_per_request')} -> {now['queries_per_request']}"
+            )
+    return regressions
@@ -0,0 +1,142 @@
+from hashlib import sha1
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .metrics import REGISTRY
+import json
+import time
+import uuid
+
+# List pages change with any listing; a detail page only with its own listing
+LIST_GENERATION_KEY = 'listings:list-generation'
+DETAIL_VERSION_KEY = 'listings:detail-version:{pk}'
+
+LISTING_CACHE_REQUESTS = REGISTRY.counter(
+    'listing_cache_requests_total', 'Listing read cache lookups by outcome', ['view', 'result'])
+
+
+def get_cache():
+    return caches[getattr(settings, 'LISTING_CACHE_ALIAS', 'default')]
+
+
+def version_timeout():
+    """Version counters outlive the entries cached under them, then expire"""
+    return 2 * getattr(settings, 'LISTING_CACHE_TIMEOUT', 300)
+
+
+def current_version(key):
+    """
+    Version counter stored at ``key``. A new counter starts at the current
+    time in nanoseconds, not 1, so one recreated after expiring never
+    matches entries cached under its predecessor.
+    """
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        created = time.time_ns()
+        cache.add(key, created, timeout=version_timeout())
+        version = cache.get(key, created)
+    return version
+
+
+def bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=version_timeout())
+
+
+def invalidate_listings(sender=None, instance=None, **kwargs):
+    """
+    post_save/post_delete handler: drops the listing's own detail entries and
+    every list page, after commit so readers never re-cache old rows.
+    """
+    def bump():
+        bump_version(LIST_GENERATION_KEY)
+        if instance is not None:
+            bump_version(DETAIL_VERSION_KEY.format(pk=instance.pk))
+
+    transaction.on_commit(bump)
+
+
+def detail_key(pk):
+    try:
+        pk = uuid.UUID(str(pk))
+    except ValueError:
+        return None
+    return f'listings:detail:{pk}:{current_version(DETAIL_VERSION_KEY.format(pk=pk))}'
+
+
+def list_key(request):
+    query = sorted(request.query_params.lists())
+    digest = sha1(json.dumps(query).encode()).hexdigest()
+    return f'listings:list:{current_version(LIST_GENERATION_KEY)}:{digest}'
+
+
+def make_entry(data):
+    """Cache entry holding the serialized data and its validators"""
+    body = json.dumps(data, sort_keys=True, default=str).encode()
+    items = data.get('results', []) if isinstance(data, dict) and 'results' in data else data
+    if isinstance(items, dict):
+        items = [items]
+
+    last_modified = None
+    for item in items:
+        updated_at = parse_datetime(str(item.get('updated_at') or ''))
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+
+    return {
+        'data': data,
+        'etag': quote_etag(sha1(body).hexdigest()),
+        'last_modified': int(last_modified.timestamp()) if last_modified else None,
+    }
+
+
+def is_not_modified(request, entry):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in etags or entry['etag'] in etags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    return bool(if_modified_since and entry['last_modified'] and entry['last_modified'] <= if_modified_since)
+
+
+def cached_response(request, key, view, build):
+    """
+    Serve ``build()``'s data from the listing cache, honouring conditional GETs.
+
+    On a hit nothing touches the database: a matching If-None-Match or
+    If-Modified-Since gets a 304, anything else the cached body.
+    """
+    if key is None:
+        return build()
+
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None:
+        LISTING_CACHE_REQUESTS.inc(view=view, result='miss')
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        entry = make_entry(response.data)
+        cache.set(key, entry, timeout=getattr(settings, 'LISTING_CACHE_TIMEOUT', 300))
+    else:
+        LISTING_CACHE_REQUESTS.inc(view=view, result='hit')
+
+    if is_not_modified(request, entry):
+        LISTING_CACHE_REQUESTS.inc(view=view, result='not_modified')
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(entry['data'])
+
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    return response
@@ -0,0 +1,156 @@
+"""
+Primary/replica database routing with read-your-writes stickiness.
+
+Writes always go to the primary (``default``). Reads made while serving a
+safe (GET/HEAD/OPTIONS) request go to one of DATABASE_REPLICAS, picked once
+per request so a page and its count come from the same replica. Everything
+else reads from the primary:
+
+- unsafe requests, and reads inside a transaction on the primary;
+- clients that wrote within the last DATABASE_PIN_SECONDS, so a booking or
+  payment shows up on the next poll even if the replicas lag behind;
+- Celery tasks, management commands and the shell, which act on what they
+  read (verify_payment_status, reconciliation) and must not see stale rows.
+
+Request state lives in a context variable, so it follows async views and
+sync_to_async hops without leaking between requests.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from .metrics import REGISTRY
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+# Credentials are always checked on the primary, so a token or session is
+# accepted on the very next request after login whatever the replica lag
+PRIMARY_ONLY_MODELS = {'sessions.Session', 'listings.ApiToken'}
+
+DB_READS = REGISTRY.counter(
+    'db_routed_reads_total', 'Read routing decisions by target database', ['database'])
+
+# None outside requests routed by ReadYourWritesMiddleware: read the primary
+_state = ContextVar('db_routing_state', default=None)
+_task_tokens = {}
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def get_cache():
+    return caches[getattr(settings, 'DATABASE_PIN_CACHE_ALIAS', 'default')]
+
+
+def client_key(request):
+    """Who is asking, from the credential they send; None for anonymous requests"""
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return f'db:pin:{sha256(credential.encode()).hexdigest()}'
+
+
+def reads_primary(request):
+    """Whether ``request`` must read the primary: it writes, or its client wrote recently"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+        return True
+    key = client_key(request)
+    if key is None or not get_replicas():
+        return False
+    try:
+        return get_cache().get(key) is not None
+    except Exception as e:
+        logger.warning(f"Could not read primary pin: {str(e)}")
+        return True
+
+
+def begin_request(pinned):
+    """Start routing this request's reads; returns the token for end_request"""
+    return _state.set({'pinned': pinned, 'replica': None, 'wrote': False})
+
+
+def end_request(token):
+    """Stop routing reads; returns whether the request wrote to the primary"""
+    state = _state.get()
+    _state.reset(token)
+    return state['wrote']
+
+
+def pin_client(request):
+    """Send this client's reads to the primary for DATABASE_PIN_SECONDS"""
+    key = client_key(request)
+    if key is None or not get_replicas():
+        return
+    try:
+        get_cache().set(key, 1, timeout=getattr(settings, 'DATABASE_PIN_SECONDS', 15))
+    except Exception as e:
+        logger.warning(f"Could not pin client to the primary: {str(e)}")
+
+
+def pin_to_primary():
+    """Read the primary for the rest of the current request"""
+    state = _state.get()
+    if state is not None:
+        state['pinned'] = True
+
+
+@contextmanager
+def use_primary():
+    """Read the primary inside the block, whatever the request"""
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """DATABASE_ROUTERS entry; see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['pinned'] or not get_replicas() \
+                or model._meta.label in PRIMARY_ONLY_MODELS \
+                or transaction.get_connection(PRIMARY).in_atomic_block:
+            database = PRIMARY
+        else:
+            if state['replica'] is None:
+                state['replica'] = random.choice(get_replicas())
+            database = state['replica']
+        DB_READS.inc(database=database)
+        return database
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        # Primary-only models are read back from the primary anyway, so a
+        # session save or token touch does not pin the client
+        if state is not None and model._meta.label not in PRIMARY_ONLY_MODELS:
+            # Reads after a write in the same request must see it too
+            state['wrote'] = state['pinned'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+@task_prerun.connect(dispatch_uid='listings.db_router.prerun')
+def _task_prerun(task_id=None, **kwargs):
+    # Tasks read the primary even when run eagerly inside a request
+    _task_tokens[task_id] = _state.set(None)
+
+
+@task_postrun.connect(dispatch_uid='listings.db_router.postrun')
+def _task_postrun(task_id=None, **kwargs):
+    token = _task_tokens.pop(task_id, None)
+    if token is not None:
+        _state.reset(token)
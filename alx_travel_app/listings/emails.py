@@ -0,0 +1,187 @@
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import receiver
+from django.template.loader import get_template
+from django.utils import timezone
+from .models import ConfirmationEmail
+import logging
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_TEMPLATE = 'listings/emails/payment_confirmation.html'
+FLUSH_SCHEDULED_KEY = 'listings:emails:flush-scheduled'
+
+
+@lru_cache(maxsize=None)
+def confirmation_template():
+    """Compiled confirmation template, loaded once per process"""
+    return get_template(CONFIRMATION_TEMPLATE)
+
+
+@receiver(setting_changed)
+def _clear_template_cache(setting, **kwargs):
+    if setting == 'TEMPLATES':
+        confirmation_template.cache_clear()
+
+
+def build_confirmation_message(payment, user_email, connection=None):
+    """EmailMultiAlternatives with the plain text and HTML confirmation"""
+    booking = payment.booking
+
+    html_message = confirmation_template().render({
+        'booking': booking,
+        'payment': payment,
+        'user_email': user_email,
+    })
+
+    # Plain text version
+    message = f"""
+        Dear {payment.customer_first_name} {payment.customer_last_name},
+
+        Your payment of {payment.amount} {payment.currency} has been confirmed.
+
+        Booking Details:
+        - Booking ID: {booking.id}
+        - Check-in: {booking.check_in}
+        - Check-out: {booking.check_out}
+        - Total Paid: {payment.amount} {payment.currency}
+        - Payment Method: {payment.get_payment_method_display()}
+
+        Thank you for choosing our service!
+
+        Best regards,
+        Travel Booking Team
+        """
+
+    email = EmailMultiAlternatives(
+        subject=f"Payment Confirmation - Booking #{booking.id}",
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user_email],
+        connection=connection,
+    )
+    email.attach_alternative(html_message, 'text/html')
+    return email
+
+
+def enqueue_confirmation(payment_id, user_email):
+    """Queue a confirmation; a payment is only ever queued once"""
+    enqueue_confirmations([(payment_id, user_email)])
+
+
+def enqueue_confirmations(rows):
+    """Queue confirmations for many (payment_id, user_email) pairs in one INSERT"""
+    ConfirmationEmail.objects.bulk_create(
+        [ConfirmationEmail(payment_id=payment_id, recipient=email) for payment_id, email in rows],
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(schedule_flush)
+
+
+def schedule_flush():
+    """
+    Schedule one flush per delay window instead of one task per payment.
+
+    Runs after the payment has committed, so a cache or broker failure is
+    only logged; the periodic flush sends the email later.
+    """
+    from .tasks import flush_confirmation_emails
+
+    delay = getattr(settings, 'EMAIL_FLUSH_DELAY', 5)
+    try:
+        if cache.add(FLUSH_SCHEDULED_KEY, True, timeout=delay):
+            flush_confirmation_emails.apply_async(countdown=delay)
+    except Exception as e:
+        logger.error(f"Could not schedule a confirmation email flush: {str(e)}")
+
+
+def claim_confirmation_batch(batch_size, max_attempts):
+    """
+    Claim up to ``batch_size`` sendable confirmations in one short transaction.
+
+    Claimed rows move to 'sending' with their attempt already counted, so the
+    row locks are released before any SMTP traffic. Rows a crashed flush left
+    in 'sending' are claimed again after EMAIL_CLAIM_TIMEOUT, or marked failed
+    if that was their last attempt.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'EMAIL_CLAIM_TIMEOUT', 600))
+
+    with transaction.atomic():
+        ConfirmationEmail.objects.filter(
+            status='sending', claimed_at__lt=stale, attempts__gte=max_attempts
+        ).update(status='failed', last_error='Flush stopped during the last attempt')
+        # skip_locked lets concurrent flushes take disjoint batches
+        ids = list(
+            ConfirmationEmail.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='sending', claimed_at__lt=stale), attempts__lt=max_attempts)
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        ConfirmationEmail.objects.filter(pk__in=ids).update(
+            status='sending', claimed_at=now, attempts=F('attempts') + 1
+        )
+
+    return list(
+        ConfirmationEmail.objects.filter(pk__in=ids)
+        .select_related('payment__booking')
+        .order_by('created_at')
+    )
+
+
+def record_failure(email, error, max_attempts):
+    """Put a claimed confirmation back in the queue, or give up on it"""
+    status = 'failed' if email.attempts >= max_attempts else 'queued'
+    ConfirmationEmail.objects.filter(pk=email.pk, status='sending').update(status=status, last_error=error)
+    logger.error(f"Failed to send confirmation for payment {email.payment_id}: {error}")
+
+
+def send_confirmation_batch(batch_size=None, max_attempts=None):
+    """
+    Send up to ``batch_size`` queued confirmations over one connection.
+
+    The batch is claimed and committed first; messages then go out one
+    ``send_messages`` call at a time on the shared, already-open connection,
+    outside any transaction, and each outcome is recorded with its own short
+    UPDATE. Failures are retried on later flushes until ``max_attempts`` is
+    reached. Returns (sent, failed) counts.
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_BATCH_SIZE', 100)
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_MAX_ATTEMPTS', 5)
+
+    pending = claim_confirmation_batch(batch_size, max_attempts)
+    if not pending:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Nothing was sent; the claimed attempt still counts
+        for email in pending:
+            record_failure(email, str(e), max_attempts)
+        raise
+
+    try:
+        for email in pending:
+            try:
+                message = build_confirmation_message(email.payment, email.recipient, connection)
+                connection.send_messages([message])
+            except Exception as e:
+                record_failure(email, str(e), max_attempts)
+                failed += 1
+                continue
+            ConfirmationEmail.objects.filter(pk=email.pk).update(status='sent', sent_at=timezone.now())
+            sent += 1
+    finally:
+        connection.close()
+
+    logger.info(f"Sent {sent} confirmation emails, {failed} failed")
+    return sent, failed
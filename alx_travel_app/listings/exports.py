@@ -0,0 +1,132 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+import csv
+import json
+
+PAYMENT_EXPORT_FIELDS = (
+    'id', 'tx_ref', 'booking_id', 'user_id', 'amount', 'currency', 'status', 'payment_method',
+    'chapa_transaction_id', 'customer_email', 'payment_date', 'created_at', 'updated_at',
+)
+BOOKING_EXPORT_FIELDS = (
+    'id', 'listing_id', 'user_id', 'check_in', 'check_out', 'number_of_guests', 'total_price',
+    'status', 'created_at', 'updated_at',
+)
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class _ExportRenderer(BaseRenderer):
+    """Lets clients ask for an export format; the stream itself bypasses rendering"""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses get here
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+EXPORT_RENDERERS = [NDJSONRenderer, CSVRenderer] + list(api_settings.DEFAULT_RENDERER_CLASSES)
+
+
+def export_format(request):
+    """csv or ndjson, from ?format= or the Accept header; NDJSON by default"""
+    output = getattr(request.accepted_renderer, 'format', None)
+    return output if output in CONTENT_TYPES else 'ndjson'
+
+
+def _day_start(day):
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def filter_export(queryset, start=None, end=None, statuses=None):
+    """Rows created between start and end (inclusive dates) with one of ``statuses``"""
+    if start:
+        queryset = queryset.filter(created_at__gte=_day_start(start))
+    if end:
+        queryset = queryset.filter(created_at__lt=_day_start(end + timedelta(days=1)))
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.order_by('created_at', 'id')
+
+
+def export_rows(queryset, fields, chunk_size=None):
+    """
+    Stream ``fields`` of every row as tuples.
+
+    ``iterator()`` reads ``chunk_size`` rows at a time (a server-side cursor
+    on Postgres) and caches nothing, so memory does not grow with the export.
+    """
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _batched(lines, size):
+    # Fewer, larger writes to the socket than one per row
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def ndjson_lines(rows, fields):
+    encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def export_lines(queryset, fields, output, chunk_size=None):
+    """Encoded export, in batches of lines"""
+    rows = export_rows(queryset, fields, chunk_size)
+    lines = csv_lines(rows, fields) if output == 'csv' else ndjson_lines(rows, fields)
+    return _batched(lines, 500)
+
+
+def export_response(queryset, fields, output, filename):
+    response = StreamingHttpResponse(
+        export_lines(queryset, fields, output), content_type=CONTENT_TYPES[output]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,205 @@
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Fields whose representation is never a float
+FLOAT_FREE_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField, serializers.DateField,
+    serializers.DateTimeField, serializers.DecimalField, serializers.IntegerField,
+    serializers.UUIDField, PrimaryKeyRelatedField,
+)
+
+
+def _passthrough(value):
+    return value
+
+
+def _has_float(value):
+    if isinstance(value, float):
+        return True
+    if isinstance(value, dict):
+        return any(_has_float(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_float(item) for item in value)
+    return False
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class FastRows(list):
+    """Represented rows; ``float_free`` tells FastJSONRenderer orjson's output will match"""
+    float_free = False
+
+
+class IsoDateTime:
+    """
+    DateTimeField.to_representation with the current timezone looked up
+    once per call instead of once per value.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def bind(self, tz):
+        to_representation = self.field.to_representation
+        if tz is None:
+            return to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+
+class FieldPlan:
+    """
+    Precompiled read plan for a ModelSerializer.
+
+    Rows come from ``queryset.values(*plan.columns)`` and are turned into the
+    same dicts ``serializer.data`` would produce, field by field, without
+    instantiating serializers or model instances. Nested serializers become
+    joined columns (``listing__title``), foreign keys their raw key.
+    """
+
+    def __init__(self, serializer):
+        self.columns = []
+        self.float_columns = []
+        self.steps = self._compile(serializer, prefix='')
+
+    def _compile(self, serializer, prefix):
+        steps = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source or isinstance(field, serializers.ManyRelatedField):
+                raise UnsupportedField(name)
+
+            column = f'{prefix}{field.source}'
+            if isinstance(field, serializers.BaseSerializer):
+                if getattr(field, 'many', False):
+                    raise UnsupportedField(name)
+                self.columns.append(f'{column}__pk')
+                nested = self._compile(field, prefix=f'{column}__')
+                steps.append((name, f'{column}__pk', None, nested))
+            else:
+                self.columns.append(column)
+                if not isinstance(field, FLOAT_FREE_FIELDS):
+                    self.float_columns.append(column)
+                steps.append((name, column, self._converter(field), None))
+        return steps
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return field.pk_field.to_representation
+            return _passthrough
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+            return str
+        if type(field) is serializers.IntegerField:
+            return int
+        if type(field) is serializers.CharField:
+            return str
+        if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone'):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return IsoDateTime(field)
+        if isinstance(field, (serializers.SerializerMethodField, serializers.HiddenField)):
+            raise UnsupportedField(field.field_name)
+        return field.to_representation
+
+    def _bind(self, steps, tz):
+        return [
+            (name, column, convert.bind(tz) if isinstance(convert, IsoDateTime) else convert,
+             self._bind(nested, tz) if nested is not None else None)
+            for name, column, convert, nested in steps
+        ]
+
+    def _build(self, row, steps):
+        item = {}
+        for name, column, convert, nested in steps:
+            value = row[column]
+            if value is None:
+                item[name] = None
+            elif nested is not None:
+                item[name] = self._build(row, nested)
+            else:
+                item[name] = convert(value)
+        return item
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def represent(self, rows):
+        """serializer.data for every row, as plain dicts"""
+        with timed('serialize'):
+            tz = timezone.get_current_timezone() if settings.USE_TZ else None
+            steps = self._bind(self.steps, tz)
+            rows = list(rows)
+            data = FastRows(self._build(row, steps) for row in rows)
+            data.float_free = not any(_has_float(row[column]) for row in rows for column in self.float_columns)
+            return data
+
+
+@lru_cache(maxsize=None)
+def get_plan(serializer_class):
+    """The field plan for ``serializer_class``, or None if it needs the full serializer"""
+    try:
+        return FieldPlan(serializer_class())
+    except UnsupportedField:
+        return None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes fast path rows with orjson when it is installed.
+
+    orjson writes some floats differently (1e16 vs 1e+16), so it is only used
+    for FastRows known to hold none; the output is then byte-identical to
+    JSONRenderer's. Everything else is rendered by JSONRenderer itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data.get('results') if isinstance(data, dict) else data
+        if (orjson is None or not getattr(rows, 'float_free', False)
+                or self.get_indent(accepted_media_type, renderer_context or {})
+                or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON and api_settings.STRICT_JSON)):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for JavaScript compatibility
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastListMixin:
+    """Serve list actions from ``.values()`` rows through the serializer's field plan"""
+
+    def list(self, request, *args, **kwargs):
+        plan = get_plan(self.get_serializer_class())
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = plan.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.represent(page))
+        return Response(plan.represent(queryset))
@@ -0,0 +1,250 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .instrumentation import timed
+from .resilience import AsyncBulkhead, Bulkhead, CircuitBreaker, GatewayUnavailable, is_failure
+import asyncio
+import httpx
+import requests
+import threading
+import weakref
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+# One async client per event loop; httpx pools cannot be shared between loops
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class ChapaClient:
+    """
+    Chapa API client backed by one pooled keep-alive session.
+
+    Connections are reused across calls, at most ``pool_size`` are open at
+    once, and idempotent requests are retried with exponential backoff on
+    connection errors and 502/503/504. POSTs are only retried when the
+    connection could not be established, so a payment is never initialized
+    twice.
+
+    Calls go through a bulkhead capping how many are in flight and a
+    circuit breaker that refuses them while Chapa is failing; both raise
+    GatewayUnavailable instead of waiting on the network.
+    """
+
+    def __init__(self, secret_key=None, initialize_url=None, verify_url=None,
+                 pool_size=None, connect_timeout=None, read_timeout=None,
+                 max_retries=None, backoff_factor=None, breaker=None, bulkhead=None):
+        self.initialize_url = initialize_url or settings.CHAPA_API_URL
+        self.verify_url = verify_url or settings.CHAPA_VERIFY_URL
+        self.timeout = (
+            connect_timeout or getattr(settings, 'CHAPA_CONNECT_TIMEOUT', 3.05),
+            read_timeout or getattr(settings, 'CHAPA_READ_TIMEOUT', 30),
+        )
+        pool_size = pool_size or getattr(settings, 'CHAPA_POOL_SIZE', 10)
+        if max_retries is None:
+            max_retries = getattr(settings, 'CHAPA_MAX_RETRIES', 2)
+        if backoff_factor is None:
+            backoff_factor = getattr(settings, 'CHAPA_BACKOFF_FACTOR', 0.3)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=retry,
+        )
+
+        self.breaker = breaker or CircuitBreaker(
+            'chapa',
+            failure_threshold=getattr(settings, 'CHAPA_BREAKER_FAILURE_THRESHOLD', 5),
+            recovery_timeout=getattr(settings, 'CHAPA_BREAKER_RECOVERY_TIMEOUT', 30),
+            half_open_max_calls=getattr(settings, 'CHAPA_BREAKER_HALF_OPEN_CALLS', 1),
+        )
+        self.bulkhead = bulkhead or Bulkhead(
+            'chapa',
+            max_concurrent=getattr(settings, 'CHAPA_BULKHEAD_SIZE', 5),
+            max_wait=getattr(settings, 'CHAPA_BULKHEAD_WAIT', 0.0),
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key or settings.CHAPA_SECRET_KEY}',
+        })
+
+    def _call(self, operation, method, url, **kwargs):
+        self.breaker.acquire()
+        try:
+            self.bulkhead.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        try:
+            with timed('gateway', operation=operation):
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or broken on our side: nothing was learned about the
+            # gateway, so a half-open probe is handed back instead of leaking
+            self.breaker.release()
+            raise
+        finally:
+            self.bulkhead.release()
+
+        if is_failure(response):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def ensure_available(self):
+        """Raise GatewayUnavailable now if calls would be refused, before doing any work"""
+        self.breaker.check()
+
+    def initialize(self, payload):
+        """POST a transaction to Chapa's initialize endpoint"""
+        return self._call('initialize', 'POST', self.initialize_url, json=payload)
+
+    def verify(self, tx_ref):
+        """GET the transaction status for ``tx_ref``"""
+        return self._call('verify', 'GET', f"{self.verify_url}{tx_ref}")
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncChapaClient:
+    """
+    Non-blocking Chapa client for async views, on a pooled httpx.AsyncClient.
+
+    Waiting on Chapa takes no thread, so one process can hold up to
+    CHAPA_ASYNC_MAX_CONNECTIONS calls in flight. Connection failures are
+    retried (which never double-submits a POST); unlike ChapaClient, 5xx
+    responses are not. It shares the sync client's circuit breaker, so both
+    paths see the gateway's health the same way, behind its own bulkhead.
+    """
+
+    def __init__(self, secret_key=None, initialize_url=None, verify_url=None, max_connections=None,
+                 connect_timeout=None, read_timeout=None, max_retries=None, breaker=None, bulkhead=None):
+        self.initialize_url = initialize_url or settings.CHAPA_API_URL
+        self.verify_url = verify_url or settings.CHAPA_VERIFY_URL
+        max_connections = max_connections or getattr(settings, 'CHAPA_ASYNC_MAX_CONNECTIONS', 200)
+        if max_retries is None:
+            max_retries = getattr(settings, 'CHAPA_MAX_RETRIES', 2)
+
+        self.breaker = breaker or get_client().breaker
+        self.bulkhead = bulkhead or AsyncBulkhead(
+            'chapa-async',
+            max_concurrent=getattr(settings, 'CHAPA_ASYNC_BULKHEAD_SIZE', 200),
+            max_wait=getattr(settings, 'CHAPA_BULKHEAD_WAIT', 0.0),
+        )
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                retries=max_retries,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            ),
+            timeout=httpx.Timeout(
+                read_timeout or getattr(settings, 'CHAPA_READ_TIMEOUT', 30),
+                connect=connect_timeout or getattr(settings, 'CHAPA_CONNECT_TIMEOUT', 3.05),
+            ),
+            headers={'Authorization': f'Bearer {secret_key or settings.CHAPA_SECRET_KEY}'},
+        )
+
+    async def _call(self, operation, method, url, **kwargs):
+        self.breaker.acquire()
+        try:
+            await self.bulkhead.acquire()
+        except BaseException:
+            self.breaker.release()
+            raise
+        try:
+            with timed('gateway', operation=operation):
+                response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled or broken on our side: nothing was learned about the
+            # gateway, so a half-open probe is handed back instead of leaking
+            self.breaker.release()
+            raise
+        finally:
+            self.bulkhead.release()
+
+        if is_failure(response):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def ensure_available(self):
+        """Raise GatewayUnavailable now if calls would be refused, before doing any work"""
+        self.breaker.check()
+
+    async def initialize(self, payload):
+        """POST a transaction to Chapa's initialize endpoint"""
+        return await self._call('initialize', 'POST', self.initialize_url, json=payload)
+
+    async def verify(self, tx_ref):
+        """GET the transaction status for ``tx_ref``"""
+        return await self._call('verify', 'GET', f"{self.verify_url}{tx_ref}")
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def get_async_client():
+    """Return the running event loop's shared async client, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncChapaClient()
+    return client
+
+
+def get_client():
+    """Return this process's shared client, creating it on first use"""
+    global _client, _client_pid
+
+    # Forked Celery workers must not share the parent's sockets
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = ChapaClient()
+                _client_pid = pid
+    return _client
+
+
+def reset_client():
+    """Drop the shared client so the next call picks up fresh settings"""
+    global _client, _client_pid
+
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+        # Their pools close when garbage collected, with their loops
+        _async_clients.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting.startswith('CHAPA_'):
+        reset_client()
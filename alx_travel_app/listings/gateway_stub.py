@@ -0,0 +1,215 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.test.utils import override_settings
+import json
+import random
+import threading
+import time
+import uuid
+
+
+class _StubServer(ThreadingHTTPServer):
+    # Room for hundreds of concurrent connects from async load tests
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class StubChapaGateway:
+    """
+    In-process HTTP server that mimics Chapa's initialize and verify APIs.
+
+    Every initialized transaction verifies as ``default_outcome`` unless
+    overridden with ``set_outcome``; ``latency`` adds a fixed delay to each
+    response. Use it as a context manager and wrap calls in ``settings()``
+    to point the shared gateway client at it:
+
+        with StubChapaGateway(latency=0.05) as stub, stub.settings():
+            ...
+
+    ``inject_fault`` makes a share of responses slow and/or fail with a
+    given status, to exercise timeouts and the circuit breaker.
+    """
+
+    initialize_path = '/v1/transaction/initialize'
+    verify_path = '/v1/transaction/verify/'
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, default_outcome='success',
+                 fault_status=None, fault_delay=0.0, fault_rate=1.0):
+        self.latency = latency
+        self.default_outcome = default_outcome
+        self.fault_status = fault_status
+        self.fault_delay = fault_delay
+        self.fault_rate = fault_rate
+        self.transactions = {}
+        self.request_count = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = _StubServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def initialize_url(self):
+        return f'{self.base_url}{self.initialize_path}'
+
+    @property
+    def verify_url(self):
+        return f'{self.base_url}{self.verify_path}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def settings(self):
+        """override_settings pointing the Chapa URLs at this stub"""
+        return override_settings(
+            CHAPA_SECRET_KEY='stub-secret-key',
+            CHAPA_API_URL=self.initialize_url,
+            CHAPA_VERIFY_URL=self.verify_url,
+        )
+
+    def set_outcome(self, tx_ref, outcome):
+        """Make ``tx_ref`` verify as ``outcome`` ('success', 'failed', 'pending')"""
+        with self._lock:
+            self.transactions.setdefault(tx_ref, {})['status'] = outcome
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.peak_in_flight = self.in_flight
+
+    def inject_fault(self, status=None, delay=0.0, rate=1.0):
+        """Answer ``rate`` of requests after ``delay`` extra seconds, with ``status`` if given"""
+        with self._lock:
+            self.fault_status = status
+            self.fault_delay = delay
+            self.fault_rate = rate
+
+    def clear_fault(self):
+        self.inject_fault()
+
+    def _fault(self):
+        # (extra delay, status) for this request, or None
+        with self._lock:
+            if not (self.fault_status or self.fault_delay) or random.random() >= self.fault_rate:
+                return None
+            return self.fault_delay, self.fault_status
+
+    def handle_initialize(self, payload):
+        tx_ref = payload.get('tx_ref')
+        if not tx_ref or not payload.get('amount'):
+            return 400, {'status': 'failed', 'message': 'tx_ref and amount are required', 'data': None}
+
+        with self._lock:
+            transaction = self.transactions.setdefault(tx_ref, {})
+            transaction.setdefault('status', self.default_outcome)
+            transaction.setdefault('id', f'STUB-{uuid.uuid4().hex[:10].upper()}')
+            transaction['amount'] = payload['amount']
+            transaction['currency'] = payload.get('currency', 'ETB')
+
+        return 200, {
+            'status': 'success',
+            'message': 'Hosted Link',
+            'data': {'checkout_url': f'{self.base_url}/checkout/{tx_ref}'},
+        }
+
+    def handle_verify(self, tx_ref):
+        with self._lock:
+            transaction = self.transactions.get(tx_ref)
+            transaction = dict(transaction) if transaction else None
+
+        if transaction is None:
+            return 404, {'status': 'failed', 'message': 'Invalid transaction or Transaction not found', 'data': None}
+
+        return 200, {
+            'status': 'success',
+            'message': 'Payment details',
+            'data': {
+                'id': transaction['id'],
+                'tx_ref': tx_ref,
+                'status': transaction['status'],
+                'amount': transaction.get('amount'),
+                'currency': transaction.get('currency'),
+            },
+        }
+
+    def _make_handler(self):
+        gateway = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 so pooled clients can keep connections alive
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self._respond(400, {'status': 'failed', 'message': 'Invalid JSON'})
+
+                if self.path.split('?')[0] != gateway.initialize_path:
+                    return self._respond(404, {'status': 'failed', 'message': 'Not found'})
+                self._respond(*gateway.handle_initialize(payload))
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if not path.startswith(gateway.verify_path):
+                    return self._respond(404, {'status': 'failed', 'message': 'Not found'})
+                self._respond(*gateway.handle_verify(path[len(gateway.verify_path):]))
+
+            def _respond(self, status_code, body):
+                with gateway._lock:
+                    gateway.request_count += 1
+                    gateway.in_flight += 1
+                    gateway.peak_in_flight = max(gateway.peak_in_flight, gateway.in_flight)
+                try:
+                    if gateway.latency:
+                        time.sleep(gateway.latency)
+                    fault = gateway._fault()
+                    if fault is not None:
+                        delay, fault_status = fault
+                        if delay:
+                            time.sleep(delay)
+                        if fault_status:
+                            status_code, body = fault_status, {'status': 'failed', 'message': 'Injected fault', 'data': None}
+                finally:
+                    with gateway._lock:
+                        gateway.in_flight -= 1
+
+                content = json.dumps(body).encode()
+                try:
+                    self.send_response(status_code)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client timed out while a fault was holding the response
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
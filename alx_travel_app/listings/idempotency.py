@@ -0,0 +1,167 @@
+from datetime import timedelta
+from functools import wraps
+from hashlib import sha256
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .metrics import REGISTRY
+from .models import Payment
+import json
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_REQUESTS = REGISTRY.counter(
+    'idempotent_requests_total', 'Requests to idempotent endpoints by outcome', ['scope', 'result'])
+
+
+def get_cache():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+
+def _fingerprint(data):
+    return sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def _error(message, status_code, respond=Response):
+    return respond({'success': False, 'message': message}, status=status_code)
+
+
+def _keys(request, scope, fingerprint):
+    """(response cache key or None without an Idempotency-Key, lock key)"""
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return None, f'idempotency:{scope}:{request.user.pk}:body:{fingerprint}:lock'
+    cache_key = f'idempotency:{scope}:{request.user.pk}:{sha256(key.encode()).hexdigest()}'
+    return cache_key, f'{cache_key}:lock'
+
+
+def _invalid_key(request):
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    return key is not None and not 0 < len(key) <= MAX_KEY_LENGTH
+
+
+def _entry(response, fingerprint):
+    return {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data}
+
+
+def idempotent_response(request, scope, build):
+    """
+    Run ``build`` once per user and Idempotency-Key within IDEMPOTENCY_TTL.
+
+    The first response (unless it is a 5xx, which may be retried) is cached
+    and replayed for repeats of the key with an ``Idempotent-Replayed``
+    header. A repeat arriving while the first is still running gets a 409,
+    and reusing a key for a different request body a 422. Requests without
+    a key are only guarded while in flight: an identical body from the same
+    user (a double-click) gets the 409.
+    """
+    if _invalid_key(request):
+        return _error(f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters', status.HTTP_400_BAD_REQUEST)
+    cache = get_cache()
+    fingerprint = _fingerprint(request.data)
+    cache_key, lock_key = _keys(request, scope, fingerprint)
+
+    stored = cache.get(cache_key) if cache_key else None
+    if stored is not None:
+        return _replay(scope, stored, fingerprint)
+    if not cache.add(lock_key, 1, timeout=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)):
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result='in_progress')
+        return _error('An identical request is still being processed', status.HTTP_409_CONFLICT)
+    try:
+        # The first request may have finished between the lookup and the lock
+        stored = cache.get(cache_key) if cache_key else None
+        if stored is not None:
+            return _replay(scope, stored, fingerprint)
+
+        response = build()
+        if cache_key and response.status_code < 500:
+            cache.set(cache_key, _entry(response, fingerprint), timeout=getattr(settings, 'IDEMPOTENCY_TTL', 86400))
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result='stored' if cache_key else 'unkeyed')
+        return response
+    finally:
+        cache.delete(lock_key)
+
+
+async def aidempotent_response(request, scope, build, respond):
+    """
+    idempotent_response for async views: ``build`` is a coroutine function
+    and ``respond(data, status=...)`` makes the replayed responses.
+    """
+    if _invalid_key(request):
+        return _error(f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters',
+                      status.HTTP_400_BAD_REQUEST, respond)
+    cache = get_cache()
+    fingerprint = _fingerprint(request.data)
+    cache_key, lock_key = _keys(request, scope, fingerprint)
+
+    stored = await cache.aget(cache_key) if cache_key else None
+    if stored is not None:
+        return _replay(scope, stored, fingerprint, respond)
+    if not await cache.aadd(lock_key, 1, timeout=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)):
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result='in_progress')
+        return _error('An identical request is still being processed', status.HTTP_409_CONFLICT, respond)
+    try:
+        stored = await cache.aget(cache_key) if cache_key else None
+        if stored is not None:
+            return _replay(scope, stored, fingerprint, respond)
+
+        response = await build()
+        if cache_key and response.status_code < 500:
+            await cache.aset(cache_key, _entry(response, fingerprint), timeout=getattr(settings, 'IDEMPOTENCY_TTL', 86400))
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result='stored' if cache_key else 'unkeyed')
+        return response
+    finally:
+        await cache.adelete(lock_key)
+
+
+def _replay(scope, stored, fingerprint, respond=Response):
+    if stored['fingerprint'] != fingerprint:
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, result='mismatch')
+        return _error(
+            f'{IDEMPOTENCY_HEADER} was already used for a different request',
+            status.HTTP_422_UNPROCESSABLE_ENTITY, respond,
+        )
+    IDEMPOTENCY_REQUESTS.inc(scope=scope, result='replayed')
+    response = respond(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """Decorate a viewset action so it goes through idempotent_response"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            return idempotent_response(request, scope, lambda: view(self, request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _reusable_payments(booking):
+    ttl = timedelta(seconds=getattr(settings, 'CHAPA_CHECKOUT_TTL', 3600))
+    return (
+        Payment.objects.filter(
+            booking=booking, user_id=booking.user_id, status='pending', amount=booking.total_price,
+            checkout_url__isnull=False, created_at__gte=timezone.now() - ttl,
+        )
+        .exclude(checkout_url='')
+        .order_by('-created_at')
+    )
+
+
+def reusable_payment(booking):
+    """
+    The booking's newest pending payment whose checkout link can still be used.
+
+    Links are trusted for CHAPA_CHECKOUT_TTL seconds and only while the
+    amount still matches the booking.
+    """
+    return _reusable_payments(booking).first()
+
+
+async def areusable_payment(booking):
+    return await _reusable_payments(booking).afirst()
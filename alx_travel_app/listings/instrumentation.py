@@ -0,0 +1,106 @@
+from contextlib import contextmanager, ExitStack
+from contextvars import ContextVar
+from django.db import connections
+from .metrics import REGISTRY
+import time
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Total time spent handling a request', ['view', 'method'])
+REQUEST_DB_TIME = REGISTRY.histogram(
+    'http_request_db_seconds', 'SQL time per request', ['view', 'method'])
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', 'SQL queries per request', ['view', 'method'], buckets=QUERY_BUCKETS)
+REQUEST_GATEWAY_TIME = REGISTRY.histogram(
+    'http_request_gateway_seconds', 'Outbound payment gateway time per request', ['view', 'method'])
+REQUEST_SERIALIZE_TIME = REGISTRY.histogram(
+    'http_request_serialize_seconds', 'Serializer to_representation time per request', ['view', 'method'])
+GATEWAY_CALL_DURATION = REGISTRY.histogram(
+    'gateway_call_duration_seconds', 'Duration of each outbound payment gateway call', ['operation'])
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Time and call counts accumulated for one request, by kind"""
+
+    def __init__(self):
+        self.durations = {'db': 0.0, 'gateway': 0.0, 'serialize': 0.0}
+        self.counts = {'db': 0, 'gateway': 0, 'serialize': 0}
+        self.active = set()
+
+    def server_timing(self, total):
+        entries = [
+            f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.counts["db"]} queries"',
+            f'gateway;dur={self.durations["gateway"] * 1000:.2f};desc="{self.counts["gateway"]} calls"',
+            f'serialize;dur={self.durations["serialize"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ]
+        return ', '.join(entries)
+
+
+def current_timings():
+    return _current.get()
+
+
+@contextmanager
+def timed(kind, operation=None):
+    """
+    Attribute the wrapped block's wall time to ``kind`` on the current request.
+
+    Nested blocks of the same kind (a serializer rendering its nested
+    serializers) are only counted once, at the outermost level.
+    """
+    timings = _current.get()
+    if timings is not None and kind in timings.active:
+        yield
+        return
+
+    if timings is not None:
+        timings.active.add(kind)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings.active.discard(kind)
+            timings.durations[kind] += elapsed
+            timings.counts[kind] += 1
+        if kind == 'gateway':
+            GATEWAY_CALL_DURATION.observe(elapsed, operation=operation or 'unknown')
+
+
+def _sql_timer(execute, sql, params, many, context):
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if timings is not None:
+            timings.durations['db'] += time.perf_counter() - started
+            timings.counts['db'] += 1
+
+
+@contextmanager
+def instrument_request():
+    """Collect SQL, gateway and serializer timings for the wrapped request"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_sql_timer))
+            yield timings
+    finally:
+        _current.reset(token)
+
+
+def record_request(timings, total, view, method):
+    labels = {'view': view, 'method': method}
+    REQUEST_DURATION.observe(total, **labels)
+    REQUEST_DB_TIME.observe(timings.durations['db'], **labels)
+    REQUEST_DB_QUERIES.observe(timings.counts['db'], **labels)
+    REQUEST_GATEWAY_TIME.observe(timings.durations['gateway'], **labels)
+    REQUEST_SERIALIZE_TIME.observe(timings.durations['serialize'], **labels)
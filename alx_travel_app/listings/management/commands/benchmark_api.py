@@ -0,0 +1,125 @@
+from itertools import cycle
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+from rest_framework.test import APIClient
+from listings.benchmarking import (
+    compare_results, load_results, measure, rolled_back, run_metadata, save_results,
+)
+from listings.gateway_stub import StubChapaGateway
+from listings.models import Listing, Booking, Payment
+from listings.query_budget import build_sample_graph
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the listings, bookings and payments API against a local Chapa stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+        parser.add_argument('--rows', type=int, default=200, help='Sample rows per model')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--gateway-latency', type=float, default=0.0, help='Seconds the stub waits per call')
+        parser.add_argument('--only', default='', help='Comma separated endpoint names to run')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+        parser.add_argument('--baseline', help='Compare against a previous JSON result')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression as a fraction')
+
+    def handle(self, *args, **options):
+        only = {name for name in options['only'].split(',') if name}
+        results = {}
+
+        # Sample data and everything the endpoints write are discarded afterwards
+        with StubChapaGateway(latency=options['gateway_latency']) as stub, stub.settings(), \
+                override_settings(ALLOWED_HOSTS=['testserver']), rolled_back():
+            guest = build_sample_graph(options['rows'], prefix='bench')
+            client = APIClient()
+            client.force_authenticate(user=guest)
+
+            for name, call in self.get_endpoints(client, options['page_size']):
+                if only and name not in only:
+                    continue
+                results[name] = measure(call, options['requests'], ok=lambda response: response.status_code < 400)
+                self.report(name, results[name])
+
+        output = {
+            'meta': run_metadata(
+                requests=options['requests'],
+                rows=options['rows'],
+                page_size=options['page_size'],
+                gateway_latency=options['gateway_latency'],
+            ),
+            'results': results,
+        }
+        if options['output']:
+            save_results(options['output'], output)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            regressions = compare_results(load_results(options['baseline']), output, options['threshold'])
+            if regressions:
+                raise CommandError('Regressions against baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
+
+    def get_endpoints(self, client, page_size):
+        """Yield (name, call) pairs; a generator so payment calls see earlier tx_refs"""
+        listing = Listing.objects.order_by('created_at').first()
+        booking = Booking.objects.order_by('created_at').first()
+        payment = Payment.objects.order_by('created_at').first()
+        pending_bookings = cycle(list(Booking.objects.filter(status='pending').values_list('id', flat=True)))
+        check_in = booking.check_out
+        stay = {'check_in': check_in, 'check_out': check_in + (booking.check_out - booking.check_in)}
+        page = {'page_size': page_size}
+        tx_refs = []
+
+        reads = [
+            ('listing-list', 'listing-list', (), page),
+            ('listing-detail', 'listing-detail', (listing.pk,), None),
+            ('listing-available', 'listing-available', (), stay),
+            ('booking-list', 'booking-list', (), page),
+            ('booking-detail', 'booking-detail', (booking.pk,), None),
+            ('payment-list', 'payment-list', (), page),
+            ('payment-detail', 'payment-detail', (payment.pk,), None),
+        ]
+        for name, url_name, args, params in reads:
+            path = self.resolve(name, url_name, args)
+            if path:
+                yield name, lambda i, path=path, params=params: client.get(path, params)
+
+        path = self.resolve('payments-initiate', 'payment-initiate-payment')
+        if path:
+            def initiate(i):
+                response = client.post(path, {'booking_id': str(next(pending_bookings))}, format='json')
+                if response.status_code == 200:
+                    tx_refs.append(response.data['tx_ref'])
+                return response
+            yield 'payments-initiate', initiate
+
+        if not tx_refs:
+            self.stdout.write(self.style.WARNING('payments-verify/webhook: no initiated payments, skipped'))
+            return
+
+        # Verify and webhook replay the transactions initiate created, round robin
+        if self.resolve('payments-verify', 'payment-verify-payment', kwargs={'tx_ref': tx_refs[0]}):
+            yield 'payments-verify', lambda i: client.get(
+                reverse('payment-verify-payment', kwargs={'tx_ref': tx_refs[i % len(tx_refs)]})
+            )
+
+        path = self.resolve('payments-webhook', 'payment-payment-webhook')
+        if path:
+            yield 'payments-webhook', lambda i: client.post(path, {
+                'tx_ref': tx_refs[i % len(tx_refs)], 'status': 'success', 'reference': f'bench-{i}',
+            }, format='json')
+
+    def resolve(self, name, url_name, args=(), kwargs=None):
+        try:
+            return reverse(url_name, args=args, kwargs=kwargs)
+        except NoReverseMatch:
+            self.stdout.write(self.style.WARNING(f'{name}: not routed, skipped'))
+            return None
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:20} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+            f"p99 {result['p99_ms']:8.2f}ms  {result['requests_per_second']:8.1f} req/s  "
+            f"{result['queries_per_request']:5.1f} queries/req  {result['errors']} errors"
+        )
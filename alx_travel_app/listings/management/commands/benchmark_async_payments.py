@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch, reverse
+from listings.benchmarking import run_metadata, save_results, summarize
+from listings.gateway_stub import StubChapaGateway
+from listings.models import ApiToken, Payment
+from listings.query_budget import build_sample_graph
+import asyncio
+import time
+
+PREFIX = 'async-bench'
+
+
+class Command(BaseCommand):
+    help = 'Compare how many concurrent gateway-bound payment verifications the sync and async paths sustain'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help='Verify requests per path')
+        parser.add_argument('--gateway-latency', type=float, default=0.5, help='Seconds the stub waits per call')
+        parser.add_argument('--sync-workers', type=int, default=8,
+                            help='Threads serving the sync path, like WSGI worker threads')
+        parser.add_argument('--concurrency', type=int, default=200, help='In-flight requests on the async path')
+        parser.add_argument('--payments', type=int, default=50, help='Sample payments verified round robin')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        results = {}
+        # Requests run on other threads and connections, so the sample data is
+        # committed and deleted afterwards instead of rolled back
+        with StubChapaGateway(latency=options['gateway_latency'], default_outcome='pending') as stub, \
+                stub.settings(), override_settings(
+                    ALLOWED_HOSTS=['testserver'],
+                    CHAPA_ASYNC_BULKHEAD_SIZE=options['concurrency'],
+                    CHAPA_ASYNC_MAX_CONNECTIONS=options['concurrency'],
+                    CHAPA_BULKHEAD_SIZE=options['sync_workers'],
+                    CHAPA_POOL_SIZE=options['sync_workers'],
+                ):
+            get_user_model().objects.filter(username__startswith=f'{PREFIX}-').delete()
+            try:
+                guest = build_sample_graph(options['payments'], prefix=PREFIX)
+                tx_refs = list(Payment.objects.filter(user=guest).values_list('tx_ref', flat=True))
+                for tx_ref in tx_refs:
+                    stub.handle_initialize({'tx_ref': tx_ref, 'amount': '200.00'})
+                _, key = ApiToken.issue(guest, name=PREFIX)
+                auth = f'Token {key}'
+
+                paths = (
+                    ('sync', 'payment-verify-payment', self.run_sync, options['sync_workers']),
+                    ('async', 'async-payment-verify', self.run_async, options['concurrency']),
+                )
+                for name, url_name, run, concurrency in paths:
+                    try:
+                        urls = [reverse(url_name, kwargs={'tx_ref': tx_ref}) for tx_ref in tx_refs]
+                    except NoReverseMatch:
+                        self.stdout.write(self.style.WARNING(f'{name}: {url_name} not routed, skipped'))
+                        continue
+                    stub.reset_counters()
+                    started = time.perf_counter()
+                    latencies, errors = run(urls, auth, options['requests'], concurrency)
+                    elapsed = time.perf_counter() - started
+                    results[name] = dict(
+                        summarize(latencies, elapsed, errors=errors),
+                        concurrency=concurrency,
+                        peak_gateway_in_flight=stub.peak_in_flight,
+                    )
+                    self.report(name, results[name])
+            finally:
+                get_user_model().objects.filter(username__startswith=f'{PREFIX}-').delete()
+
+        if not results:
+            raise CommandError('No payment verify route found')
+        if 'sync' in results and 'async' in results:
+            speedup = results['async']['requests_per_second'] / results['sync']['requests_per_second']
+            self.stdout.write(f'async sustains {speedup:.1f}x the sync throughput')
+
+        if options['output']:
+            save_results(options['output'], {
+                'meta': run_metadata(
+                    requests=options['requests'],
+                    gateway_latency=options['gateway_latency'],
+                    sync_workers=options['sync_workers'],
+                    concurrency=options['concurrency'],
+                ),
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_sync(self, urls, auth, count, workers):
+        """``count`` requests through the sync view on ``workers`` threads"""
+        def call(i):
+            started = time.perf_counter()
+            response = Client().get(urls[i % len(urls)], HTTP_AUTHORIZATION=auth)
+            return time.perf_counter() - started, response.status_code
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(call, range(count)))
+        return [latency for latency, _ in outcomes], sum(code >= 400 for _, code in outcomes)
+
+    def run_async(self, urls, auth, count, concurrency):
+        """``count`` requests through the async view on one event loop, ``concurrency`` at a time"""
+        async def main():
+            client = AsyncClient()
+            slots = asyncio.Semaphore(concurrency)
+
+            async def call(i):
+                async with slots:
+                    started = time.perf_counter()
+                    response = await client.get(urls[i % len(urls)], headers={'Authorization': auth})
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(call(i) for i in range(count)))
+
+        outcomes = asyncio.run(main())
+        return [latency for latency, _ in outcomes], sum(code >= 400 for _, code in outcomes)
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:6} concurrency {result['concurrency']:4}  p50 {result['p50_ms']:8.1f}ms  "
+            f"p95 {result['p95_ms']:8.1f}ms  {result['requests_per_second']:8.1f} req/s  "
+            f"peak gateway calls {result['peak_gateway_in_flight']:4}  {result['errors']} errors"
+        )
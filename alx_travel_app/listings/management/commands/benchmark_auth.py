@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.request import Request
+from listings.authentication import CachedTokenAuthentication, forget_token
+from listings.benchmarking import measure, rolled_back, run_metadata, save_results
+from listings.models import ApiToken
+from listings.query_budget import build_sample_graph
+import base64
+
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-request cost of Basic auth (password hashing) and cached API tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scheme')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        results = {}
+
+        with rolled_back():
+            # Hashed with the configured PASSWORD_HASHERS, as in production
+            user = build_sample_graph(1, prefix='auth-bench')
+            user.set_password(PASSWORD)
+            user.save()
+            token, key = ApiToken.issue(user, name='auth-bench')
+
+            credentials = base64.b64encode(f'{user.username}:{PASSWORD}'.encode()).decode()
+            basic = factory.get('/', HTTP_AUTHORIZATION=f'Basic {credentials}')
+            bearer = factory.get('/', HTTP_AUTHORIZATION=f'Token {key}')
+
+            def authenticate(authenticator, request):
+                return authenticator.authenticate(Request(request))
+
+            def token_cold(i):
+                forget_token(token.key_hash)
+                return authenticate(CachedTokenAuthentication(), bearer)
+
+            cases = {
+                'basic': lambda i: authenticate(BasicAuthentication(), basic),
+                'token-cold': token_cold,
+                'token-warm': lambda i: authenticate(CachedTokenAuthentication(), bearer),
+            }
+            for name, call in cases.items():
+                results[name] = measure(call, options['iterations'], warmup=3,
+                                        ok=lambda result: result is not None and result[0].pk == user.pk)
+                self.report(name, results[name])
+            forget_token(token.key_hash)
+
+        speedup = results['basic']['mean_ms'] / max(results['token-warm']['mean_ms'], 1e-6)
+        self.stdout.write(f'cached token auth is {speedup:.0f}x cheaper than Basic auth per request')
+
+        if options['output']:
+            save_results(options['output'], {
+                'meta': run_metadata(iterations=options['iterations']),
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:10}  mean {result['mean_ms'] * 1000:10.1f}us  p95 {result['p95_ms'] * 1000:10.1f}us  "
+            f"{result['queries_per_request']:4} queries/request  {result['errors']} errors"
+        )
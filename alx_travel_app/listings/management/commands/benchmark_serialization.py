@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from listings.benchmarking import measure, rolled_back, run_metadata, save_results
+from listings.fastpaths import FastJSONRenderer, get_plan
+from listings.models import Listing, Booking
+from listings.query_budget import build_sample_graph
+from listings.serializers import ListingSerializer, BookingSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare list serialization through DRF serializers and the values() fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--iterations', type=int, default=5, help='Measured runs per size and path')
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['rows'])
+        cases = [
+            ('listings', Listing.objects.order_by('-created_at', '-id'), ListingSerializer),
+            ('bookings', Booking.objects.select_related('listing').order_by('-created_at', '-id'), BookingSerializer),
+        ]
+        results = {}
+
+        with rolled_back():
+            self.stdout.write(f'Creating {sizes[-1]} listings and bookings...')
+            build_sample_graph(sizes[-1], prefix='serialize')
+
+            for name, queryset, serializer_class in cases:
+                plan = get_plan(serializer_class)
+                for size in sizes:
+                    instances = list(queryset[:size])
+                    values = list(plan.values(queryset[:size]))
+
+                    # Serialization alone, on rows already fetched, then fetch + serialize
+                    paths = {
+                        'drf': lambda i: JSONRenderer().render(serializer_class(instances, many=True).data),
+                        'fast': lambda i: FastJSONRenderer().render(plan.represent(values)),
+                        'drf-e2e': lambda i: JSONRenderer().render(serializer_class(queryset[:size], many=True).data),
+                        'fast-e2e': lambda i: FastJSONRenderer().render(plan.represent(plan.values(queryset[:size]))),
+                    }
+                    if paths['drf'](0) != paths['fast'](0):
+                        raise CommandError(f'{name} x {size}: fast path output differs from the serializer')
+
+                    key = f'{name}-{size}'
+                    for path, call in paths.items():
+                        results[f'{key}-{path}'] = measure(call, options['iterations'], warmup=2)
+                    self.report(key, results)
+
+        if options['output']:
+            save_results(options['output'], {
+                'meta': run_metadata(iterations=options['iterations'], rows=sizes),
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, key, results):
+        line = [f'{key:>16}']
+        for suffix, label in (('', 'serialize'), ('-e2e', 'fetch+serialize')):
+            drf = results[f'{key}-drf{suffix}']['mean_ms']
+            fast = results[f'{key}-fast{suffix}']['mean_ms']
+            line.append(f'{label} drf {drf:9.1f}ms fast {fast:8.1f}ms {drf / fast:5.1f}x')
+        self.stdout.write('  '.join(line))
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from celery import current_app
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from listings import tasks
+from listings.benchmarking import rolled_back, run_metadata, save_results
+from listings.gateway_stub import StubChapaGateway
+from listings.models import Payment, WebhookEvent
+from listings.query_budget import build_sample_graph
+from listings.task_results import purge_expired_results
+import time
+
+RESULT_TABLE = TaskResult._meta.db_table
+
+
+@contextmanager
+def eager_results(store_all):
+    """Run tasks inline, storing results like a worker; ``store_all`` restores the old keep-everything policy"""
+    conf = current_app.conf
+    always_eager = conf.task_always_eager
+    # Tasks copy these from the config when bound, so they are set per task
+    saved = {name: (task.ignore_result, task.store_eager_result) for name, task in current_app.tasks.items()}
+    conf.task_always_eager = True
+    for task in current_app.tasks.values():
+        task.store_eager_result = True
+        if store_all:
+            task.ignore_result = False
+        # apply_async caches ignore_result in the task's exec options
+        task._exec_options = None
+    try:
+        yield
+    finally:
+        conf.task_always_eager = always_eager
+        for name, (ignore_result, store_eager_result) in saved.items():
+            current_app.tasks[name].ignore_result = ignore_result
+            current_app.tasks[name].store_eager_result = store_eager_result
+            current_app.tasks[name]._exec_options = None
+
+
+def is_write(sql):
+    return sql.lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')
+
+
+class Command(BaseCommand):
+    help = 'Measure result-table writes per payment flow under store-everything and per-task result policies'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=200, help='Payment flows (webhook, verify, email) to run')
+        parser.add_argument('--periodic-runs', type=int, default=20,
+                            help='Runs of each periodic task (reconcile, aggregates, email flush)')
+        parser.add_argument('--purge-rows', type=int, default=20000, help='Expired result rows to purge')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        results = {}
+        overrides = override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+        with StubChapaGateway(default_outcome='success') as stub, stub.settings(), overrides:
+            for name, store_all in (('store-all', True), ('per-task', False)):
+                with rolled_back(), eager_results(store_all):
+                    results[name] = self.run_workload(options)
+                self.report(name, results[name])
+
+        before, after = results['store-all']['result_writes'], results['per-task']['result_writes']
+        if before:
+            self.stdout.write(f'result table writes cut by {(1 - after / before) * 100:.1f}% '
+                              f'({before} -> {after})')
+
+        with rolled_back():
+            results['purge'] = self.run_purge(options['purge_rows'], options['batch_size'])
+        purge = results['purge']
+        self.stdout.write(
+            f"purge: {purge['deleted']} expired rows in {purge['batches']} batches of {options['batch_size']}, "
+            f"slowest batch {purge['slowest_batch_ms']:.1f}ms, {purge['elapsed_s']:.2f}s total"
+        )
+
+        if options['output']:
+            save_results(options['output'], {
+                'meta': run_metadata(payments=options['payments'], periodic_runs=options['periodic_runs']),
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_workload(self, options):
+        guest = build_sample_graph(options['payments'], prefix='task-results')
+        payments = list(Payment.objects.filter(user=guest))
+        rows_before = TaskResult.objects.count()
+
+        with CaptureQueriesContext(connection) as captured:
+            for payment in payments:
+                event = WebhookEvent.objects.create(
+                    tx_ref=payment.tx_ref, event_id=f'{payment.tx_ref}-success', status='success',
+                    payload={'tx_ref': payment.tx_ref, 'status': 'success'},
+                )
+                # Applies the webhook, then queues verify_payment_status
+                tasks.process_webhook_event.delay(str(event.id))
+                tasks.send_payment_confirmation_email.delay(str(payment.id), guest.email)
+            for _ in range(options['periodic_runs']):
+                tasks.reconcile_pending_payments.delay()
+                tasks.refresh_listing_aggregates.delay()
+                tasks.flush_confirmation_emails.delay()
+
+        writes = [query['sql'] for query in captured.captured_queries if is_write(query['sql'])]
+        result_writes = sum(RESULT_TABLE in sql for sql in writes)
+        return {
+            # Webhook, verify and email per payment, plus the periodic tasks
+            'task_runs': len(payments) * 3 + options['periodic_runs'] * 3,
+            'writes': len(writes),
+            'result_writes': result_writes,
+            'result_rows': TaskResult.objects.count() - rows_before,
+            'result_write_share': round(result_writes / len(writes), 3) if writes else 0.0,
+        }
+
+    def run_purge(self, rows, batch_size):
+        TaskResult.objects.bulk_create([
+            TaskResult(task_id=f'purge-bench-{i}', task_name='listings.tasks.verify_payment_status', status='SUCCESS')
+            for i in range(rows)
+        ], batch_size=1000)
+        # date_done is auto_now; age the rows afterwards
+        TaskResult.objects.filter(task_id__startswith='purge-bench-').update(
+            date_done=timezone.now() - timedelta(days=30))
+
+        started = time.perf_counter()
+        stats = purge_expired_results(batch_size=batch_size, max_batches=rows // batch_size + 1)
+        stats['elapsed_s'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:9}  {result['task_runs']:5} task runs  {result['writes']:6} writes  "
+            f"{result['result_writes']:5} to {RESULT_TABLE} ({result['result_write_share'] * 100:.1f}%)  "
+            f"{result['result_rows']:5} rows kept"
+        )
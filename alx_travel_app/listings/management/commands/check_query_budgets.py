@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import NoReverseMatch
+from rest_framework.test import APIClient
+from listings.benchmarking import rolled_back
+from listings.query_budget import (
+    QUERY_BUDGETS, QueryBudgetExceeded, budget_endpoints, build_sample_graph, query_budget,
+)
+
+
+class Command(BaseCommand):
+    help = 'Assert that API endpoints stay within their SQL query budgets at every page size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=60, help='Sample rows per model')
+        parser.add_argument(
+            '--page-sizes', default='1,10,50',
+            help='Comma separated page sizes; query counts must not vary between them'
+        )
+
+    def handle(self, *args, **options):
+        page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        failures = []
+
+        # Sample data is discarded once the checks have run
+        with rolled_back(), override_settings(ALLOWED_HOSTS=['testserver']):
+            guest = build_sample_graph(options['rows'])
+            client = APIClient()
+            client.force_authenticate(user=guest)
+
+            for name, path, params in self.get_endpoints():
+                failures.extend(self.check_endpoint(client, name, path, params, page_sizes))
+
+        if failures:
+            raise CommandError('Query budget exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All endpoints are within their query budgets'))
+
+    def get_endpoints(self):
+        # Every budget must be checked; an unrouted endpoint is a failure, not a skip
+        try:
+            return budget_endpoints()
+        except NoReverseMatch as e:
+            raise CommandError(f"Budgeted endpoint is not routed: {str(e)}")
+
+    def check_endpoint(self, client, name, path, params, page_sizes):
+        budget = QUERY_BUDGETS[name]
+        # Detail views are not paginated, so one request is enough
+        sizes = page_sizes if params is not None else [None]
+        counts = []
+
+        for size in sizes:
+            query = dict(params or {})
+            if size is not None:
+                query['page_size'] = size
+            try:
+                with query_budget(budget, label=name) as captured:
+                    response = client.get(path, query)
+            except QueryBudgetExceeded as exc:
+                return [str(exc)]
+
+            if response.status_code != 200:
+                return [f'{name}: HTTP {response.status_code}']
+            counts.append(len(captured))
+
+        self.stdout.write(f'{name}: {counts} queries (budget {budget})')
+        if len(set(counts)) > 1:
+            return [f'{name}: query count grows with page size {dict(zip(sizes, counts))}']
+        return []
@@ -0,0 +1,49 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from listings.exports import (
+    BOOKING_EXPORT_FIELDS, CONTENT_TYPES, PAYMENT_EXPORT_FIELDS, export_lines, filter_export,
+)
+from listings.models import Booking, Payment
+import sys
+
+EXPORTS = {
+    'payments': (Payment, PAYMENT_EXPORT_FIELDS),
+    'bookings': (Booking, BOOKING_EXPORT_FIELDS),
+}
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'Invalid date {value!r}, expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Stream payments or bookings to a file as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(EXPORTS))
+        parser.add_argument('--output-format', choices=sorted(CONTENT_TYPES), default='ndjson')
+        parser.add_argument('--start', type=_date, help='First creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', type=_date, help='Last creation date to include (YYYY-MM-DD)')
+        parser.add_argument('--status', action='append', help='Only rows with this status; repeatable')
+        parser.add_argument('--output', help='Write to this path instead of stdout')
+        parser.add_argument('--chunk-size', type=int, help='Rows per database round trip (default EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        model, fields = EXPORTS[options['model']]
+        queryset = filter_export(
+            model.objects.all(), start=options['start'], end=options['end'], statuses=options['status']
+        )
+        lines = export_lines(queryset, fields, options['output_format'], options['chunk_size'])
+
+        if not options['output']:
+            for chunk in lines:
+                sys.stdout.write(chunk)
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as handle:
+            for chunk in lines:
+                handle.write(chunk)
+        self.stderr.write(f"{options['model']} written to {options['output']}")
@@ -0,0 +1,70 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from listings.gateway import get_client
+from listings.gateway_stub import StubChapaGateway
+from listings.resilience import GatewayUnavailable
+import requests
+import time
+
+
+class Command(BaseCommand):
+    help = 'Drive the Chapa client against a faulty stub and show the circuit breaker and bulkhead at work'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Verify calls per phase')
+        parser.add_argument('--concurrency', type=int, default=20, help='Callers while the gateway is faulty')
+        parser.add_argument('--fault-status', type=int, default=None, help='Inject this status instead of a hang')
+        parser.add_argument('--fault-delay', type=float, default=2.0, help='Seconds the faulty gateway hangs')
+        parser.add_argument('--read-timeout', type=float, default=0.5)
+        parser.add_argument('--recovery-timeout', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        overrides = override_settings(
+            CHAPA_READ_TIMEOUT=options['read_timeout'],
+            CHAPA_MAX_RETRIES=0,
+            CHAPA_BREAKER_RECOVERY_TIMEOUT=options['recovery_timeout'],
+        )
+        with StubChapaGateway() as stub, stub.settings(), overrides:
+            stub.handle_initialize({'tx_ref': 'drill', 'amount': '1'})
+            self.phase('healthy', options, concurrency=get_client().bulkhead.max_concurrent)
+
+            stub.inject_fault(status=options['fault_status'], delay=0 if options['fault_status'] else options['fault_delay'])
+            self.phase('faulty', options, concurrency=options['concurrency'])
+            if get_client().breaker.state != 'open':
+                raise CommandError('The circuit did not open while the gateway was failing')
+
+            stub.clear_fault()
+            time.sleep(options['recovery_timeout'])
+            self.phase('recovered', options, concurrency=get_client().bulkhead.max_concurrent)
+            if get_client().breaker.state != 'closed':
+                raise CommandError('The circuit did not close after the gateway recovered')
+
+        self.stdout.write(self.style.SUCCESS('Circuit opened under faults and closed after recovery'))
+
+    def phase(self, name, options, concurrency):
+        client = get_client()
+
+        def call(_):
+            started = time.perf_counter()
+            try:
+                outcome = str(client.verify('drill').status_code)
+            except GatewayUnavailable as e:
+                outcome = f'refused ({e.reason})'
+            except requests.exceptions.RequestException as e:
+                outcome = type(e).__name__
+            return outcome, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(call, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        outcomes = Counter(outcome for outcome, _ in results)
+        slowest = max(duration for _, duration in results)
+        summary = ', '.join(f'{count} {outcome}' for outcome, count in outcomes.most_common())
+        self.stdout.write(
+            f'{name:>9}: {summary}; slowest call {slowest * 1000:.0f}ms, phase {elapsed:.2f}s, '
+            f'circuit {client.breaker.state}'
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from alx_travel_app.schema import read_schema, schema_file, write_schema
+
+
+class Command(BaseCommand):
+    help = 'Precompute the OpenAPI schema served at /swagger.json, /swagger.yaml and /swagger/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help='Schema path (default: SCHEMA_FILE)')
+        parser.add_argument('--check', action='store_true', help='Fail if the saved schema is missing or stale')
+
+    def handle(self, *args, **options):
+        path = options['output'] or schema_file()
+
+        if options['check']:
+            if read_schema(path) is None:
+                raise CommandError(f'{path} is missing or out of date; run generate_schema')
+            self.stdout.write(self.style.SUCCESS(f'{path} is up to date'))
+            return
+
+        fingerprint = write_schema(path)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path} (sources {fingerprint[:12]})'))
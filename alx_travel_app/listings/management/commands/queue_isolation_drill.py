@@ -0,0 +1,136 @@
+from contextlib import ExitStack
+from threading import Event, Lock
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from listings.benchmarking import percentile, run_metadata, save_results
+from listings.worker_profiles import get_profile
+import time
+
+# Stand-ins for the real tasks, routed like them (listings.tasks.<name>)
+PAYMENT_TASK = 'verify_payment_status'
+EMAIL_TASK = 'flush_confirmation_emails'
+
+
+class Command(BaseCommand):
+    help = 'Load test on an in-memory broker: payment task wait behind a slow email burst, shared vs dedicated queues'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=48, help='Email tasks in the burst')
+        parser.add_argument('--payments', type=int, default=40, help='Payment verifications queued after it')
+        parser.add_argument('--smtp-latency', type=float, default=1.0, help='Seconds per email task')
+        parser.add_argument('--gateway-latency', type=float, default=0.05, help='Seconds per payment task')
+        parser.add_argument('--prefetch-multiplier', type=int, default=4,
+                            help="Used by every drill worker instead of the profiles' own")
+        parser.add_argument('--output', help='Write results as JSON to this path')
+
+    def handle(self, *args, **options):
+        # On the memory transport a worker whose prefetch window is full only
+        # fetches again after its 2s drain timeout (Redis workers are woken at
+        # once), so all drill workers share one roomier multiplier
+        prefetch = options['prefetch_multiplier']
+        dedicated = [(name, get_profile(name, prefetch_multiplier=prefetch)) for name in ('payments', 'emails')]
+        # Same number of worker slots both ways
+        slots = sum(profile['concurrency'] for _, profile in dedicated)
+        phases = {
+            'shared': [('shared', dict(queues=[settings.CELERY_TASK_DEFAULT_QUEUE], concurrency=slots,
+                                       prefetch_multiplier=prefetch))],
+            'dedicated': dedicated,
+        }
+
+        results = {}
+        for phase, workers in phases.items():
+            results[phase] = self.run_phase(workers, routed=phase == 'dedicated', options=options)
+            self.report(phase, workers, results[phase])
+
+        shared_p95, dedicated_p95 = (results[phase]['payment_wait_p95_s'] for phase in ('shared', 'dedicated'))
+        if dedicated_p95 >= options['smtp_latency']:
+            raise CommandError('Payment tasks still waited behind emails on dedicated queues')
+        self.stdout.write(self.style.SUCCESS(
+            f'Payment wait p95 {shared_p95:.2f}s on a shared queue, {dedicated_p95:.3f}s on its own queue'))
+
+        if options['output']:
+            save_results(options['output'], {
+                'meta': run_metadata(**{key: options[key] for key in
+                                        ('emails', 'payments', 'smtp_latency', 'gateway_latency',
+                                         'prefetch_multiplier')}),
+                'results': results,
+            })
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def build_app(self, routed, options):
+        """A Celery app on the memory broker with the project's queues, and routes unless shared"""
+        app = Celery('queue-drill', broker='memory://', backend='cache+memory://', set_as_current=False)
+        app.conf.update(
+            task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+            task_queues=settings.CELERY_TASK_QUEUES,
+            task_routes={
+                name.replace('listings.tasks.', 'drill.'): route
+                for name, route in settings.CELERY_TASK_ROUTES.items()
+            } if routed else None,
+            task_ignore_result=True,
+            # The memory transport polls; its 1s default would dwarf the waits measured
+            broker_transport_options={'polling_interval': 0.01},
+        )
+        waits = {PAYMENT_TASK: [], EMAIL_TASK: []}
+        lock = Lock()
+        done = Event()
+        expected = options['payments'] + options['emails']
+
+        def run(name, latency):
+            # Not shared: each phase's app must run its own stand-ins
+            @app.task(name=f'drill.{name}', shared=False)
+            def stand_in(enqueued_at):
+                wait = time.time() - enqueued_at
+                time.sleep(latency)
+                with lock:
+                    waits[name].append(wait)
+                    if sum(map(len, waits.values())) == expected:
+                        done.set()
+            return stand_in
+
+        tasks = {
+            PAYMENT_TASK: run(PAYMENT_TASK, options['gateway_latency']),
+            EMAIL_TASK: run(EMAIL_TASK, options['smtp_latency']),
+        }
+        return app, tasks, waits, done
+
+    def run_phase(self, workers, routed, options):
+        app, tasks, waits, done = self.build_app(routed, options)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for name, profile in workers:
+                stack.enter_context(start_worker(
+                    app, pool='threads', concurrency=profile['concurrency'], queues=profile['queues'],
+                    prefetch_multiplier=profile['prefetch_multiplier'], hostname=f'{name}@drill',
+                    perform_ping_check=False, shutdown_timeout=30,
+                ))
+            # The email burst is already queued when bookings' verifications arrive
+            for _ in range(options['emails']):
+                tasks[EMAIL_TASK].delay(time.time())
+            for _ in range(options['payments']):
+                tasks[PAYMENT_TASK].delay(time.time())
+
+            timeout = options['emails'] * options['smtp_latency'] + options['payments'] * options['gateway_latency']
+            if not done.wait(timeout + 30):
+                raise CommandError('The workers did not finish the load in time')
+        elapsed = time.perf_counter() - started
+
+        payment_waits, email_waits = waits[PAYMENT_TASK], waits[EMAIL_TASK]
+        return {
+            'payment_wait_p50_s': round(percentile(payment_waits, 50), 3),
+            'payment_wait_p95_s': round(percentile(payment_waits, 95), 3),
+            'payment_wait_max_s': round(max(payment_waits), 3),
+            'email_wait_p95_s': round(percentile(email_waits, 95), 3),
+            'elapsed_s': round(elapsed, 2),
+        }
+
+    def report(self, phase, workers, result):
+        layout = ', '.join(f"{name} {'+'.join(profile['queues'])} x{profile['concurrency']}"
+                           for name, profile in workers)
+        self.stdout.write(
+            f"{phase:>9} ({layout}): payment wait p50 {result['payment_wait_p50_s']:.3f}s "
+            f"p95 {result['payment_wait_p95_s']:.3f}s max {result['payment_wait_max_s']:.3f}s; "
+            f"email wait p95 {result['email_wait_p95_s']:.2f}s; {result['elapsed_s']:.1f}s total"
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from listings.analytics import rebuild_aggregates, verify_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily occupancy/revenue aggregates from the raw tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Check the aggregates against the raw tables afterwards')
+        parser.add_argument('--verify-only', action='store_true', help='Only check, do not rebuild')
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            stats = rebuild_aggregates()
+            self.stdout.write(
+                f"Rebuilt {stats['rows']} daily rows for {stats['listings']} listings "
+                f"(watermark {stats['updated_through']})"
+            )
+
+        if options['verify'] or options['verify_only']:
+            mismatches = verify_aggregates()
+            if mismatches:
+                raise CommandError('Aggregates disagree with the raw tables:\n' + '\n'.join(mismatches))
+            self.stdout.write(self.style.SUCCESS('Aggregates match the raw tables'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from listings.reconciliation import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Verify stale pending payments against Chapa and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None, help='Minutes a payment must have been pending')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--rate-limit', type=float, default=None, help='Maximum gateway requests per second')
+        parser.add_argument('--max-age', type=int, default=None, help='Minutes after which a pending payment is expired')
+
+    def handle(self, *args, **options):
+        older_than = options['older_than']
+        max_age = options['max_age']
+        stats = reconcile_pending_payments(
+            older_than=timedelta(minutes=older_than) if older_than is not None else None,
+            batch_size=options['batch_size'],
+            max_workers=options['workers'],
+            rate_limit=options['rate_limit'],
+            max_age=timedelta(minutes=max_age) if max_age is not None else None,
+        )
+
+        for key, value in stats.items():
+            self.stdout.write(f'{key}: {value}')
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from listings.db_router import PRIMARY, begin_request, end_request, get_replicas
+from listings.models import ApiToken, Booking, Payment
+from listings.query_budget import build_sample_graph
+from listings.tasks import verify_payment_status
+import time
+
+PREFIX = 'replica-drill'
+
+
+class Command(BaseCommand):
+    help = 'Show reads going to a replica, sticking to the primary after a write, and tasks reading the primary'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pin-seconds', type=float, default=1.0,
+                            help='DATABASE_PIN_SECONDS for the drill; the drill waits this long once')
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('No DATABASE_REPLICAS configured')
+        if len(replicas) != 1 or any(connections[alias].vendor != 'sqlite' for alias in (PRIMARY, replicas[0])):
+            raise CommandError('The drill needs one SQLite replica of a SQLite primary, which it snapshots')
+        self.replica = replicas[0]
+
+        # Replication is simulated with SQLite backups: the replica only sees
+        # writes made before the last replicate(), i.e. it lags behind
+        overrides = override_settings(ALLOWED_HOSTS=['testserver'], DATABASE_PIN_SECONDS=options['pin_seconds'])
+        with overrides:
+            get_user_model().objects.filter(username__startswith=f'{PREFIX}-').delete()
+            try:
+                self.run_drill(options['pin_seconds'])
+            finally:
+                get_user_model().objects.filter(username__startswith=f'{PREFIX}-').delete()
+                self.replicate()
+
+        self.stdout.write(self.style.SUCCESS('Reads used the replica, stuck to the primary after writes, '
+                                             'and tasks read the primary'))
+
+    def run_drill(self, pin_seconds):
+        guest = build_sample_graph(1, prefix=PREFIX)
+        booking = Booking.objects.filter(user=guest).first()
+        writer, other = Client(), Client()
+        for client in (writer, other):
+            _, key = ApiToken.issue(guest, name=PREFIX)
+            client.defaults['HTTP_AUTHORIZATION'] = f'Token {key}'
+        self.replicate()
+
+        self.expect('browse listings', writer.get, reverse('listing-list'), status=200, database=self.replica)
+
+        check_in = timezone.now().date() + timedelta(days=400)
+        response = self.expect('create booking', writer.post, reverse('booking-list'), {
+            'listing_id': str(booking.listing_id),
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=2)).isoformat(),
+        }, content_type='application/json', status=201, database=PRIMARY)
+        detail = reverse('booking-detail', kwargs={'pk': response.json()['id']})
+
+        # Not replicated yet: the writer is pinned and sees it, another client does not
+        self.expect('writer reads it back', writer.get, detail, status=200, database=PRIMARY)
+        self.expect('other client, lagging replica', other.get, detail, status=404, database=self.replica)
+
+        time.sleep(pin_seconds)
+        self.expect('writer after the pin window', writer.get, detail, status=404, database=self.replica)
+        self.replicate()
+        self.expect('writer after replication', writer.get, detail, status=200, database=self.replica)
+
+        # A task started from a request that reads the replica still reads the primary
+        payment = Payment.objects.create(
+            booking=booking, user=guest, amount=200, status='success',
+            customer_email=guest.email, customer_first_name='Drill', customer_last_name='Guest',
+        )
+        token = begin_request(False)
+        try:
+            with CaptureQueriesContext(connections[self.replica]) as replica_queries:
+                found = verify_payment_status.apply(args=[str(payment.id)]).get() is not False
+        finally:
+            end_request(token)
+        self.report('verify_payment_status task', found and not replica_queries, PRIMARY if found else self.replica)
+
+    def expect(self, label, method, url, *args, status, database, **kwargs):
+        with CaptureQueriesContext(connections[PRIMARY]) as primary_queries, \
+                CaptureQueriesContext(connections[self.replica]) as replica_queries:
+            response = method(url, *args, **kwargs)
+        # Writes and credential checks use the primary; which one served the resource is the question
+        served = self.replica if replica_queries else PRIMARY
+        self.report(label, response.status_code == status and served == database, served,
+                    f'{response.status_code}, {len(primary_queries)} primary / {len(replica_queries)} replica queries')
+        return response
+
+    def report(self, label, ok, served, detail=''):
+        line = f'{label:>32}: read {served}' + (f' ({detail})' if detail else '')
+        if not ok:
+            raise CommandError(f'{line}, not as expected')
+        self.stdout.write(line)
+
+    def replicate(self):
+        """Copy the primary into the replica, like replication catching up"""
+        connections[PRIMARY].ensure_connection()
+        connections[self.replica].ensure_connection()
+        connections[PRIMARY].connection.backup(connections[self.replica].connection)
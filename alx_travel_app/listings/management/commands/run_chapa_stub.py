@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from listings.gateway_stub import StubChapaGateway
+
+
+class Command(BaseCommand):
+    help = 'Run a local stub of the Chapa API for offline development and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+        parser.add_argument(
+            '--outcome', default='success', choices=['success', 'failed', 'pending'],
+            help='Status reported when verifying an initialized transaction'
+        )
+        parser.add_argument('--fault-status', type=int, help='Answer faulty requests with this HTTP status')
+        parser.add_argument('--fault-delay', type=float, default=0.0, help='Seconds added to faulty requests')
+        parser.add_argument('--fault-rate', type=float, default=1.0, help='Share of requests that are faulty')
+
+    def handle(self, *args, **options):
+        stub = StubChapaGateway(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            default_outcome=options['outcome'],
+            fault_status=options['fault_status'],
+            fault_delay=options['fault_delay'],
+            fault_rate=options['fault_rate'],
+        )
+
+        self.stdout.write('Stub Chapa gateway running. Point the app at it with:')
+        self.stdout.write(f'  CHAPA_API_URL={stub.initialize_url}')
+        self.stdout.write(f'  CHAPA_VERIFY_URL={stub.verify_url}')
+
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping stub gateway')
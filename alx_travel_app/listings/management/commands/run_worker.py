@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from listings.worker_profiles import profile_names, worker_argv
+
+
+class Command(BaseCommand):
+    help = 'Start a Celery worker for a named profile from WORKER_PROFILES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', help=f"One of: {', '.join(profile_names())}")
+        parser.add_argument('--concurrency', type=int, help="Override the profile's concurrency")
+        parser.add_argument('--loglevel', default='INFO')
+        parser.add_argument('--print', action='store_true', dest='print_only',
+                            help='Print the equivalent celery command line instead of starting the worker')
+
+    def handle(self, *args, **options):
+        try:
+            argv = worker_argv(options['profile'], loglevel=options['loglevel'], concurrency=options['concurrency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['print_only']:
+            self.stdout.write(' '.join(['celery', '-A', 'alx_travel_app'] + argv))
+            return
+
+        from alx_travel_app.celery import app
+        app.worker_main(argv)
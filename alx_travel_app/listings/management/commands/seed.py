@@ -1,13 +1,47 @@
 import random
-from django.core.management.base import BaseCommand
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from listings.models import User, Listing, Booking, Review
+from listings.synthetic import DEFAULT_AS_OF, SyntheticDataGenerator
 
 
 class Command(BaseCommand):
     help = 'Seed the database with sample data for ALX Travel App'
     
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=0,
+            help='Generate a synthetic dataset instead of the sample data; '
+                 '1 unit = 1,000 users, 50 listings and 2,000 bookings'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed, same data')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create chunk')
+        parser.add_argument(
+            '--as-of', type=date.fromisoformat, default=None,
+            help=f'Date the synthetic dataset treats as today (YYYY-MM-DD, default {DEFAULT_AS_OF})'
+        )
+    
     def handle(self, *args, **options):
+        if options['scale']:
+            generator = SyntheticDataGenerator(
+                scale=options['scale'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                stdout=self.stdout,
+                as_of=options['as_of'],
+            )
+            try:
+                counts = generator.run()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                'Generated ' + ', '.join(f'{count} {name}' for name, count in counts.items())
+            ))
+            return
+        
+        from listings.models import User, Listing, Booking, Review
+        from listings.pricing import quote_stay
+        
         self.stdout.write('Seeding database...')
         
         # Clear existing data
@@ -133,7 +167,7 @@ class Command(BaseCommand):
             listing = listings[i % len(listings)]
             check_in = timezone.now().date() + timedelta(days=30 * (i + 1))
             check_out = check_in + timedelta(days=random.randint(2, 7))
-            total_price = (check_out - check_in).days * listing.price_per_night
+            total_price = quote_stay(listing, check_in, check_out)
             
             booking = Booking.objects.create(
                 user=guest,
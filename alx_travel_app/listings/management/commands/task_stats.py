@@ -0,0 +1,50 @@
+from datetime import datetime, timezone as dt_timezone
+from django.core.management.base import BaseCommand
+from listings import task_metrics
+
+
+class Command(BaseCommand):
+    help = 'Summarize Celery task queue wait, run time, retries, failures and queue depth'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample', action='store_true', help='Read queue depths from the broker now')
+        parser.add_argument('--reset', action='store_true', help='Clear the collected task stats')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            task_metrics.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Task stats cleared'))
+            return
+
+        if options['sample']:
+            task_metrics.sample_queue_depths()
+
+        self.stdout.write(
+            f"{'task':50} {'ok':>7} {'failed':>7} {'retried':>7} "
+            f"{'wait p50':>9} {'wait p95':>9} {'run mean':>9} {'run p95':>9}"
+        )
+        for name in task_metrics.task_names():
+            summary = task_metrics.task_summary(name)
+            wait, runtime = summary['wait'], summary['runtime']
+            self.stdout.write(
+                f"{name:50} {summary['succeeded']:>7} {summary['failed']:>7} {summary['retried']:>7} "
+                f"{self.seconds(wait['p50'], wait['count']):>9} {self.seconds(wait['p95'], wait['count']):>9} "
+                f"{self.seconds(runtime['mean'], runtime['count']):>9} "
+                f"{self.seconds(runtime['p95'], runtime['count']):>9}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write('Percentiles are bucket upper bounds.')
+        for queue, sample in task_metrics.queue_summary().items():
+            if sample['depth'] is None:
+                self.stdout.write(f'queue {queue}: not sampled yet (run with --sample)')
+                continue
+            sampled_at = datetime.fromtimestamp(sample['sampled_at'], tz=dt_timezone.utc)
+            self.stdout.write(f"queue {queue}: {sample['depth']} waiting (sampled {sampled_at:%Y-%m-%d %H:%M:%S} UTC)")
+
+    def seconds(self, value, count):
+        if not count:
+            return '-'
+        if value == float('inf'):
+            return '>300s'
+        return f'{value:.3f}s'
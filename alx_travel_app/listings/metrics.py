@@ -0,0 +1,171 @@
+from bisect import bisect_left
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+import math
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def snapshot(self, **labels):
+        state = self._values.get(self._key(labels))
+        return dict(state, buckets=list(state['buckets'])) if state else None
+
+    def _render_sample(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['buckets']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class Registry:
+    """
+    Process-local metric registry rendered in the Prometheus text format.
+
+    Each web or worker process keeps its own values; scrape every process
+    (or aggregate in Prometheus) for fleet-wide numbers. ``collectors`` are
+    callables returning extra exposition lines, for metrics kept elsewhere.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector):
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, restricted to METRICS_ALLOWED_IPS"""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if '*' not in allowed and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,88 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from .db_router import begin_request, end_request, pin_client, reads_primary
+from .instrumentation import instrument_request, record_request
+import time
+
+
+class PerformanceMiddleware:
+    """
+    Measure SQL, payment gateway and serializer time for every request.
+
+    The breakdown is returned in a ``Server-Timing`` header (visible in
+    browser dev tools) and aggregated into histograms served by the metrics
+    endpoint. Place it first in MIDDLEWARE so ``total`` covers the stack.
+    It works sync and async, so under ASGI async views stay on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        with instrument_request() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with instrument_request() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unresolved'
+        record_request(timings, total, view, request.method)
+
+        response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+
+class ReadYourWritesMiddleware:
+    """
+    Route this request's reads with PrimaryReplicaRouter (listings/db_router.py).
+
+    Safe requests read a replica unless their client wrote within
+    DATABASE_PIN_SECONDS; a request that writes pins its client (by
+    Authorization header or session cookie) to the primary for that long.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = begin_request(reads_primary(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = end_request(token)
+        if wrote:
+            pin_client(request)
+        return response
+
+    async def __acall__(self, request):
+        # The pin lives in the cache; look it up off the event loop
+        token = begin_request(await sync_to_async(reads_primary)(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = end_request(token)
+        if wrote:
+            await sync_to_async(pin_client)(request)
+        return response
@@ -1,8 +1,64 @@
 from django.db import models
 from django.conf import settings
+from datetime import timedelta
+from decimal import Decimal
+from hashlib import sha256
+import secrets
 import uuid
 from django.utils import timezone
 
+class Listing(models.Model):
+    """Property listing offered by a host"""
+    PROPERTY_TYPE_CHOICES = [
+        ('apartment', 'Apartment'),
+        ('house', 'House'),
+        ('villa', 'Villa'),
+        ('condo', 'Condo'),
+        ('cabin', 'Cabin'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='listings')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    property_type = models.CharField(max_length=20, choices=PROPERTY_TYPE_CHOICES, default='apartment')
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    max_guests = models.IntegerField(default=1)
+    bedrooms = models.IntegerField(default=1)
+    bathrooms = models.IntegerField(default=1)
+    address = models.CharField(max_length=255)
+    city = models.CharField(max_length=100)
+    country = models.CharField(max_length=100)
+    amenities = models.JSONField(default=list, blank=True)
+    # Pricing rules applied when the nightly rate calendar has no entry
+    weekend_multiplier = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal('1.00'))
+    weekly_discount = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('0.00'))
+    monthly_discount = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('0.00'))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['city', 'max_guests']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} ({self.city})"
+
+class NightlyRate(models.Model):
+    """Price of one night at a listing, overriding its base and weekend pricing"""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='nightly_rates')
+    date = models.DateField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'date'], name='unique_nightly_rate'),
+        ]
+    
+    def __str__(self):
+        return f"{self.listing_id} {self.date}: {self.price}"
+
 class Booking(models.Model):
     """Booking model (assuming it exists)"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -25,6 +81,22 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Statuses that hold the dates; cancelled and completed stays free them
+    BLOCKING_STATUSES = ('pending', 'confirmed')
+    
+    class Meta:
+        indexes = [
+            # Sorted by check_out so an overlap probe only scans bookings that
+            # end after the requested check-in, not the listing's whole history
+            models.Index(
+                fields=['listing', 'check_out', 'check_in'],
+                name='booking_listing_period_idx',
+                condition=models.Q(status__in=['pending', 'confirmed']),
+            ),
+            # Keyset pagination of a user's bookings, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='booking_user_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Booking {self.id} - {self.user.email}"
 
@@ -84,6 +156,8 @@ class Payment(models.Model):
             models.Index(fields=['tx_ref']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            # Keyset pagination of a user's payments, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='payment_user_created_idx'),
         ]
     
     def __str__(self):
@@ -94,38 +168,151 @@ class Payment(models.Model):
         if not self.tx_ref:
             self.tx_ref = f"TRX-{uuid.uuid4().hex[:12].upper()}-{int(timezone.now().timestamp())}"
         
-        # Update booking status if payment is successful
-        if self.status == 'success' and self.booking.status != 'confirmed':
-            self.booking.status = 'confirmed'
-            self.booking.save()
-        
         super().save(*args, **kwargs)
+        
+        # Confirm the booking without loading it; already-confirmed rows are not rewritten
+        if self.status == 'success' and self.booking_id:
+            Booking.objects.filter(pk=self.booking_id).exclude(status='confirmed').update(
+                status='confirmed', updated_at=timezone.now()
+            )
     
     def mark_as_paid(self, transaction_id=None, payment_date=None):
-        """Mark payment as successful"""
-        self.status = 'success'
-        if transaction_id:
-            self.chapa_transaction_id = transaction_id
-        if payment_date:
-            self.payment_date = payment_date
-        else:
-            self.payment_date = timezone.now()
-        self.save()
-        
-        # Update booking status
-        self.booking.status = 'confirmed'
-        self.booking.save()
-        
-        # Trigger confirmation email
-        from .tasks import send_payment_confirmation_email
-        send_payment_confirmation_email.delay(
-            payment_id=str(self.id),
-            user_email=self.customer_email
-        )
+        """Mark payment as successful; returns False if it was no longer pending"""
+        from .transitions import mark_paid
+        return mark_paid(self, transaction_id=transaction_id, payment_date=payment_date)
     
     def mark_as_failed(self, error_message=None):
-        """Mark payment as failed"""
-        self.status = 'failed'
-        if error_message:
-            self.error_message = error_message
-        self.save()
\ No newline at end of file
+        """Mark payment as failed; returns False if it was no longer pending"""
+        from .transitions import mark_failed
+        return mark_failed(self, error_message=error_message)
+
+class WebhookEvent(models.Model):
+    """Raw payment gateway webhook, stored on receipt and applied by a Celery task"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tx_ref = models.CharField(max_length=100)
+    event_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            # Gateway retries of the same event collapse onto one row
+            models.UniqueConstraint(fields=['tx_ref', 'event_id'], name='unique_webhook_event'),
+        ]
+    
+    def __str__(self):
+        return f"Webhook {self.tx_ref} - {self.event_id}"
+    
+    @staticmethod
+    def event_id_from(payload):
+        """Stable identifier for a webhook delivery, falling back to its status"""
+        return str(
+            payload.get('id')
+            or payload.get('reference')
+            or payload.get('event')
+            or payload.get('status')
+            or ''
+        )[:100]
+
+class ConfirmationEmail(models.Model):
+    """Payment confirmation email waiting to be sent by the batching pipeline"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name='confirmation_email')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a flush claims the row for sending
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Confirmation for {self.payment_id} to {self.recipient} - {self.status}"
+
+class ListingDailyStats(models.Model):
+    """Materialized occupancy and revenue of one listing on one night (see listings/analytics.py)"""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    occupied_nights = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'date'], name='unique_listing_daily_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.listing_id} {self.date}: {self.occupied_nights} night(s), {self.revenue}"
+
+class StaleListingStats(models.Model):
+    """
+    Listing whose daily stats must be recomputed because one of its bookings
+    or payments was deleted; deletes leave no updated_at to find them by.
+    """
+    listing_id = models.UUIDField(primary_key=True)
+    marked_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.listing_id} stale since {self.marked_at}"
+
+class AggregateWatermark(models.Model):
+    """How far an incrementally refreshed aggregate has caught up with its sources"""
+    name = models.CharField(max_length=50, primary_key=True)
+    updated_through = models.DateTimeField()
+    refreshed_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} through {self.updated_through}"
+
+class ApiToken(models.Model):
+    """
+    API credential issued once at login (see listings/authentication.py).
+
+    Only a SHA-256 of the key is stored. Keys are 256 random bits, so a fast
+    hash is as safe as a slow one and authenticating costs no PBKDF2.
+    """
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    prefix = models.CharField(max_length=8, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.prefix}... for {self.user_id}"
+    
+    @staticmethod
+    def hash_key(key):
+        return sha256(key.encode()).hexdigest()
+    
+    @classmethod
+    def issue(cls, user, name='', ttl=None):
+        """Create a token for ``user`` valid for ``ttl`` seconds (None: until revoked); returns (token, key)"""
+        key = secrets.token_urlsafe(32)
+        expires_at = timezone.now() + timedelta(seconds=ttl) if ttl else None
+        token = cls.objects.create(
+            key_hash=cls.hash_key(key), prefix=key[:8], user=user, name=name, expires_at=expires_at
+        )
+        return token, key
+    
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
@@ -0,0 +1,133 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+import uuid
+
+
+class CreatedAtKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    Each page is a range scan on the composite (user, -created_at, -id)
+    index that starts at the cursor, so page N costs the same as page 1 and
+    no COUNT(*) is issued. The OR of the cursor predicate is not an index
+    bound by itself, so it is paired with a redundant created_at bound.
+    """
+    page_size = getattr(settings, 'API_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            created_at, pk, reverse = None, None, False
+        else:
+            created_at, pk, reverse = cursor
+
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+            if created_at is not None:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+                    created_at__gte=created_at,
+                )
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+            if created_at is not None:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                    created_at__lte=created_at,
+                )
+
+        # Fetch one extra row to learn whether another page exists
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            raw = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            created_at, pk, direction = raw.split('|')
+            if direction not in ('f', 'r'):
+                raise ValueError(direction)
+            # A malformed id would only fail later, inside the query
+            return datetime.fromisoformat(created_at), uuid.UUID(pk), direction == 'r'
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse=False):
+        raw = f"{self._value(row, 'created_at').isoformat()}|{self._value(row, 'id')}|{'r' if reverse else 'f'}"
+        encoded = urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @staticmethod
+    def _value(row, name):
+        # Rows may be model instances or .values() dicts
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
@@ -0,0 +1,10 @@
+from rest_framework import permissions
+
+
+class IsHostOrReadOnly(permissions.BasePermission):
+    """Anyone authenticated may read a listing; only its host may change or delete it"""
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return obj.host_id == request.user.pk
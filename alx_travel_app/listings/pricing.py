@@ -0,0 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from .models import NightlyRate
+import numpy as np
+
+
+def to_cents(value):
+    return int((Decimal(value) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def to_basis_points(value):
+    return int((Decimal(value) * 10000).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def _apply_rate(cents, basis_points):
+    """cents * basis_points / 10000, rounded half up, elementwise"""
+    return (cents * basis_points + 5000) // 10000
+
+
+def quote_matrix(listings, stays):
+    """
+    Price every stay at every listing in one pass.
+
+    ``listings`` are Listing instances, ``stays`` (check_in, check_out)
+    pairs. Nights are priced from the listing's NightlyRate calendar, or
+    from price_per_night times weekend_multiplier on Friday and Saturday
+    nights when the calendar has no rate; the stay subtotal then gets the
+    weekly or monthly length-of-stay discount. Returns integer cent arrays:
+    ``nights`` (stays), ``subtotal``, ``discount`` and ``total``
+    (listings x stays).
+    """
+    listings = list(listings)
+    stays = list(stays)
+    start = min(check_in for check_in, _ in stays)
+    days = max((check_out - start).days for _, check_out in stays)
+    index = {listing.pk: i for i, listing in enumerate(listings)}
+
+    # Base rate for every listing and night of the window, weekend-adjusted
+    base = np.array([to_cents(listing.price_per_night) for listing in listings], dtype=np.int64)
+    multiplier = np.array([to_basis_points(listing.weekend_multiplier) for listing in listings], dtype=np.int64)
+    weekdays = (np.arange(days) + start.weekday()) % 7
+    weekend = np.isin(weekdays, getattr(settings, 'PRICING_WEEKEND_NIGHTS', (4, 5)))
+    nightly = np.where(weekend[None, :], _apply_rate(base, multiplier)[:, None], base[:, None])
+
+    # Calendar rates replace the computed ones
+    rates = NightlyRate.objects.filter(
+        listing__in=list(index), date__gte=start, date__lt=start + timedelta(days=days)
+    ).values_list('listing_id', 'date', 'price')
+    rows = [(index[listing_id], (date - start).days, to_cents(price)) for listing_id, date, price in rates]
+    if rows:
+        rows = np.array(rows, dtype=np.int64)
+        nightly[rows[:, 0], rows[:, 1]] = rows[:, 2]
+
+    # Stay subtotals as differences of the running total
+    running = np.zeros((len(listings), days + 1), dtype=np.int64)
+    np.cumsum(nightly, axis=1, out=running[:, 1:])
+    starts = np.array([(check_in - start).days for check_in, _ in stays], dtype=np.int64)
+    ends = np.array([(check_out - start).days for _, check_out in stays], dtype=np.int64)
+    subtotal = running[:, ends] - running[:, starts]
+    nights = ends - starts
+
+    weekly = np.array([to_basis_points(listing.weekly_discount / 100) for listing in listings], dtype=np.int64)
+    monthly = np.array([to_basis_points(listing.monthly_discount / 100) for listing in listings], dtype=np.int64)
+    discount_rate = np.where(
+        nights[None, :] >= getattr(settings, 'PRICING_MONTHLY_NIGHTS', 28), monthly[:, None],
+        np.where(nights[None, :] >= getattr(settings, 'PRICING_WEEKLY_NIGHTS', 7), weekly[:, None], 0),
+    )
+    discount = _apply_rate(subtotal, discount_rate)
+
+    return {
+        'nights': nights,
+        'subtotal': subtotal,
+        'discount': discount,
+        'total': subtotal - discount,
+    }
+
+
+def quote_listings(listings, check_in, check_out):
+    """Quotes for one stay across many listings, as JSON-ready dicts"""
+    listings = list(listings)
+    if not listings:
+        return []
+
+    matrix = quote_matrix(listings, [(check_in, check_out)])
+    nights = int(matrix['nights'][0])
+    return [
+        {
+            'listing_id': str(listing.pk),
+            'title': listing.title,
+            'city': listing.city,
+            'nights': nights,
+            'subtotal': str(from_cents(matrix['subtotal'][i, 0])),
+            'discount': str(from_cents(matrix['discount'][i, 0])),
+            'total': str(from_cents(matrix['total'][i, 0])),
+        }
+        for i, listing in enumerate(listings)
+    ]
+
+
+def quote_stay(listing, check_in, check_out):
+    """Server-side total price of one stay"""
+    return from_cents(quote_matrix([listing], [(check_in, check_out)])['total'][0, 0])
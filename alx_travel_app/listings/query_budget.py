@@ -0,0 +1,112 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import Listing, Booking, Payment
+
+# Maximum SQL queries per request for each endpoint, keyed by URL name.
+# Authentication is forced in the harness, so these cover only the view.
+QUERY_BUDGETS = {
+    'listing-list': 1,
+    'listing-detail': 1,
+    'listing-available': 1,
+    # Available listings, then their calendar rates
+    'listing-quotes': 2,
+    'booking-list': 1,
+    'booking-detail': 1,
+    'payment-list': 1,
+    'payment-detail': 1,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block runs more SQL queries than its budget allows"""
+
+
+@contextmanager
+def query_budget(budget, using='default', label='block'):
+    """Fail if the wrapped block issues more than ``budget`` queries"""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+
+    if len(captured) > budget:
+        statements = '\n'.join(query['sql'] for query in captured.captured_queries)
+        raise QueryBudgetExceeded(
+            f"{label} ran {len(captured)} queries (budget {budget}):\n{statements}"
+        )
+
+
+def budget_endpoints():
+    """
+    (URL name, path, query params) for every QUERY_BUDGETS entry, using rows
+    from build_sample_graph; params is None for unpaginated detail views.
+    Raises NoReverseMatch when a budgeted endpoint is not routed.
+    """
+    listing = Listing.objects.order_by('created_at').first()
+    booking = Booking.objects.order_by('created_at').first()
+    payment = Payment.objects.order_by('created_at').first()
+    check_in = booking.check_out
+    stay = {'check_in': check_in, 'check_out': check_in + (booking.check_out - booking.check_in)}
+
+    samples = {
+        'listing-list': ((), {}),
+        'listing-detail': ((listing.pk,), None),
+        'listing-available': ((), stay),
+        'listing-quotes': ((), stay),
+        'booking-list': ((), {}),
+        'booking-detail': ((booking.pk,), None),
+        'payment-list': ((), {}),
+        'payment-detail': ((payment.pk,), None),
+    }
+    return [
+        (name, reverse(name, args=samples[name][0]), samples[name][1])
+        for name in QUERY_BUDGETS
+    ]
+
+
+def build_sample_graph(size, prefix='budget'):
+    """Create ``size`` listings, bookings and payments owned by one guest"""
+    User = get_user_model()
+    host = User.objects.create_user(username=f'{prefix}-host', email=f'{prefix}-host@example.com')
+    guest = User.objects.create_user(username=f'{prefix}-guest', email=f'{prefix}-guest@example.com')
+    today = timezone.now().date()
+
+    listings = Listing.objects.bulk_create([
+        Listing(
+            host=host,
+            title=f'Sample listing {i}',
+            price_per_night=Decimal('100.00'),
+            max_guests=4,
+            address=f'{i} Sample Street',
+            city='Sample City',
+            country='Nowhere',
+        )
+        for i in range(size)
+    ])
+    bookings = Booking.objects.bulk_create([
+        Booking(
+            user=guest,
+            listing=listing,
+            check_in=today + timedelta(days=i * 3),
+            check_out=today + timedelta(days=i * 3 + 2),
+            total_price=Decimal('200.00'),
+        )
+        for i, listing in enumerate(listings)
+    ])
+    Payment.objects.bulk_create([
+        Payment(
+            booking=booking,
+            user=guest,
+            tx_ref=f'{prefix.upper()}-{i}',
+            amount=booking.total_price,
+            customer_email=guest.email,
+            customer_first_name='Sample',
+            customer_last_name='Guest',
+        )
+        for i, booking in enumerate(bookings)
+    ])
+    return guest
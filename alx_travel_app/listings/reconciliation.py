@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Payment
+from .gateway import get_client
+from .transitions import bulk_mark_failed, bulk_mark_paid
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second"""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def fetch_gateway_status(client, limiter, payment):
+    """Ask Chapa for one payment's status; returns (payment, status, transaction_id)"""
+    limiter.acquire()
+    try:
+        response = client.verify(payment['tx_ref'])
+        response_data = response.json()
+    except Exception as e:
+        logger.warning(f"Reconciliation lookup failed for {payment['tx_ref']}: {str(e)}")
+        return payment, None, None
+
+    if response.status_code == 200 and response_data.get('status') == 'success':
+        transaction_data = response_data['data']
+        return payment, transaction_data.get('status'), transaction_data.get('id')
+    return payment, None, None
+
+
+def expire_abandoned(expire_before):
+    """Expire pending payments created before ``expire_before``; returns the number changed"""
+    return Payment.objects.filter(status='pending', created_at__lt=expire_before).update(
+        status='expired',
+        error_message='Checkout abandoned',
+        updated_at=timezone.now(),
+    )
+
+
+def pending_batches(cutoff, batch_size, not_before=None):
+    """Yield pages of pending payments created between ``not_before`` and ``cutoff``, oldest first"""
+    last = None
+    fields = ('id', 'tx_ref', 'booking_id', 'customer_email', 'created_at')
+
+    while True:
+        queryset = Payment.objects.filter(status='pending', created_at__lt=cutoff).order_by('created_at', 'id')
+        if not_before is not None:
+            queryset = queryset.filter(created_at__gte=not_before)
+        if last is not None:
+            queryset = queryset.filter(
+                Q(created_at__gt=last['created_at']) | Q(created_at=last['created_at'], id__gt=last['id'])
+            )
+
+        batch = list(queryset.values(*fields)[:batch_size])
+        if not batch:
+            return
+        last = batch[-1]
+        yield batch
+
+
+def reconcile_pending_payments(older_than=None, batch_size=None, max_workers=None, rate_limit=None, client=None,
+                               max_age=None):
+    """
+    Verify stale pending payments against Chapa and apply the outcomes.
+
+    Payments are read in keyset pages, looked up concurrently on a bounded
+    thread pool under a requests-per-second limit, and written back with
+    one bulk UPDATE per outcome per page. The pool never outgrows the
+    client's bulkhead, which would refuse the extra lookups.
+
+    Payments older than ``max_age`` are expired instead of looked up, so
+    abandoned checkouts leave the working set once they have had every
+    sweep between ``older_than`` and ``max_age`` to settle.
+    """
+    older_than = older_than or timedelta(minutes=getattr(settings, 'PAYMENT_RECONCILE_AFTER_MINUTES', 15))
+    batch_size = batch_size or getattr(settings, 'PAYMENT_RECONCILE_BATCH_SIZE', 200)
+    max_workers = max_workers or getattr(settings, 'PAYMENT_RECONCILE_WORKERS', 8)
+    if rate_limit is None:
+        rate_limit = getattr(settings, 'PAYMENT_RECONCILE_RATE_LIMIT', 20)
+    max_age = max_age or timedelta(minutes=getattr(
+        settings, 'PAYMENT_RECONCILE_MAX_AGE_MINUTES', getattr(settings, 'CHAPA_CHECKOUT_TTL', 3600) // 60 + 60
+    ))
+
+    client = client or get_client()
+    max_workers = min(max_workers, client.bulkhead.max_concurrent)
+    limiter = RateLimiter(rate_limit)
+    now = timezone.now()
+    cutoff = now - older_than
+    expire_before = now - max_age
+    stats = {'processed': 0, 'succeeded': 0, 'failed': 0, 'unchanged': 0, 'errors': 0, 'expired': 0}
+    started = time.monotonic()
+
+    stats['expired'] = expire_abandoned(expire_before)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for batch in pending_batches(cutoff, batch_size, not_before=expire_before):
+            results = list(executor.map(lambda payment: fetch_gateway_status(client, limiter, payment), batch))
+
+            paid = [(payment, transaction_id) for payment, status, transaction_id in results if status == 'success']
+            failed = [payment for payment, status, _ in results if status == 'failed']
+
+            errors = sum(1 for _, status, _ in results if status is None)
+
+            succeeded = len(bulk_mark_paid(paid)) if paid else 0
+            marked_failed = bulk_mark_failed(
+                [payment['id'] for payment in failed], 'Payment verification failed'
+            ) if failed else 0
+
+            stats['processed'] += len(batch)
+            stats['succeeded'] += succeeded
+            stats['failed'] += marked_failed
+            stats['errors'] += errors
+            stats['unchanged'] += len(batch) - succeeded - marked_failed - errors
+
+    elapsed = time.monotonic() - started
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['throughput_per_second'] = round(stats['processed'] / elapsed, 2) if elapsed else 0.0
+
+    logger.info(
+        f"Reconciled {stats['processed']} pending payments in {stats['elapsed_seconds']}s "
+        f"({stats['throughput_per_second']}/s): {stats['succeeded']} paid, "
+        f"{stats['failed']} failed, {stats['errors']} lookup errors, {stats['expired']} expired"
+    )
+    return stats
@@ -0,0 +1,185 @@
+from requests.exceptions import RequestException
+from .metrics import REGISTRY
+import asyncio
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    'gateway_circuit_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ['breaker'])
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'gateway_circuit_transitions_total', 'Circuit breaker state changes', ['breaker', 'state'])
+GATEWAY_REJECTIONS = REGISTRY.counter(
+    'gateway_rejections_total', 'Gateway calls refused without being sent', ['breaker', 'reason'])
+BULKHEAD_IN_USE = REGISTRY.gauge(
+    'gateway_bulkhead_in_use', 'Gateway calls currently in flight', ['bulkhead'])
+
+
+class GatewayUnavailable(RequestException):
+    """
+    The call was refused locally: the circuit is open or the bulkhead is full.
+
+    A RequestException, so code already handling gateway errors treats it
+    as one; ``retry_after`` is a hint in seconds for the client.
+    """
+
+    def __init__(self, reason, retry_after=1):
+        super().__init__(f'Payment gateway unavailable ({reason})')
+        self.reason = reason
+        self.retry_after = max(int(retry_after + 0.999), 1)
+
+
+class CircuitBreaker:
+    """
+    Fail fast once a dependency keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    every call is refused for ``recovery_timeout`` seconds. It then goes
+    half-open: up to ``half_open_max_calls`` probe calls are let through,
+    and ``success_threshold`` successes close it again while any failure
+    reopens it. State is per process, like the metrics.
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1,
+                 success_threshold=1, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.success_threshold = success_threshold
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.successes = 0
+        self.probes = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], breaker=name)
+
+    def _transition(self, state):
+        # Call with the lock held
+        if state == self.state:
+            return
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        self.failures = self.successes = self.probes = 0
+        self.opened_at = self.clock() if state == OPEN else None
+        CIRCUIT_STATE.set(STATE_VALUES[state], breaker=self.name)
+        CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
+
+    def _retry_after(self):
+        return self.recovery_timeout - (self.clock() - self.opened_at)
+
+    def check(self):
+        """Raise GatewayUnavailable if the circuit is open, without using up a probe"""
+        with self._lock:
+            if self.state == OPEN and self._retry_after() > 0:
+                GATEWAY_REJECTIONS.inc(breaker=self.name, reason='open')
+                raise GatewayUnavailable('circuit open', self._retry_after())
+
+    def acquire(self):
+        """Admit one call or raise GatewayUnavailable; pair with record_success/record_failure, or release"""
+        with self._lock:
+            if self.state == OPEN:
+                if self._retry_after() > 0:
+                    GATEWAY_REJECTIONS.inc(breaker=self.name, reason='open')
+                    raise GatewayUnavailable('circuit open', self._retry_after())
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_max_calls:
+                    GATEWAY_REJECTIONS.inc(breaker=self.name, reason='half_open')
+                    raise GatewayUnavailable('circuit half-open', self.recovery_timeout)
+                self.probes += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.successes += 1
+                self.probes -= 1
+                if self.successes >= self.success_threshold:
+                    self._transition(CLOSED)
+            else:
+                self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN)
+            elif self.state == CLOSED:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._transition(OPEN)
+
+    def release(self):
+        """Hand back an admitted call that was never sent; it says nothing about the gateway"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.probes:
+                self.probes -= 1
+
+    def reset(self):
+        with self._lock:
+            self._transition(CLOSED)
+
+
+class Bulkhead:
+    """
+    Cap the number of concurrent calls to a dependency.
+
+    Callers wait at most ``max_wait`` seconds for a slot and are refused
+    after that, so a slow gateway ties up ``max_concurrent`` threads at
+    most instead of every web worker.
+    """
+
+    def __init__(self, name, max_concurrent=5, max_wait=0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        BULKHEAD_IN_USE.set(0, bulkhead=name)
+
+    def acquire(self):
+        acquired = self._slots.acquire(timeout=self.max_wait) if self.max_wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            GATEWAY_REJECTIONS.inc(breaker=self.name, reason='bulkhead')
+            raise GatewayUnavailable('too many concurrent gateway calls')
+        BULKHEAD_IN_USE.inc(bulkhead=self.name)
+
+    def release(self):
+        BULKHEAD_IN_USE.dec(bulkhead=self.name)
+        self._slots.release()
+
+
+class AsyncBulkhead(Bulkhead):
+    """Bulkhead for coroutines: an asyncio semaphore, so waiting takes no thread"""
+
+    def __init__(self, name, max_concurrent=200, max_wait=0.0):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._slots = asyncio.BoundedSemaphore(max_concurrent)
+        BULKHEAD_IN_USE.set(0, bulkhead=name)
+
+    async def acquire(self):
+        try:
+            if self.max_wait:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            elif self._slots.locked():
+                raise asyncio.TimeoutError
+            else:
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            GATEWAY_REJECTIONS.inc(breaker=self.name, reason='bulkhead')
+            raise GatewayUnavailable('too many concurrent gateway calls')
+        BULKHEAD_IN_USE.inc(bulkhead=self.name)
+
+
+def is_failure(response):
+    """Responses that count against the breaker: the gateway itself erroring"""
+    return response.status_code >= 500
@@ -1,13 +1,26 @@
 from rest_framework import serializers
+from django.contrib.auth import authenticate
 from .models import Booking, Payment, Listing
+from django.conf import settings
 from django.utils import timezone
+from datetime import timedelta
+from .instrumentation import timed
+from .pricing import quote_stay
 
-class ListingSerializer(serializers.ModelSerializer):
+class TimedRepresentationMixin:
+    """Attribute rendering time to the request's serializer timing"""
+    
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+class ListingSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Listing
         fields = '__all__'
+        read_only_fields = ['host']
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     listing = ListingSerializer(read_only=True)
     listing_id = serializers.UUIDField(write_only=True)
     
@@ -15,12 +28,52 @@ class BookingSerializer(serializers.ModelSerializer):
         model = Booking
         fields = '__all__'
         read_only_fields = ['user', 'status', 'created_at', 'updated_at']
+        extra_kwargs = {'total_price': {'required': False}}
+    
+    def validate(self, attrs):
+        """
+        Price the stay server-side; a client-supplied total_price must match it.
+        
+        Existing bookings keep the price they were made at unless the listing
+        or dates change, so later rate changes never rewrite a booking that
+        may already be paid.
+        """
+        instance = self.instance
+        listing_id = attrs.get('listing_id', getattr(instance, 'listing_id', None))
+        check_in = attrs.get('check_in', getattr(instance, 'check_in', None))
+        check_out = attrs.get('check_out', getattr(instance, 'check_out', None))
+        
+        if check_out <= check_in:
+            raise serializers.ValidationError({'check_out': 'check_out must be after check_in'})
+        
+        stay_changed = instance is None or (listing_id, check_in, check_out) != (
+            instance.listing_id, instance.check_in, instance.check_out
+        )
+        if not stay_changed:
+            if 'total_price' in attrs and attrs['total_price'] != instance.total_price:
+                raise serializers.ValidationError(
+                    {'total_price': f'Expected {instance.total_price} for this stay'}
+                )
+            attrs.pop('total_price', None)
+            return attrs
+        
+        listing = Listing.objects.filter(pk=listing_id).first()
+        if listing is None:
+            raise serializers.ValidationError({'listing_id': 'Listing not found'})
+        
+        price = quote_stay(listing, check_in, check_out)
+        if 'total_price' in attrs and attrs['total_price'] != price:
+            raise serializers.ValidationError(
+                {'total_price': f'Expected {price} for this stay'}
+            )
+        attrs['total_price'] = price
+        return attrs
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     booking = BookingSerializer(read_only=True)
     booking_id = serializers.UUIDField(write_only=True)
     
@@ -33,6 +86,60 @@ class PaymentSerializer(serializers.ModelSerializer):
             'error_message', 'retry_count'
         ]
 
+class AvailabilitySearchSerializer(serializers.Serializer):
+    check_in = serializers.DateField(required=True)
+    check_out = serializers.DateField(required=True)
+    guests = serializers.IntegerField(required=False, min_value=1, default=1)
+    city = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, attrs):
+        """Validate that the stay is at least one night"""
+        if attrs['check_out'] <= attrs['check_in']:
+            raise serializers.ValidationError("check_out must be after check_in")
+        return attrs
+
+class QuoteSearchSerializer(AvailabilitySearchSerializer):
+    listing = serializers.ListField(child=serializers.UUIDField(), required=False)
+
+class AnalyticsRangeSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    
+    def validate(self, attrs):
+        """Default to the last 30 days and cap the range"""
+        end = attrs.get('end') or timezone.now().date()
+        start = attrs.get('start') or end - timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError("start must not be after end")
+        max_days = getattr(settings, 'ANALYTICS_MAX_DAYS', 366)
+        if (end - start).days + 1 > max_days:
+            raise serializers.ValidationError(f"range is limited to {max_days} days")
+        return {'start': start, 'end': end}
+
+class ExportFilterSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    status = serializers.ListField(child=serializers.CharField(), required=False)
+    
+    def validate(self, attrs):
+        """Validate that the range is not reversed"""
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+class TokenObtainSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    password = serializers.CharField(trim_whitespace=False, write_only=True)
+    name = serializers.CharField(required=False, allow_blank=True, max_length=100)
+    
+    def validate(self, attrs):
+        """Validate the credentials; the one password hash of the token's lifetime"""
+        user = authenticate(self.context.get('request'), username=attrs['username'], password=attrs['password'])
+        if user is None or not user.is_active:
+            raise serializers.ValidationError("Unable to log in with the provided credentials")
+        attrs['user'] = user
+        return attrs
+
 class PaymentInitiateSerializer(serializers.Serializer):
     booking_id = serializers.UUIDField(required=True)
     phone_number = serializers.CharField(required=False, allow_blank=True)
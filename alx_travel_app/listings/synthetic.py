@@ -0,0 +1,294 @@
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from .models import Listing, Booking, Payment
+import math
+import random
+import sys
+import uuid
+
+CITIES = [
+    ('Addis Ababa', 'Ethiopia'), ('Nairobi', 'Kenya'), ('Lagos', 'Nigeria'),
+    ('Cape Town', 'South Africa'), ('Accra', 'Ghana'), ('Kigali', 'Rwanda'),
+    ('Cairo', 'Egypt'), ('Marrakesh', 'Morocco'), ('Zanzibar', 'Tanzania'),
+    ('New York', 'USA'), ('Miami', 'USA'), ('Los Angeles', 'USA'),
+    ('Denver', 'USA'), ('London', 'UK'), ('Paris', 'France'), ('Lisbon', 'Portugal'),
+]
+# Big cities get most of the inventory
+CITY_WEIGHTS = [1 / (rank + 1) for rank in range(len(CITIES))]
+
+PROPERTY_TYPES = ['apartment', 'house', 'villa', 'condo', 'cabin']
+PROPERTY_WEIGHTS = [45, 25, 8, 15, 7]
+
+AMENITIES = ['WiFi', 'Kitchen', 'Air conditioning', 'TV', 'Parking', 'Pool', 'Gym', 'Balcony', 'Garden', 'BBQ']
+
+# Length of stay in nights and how often it occurs
+STAY_LENGTHS = [1, 2, 3, 4, 5, 6, 7, 10, 14, 28]
+STAY_WEIGHTS = [14, 22, 18, 12, 8, 6, 10, 4, 4, 2]
+
+FIRST_NAMES = ['Abebe', 'Alice', 'Bob', 'Carol', 'Dawit', 'Eve', 'Fatima', 'Hana', 'John', 'Maria', 'Sara', 'Yonas']
+LAST_NAMES = ['Bekele', 'Brown', 'Davis', 'Garcia', 'Haile', 'Johnson', 'Miller', 'Smith', 'Tesfaye', 'Wilson']
+
+USERS_PER_UNIT = 1000
+LISTINGS_PER_UNIT = 50
+BOOKINGS_PER_UNIT = 2000
+HOST_SHARE = 0.1
+HISTORY_DAYS = 730
+FUTURE_DAYS = 180
+# The generator's "today": a fixed anchor, so a seed yields the same rows on any day
+DEFAULT_AS_OF = date(2026, 1, 1)
+# Bookings are made at least this long before "now", leaving room for their payment
+PAYMENT_WINDOW = timedelta(hours=2)
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let generated created_at/updated_at values through auto_now(_add)"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class SyntheticDataGenerator:
+    """
+    Deterministic, production-shaped data for capacity planning.
+
+    Rows are produced in ``batch_size`` chunks and written with
+    ``bulk_create``; only compact per-listing state (price, capacity and the
+    next free date) is kept between chunks, so memory stays bounded however
+    many bookings are generated. The same ``seed`` and ``as_of`` date always
+    yield the same dataset; no generated timestamp is later than ``as_of``.
+    """
+
+    def __init__(self, scale=1, seed=42, batch_size=5000, stdout=None, as_of=None):
+        self.scale = scale
+        self.seed = seed
+        self.batch_size = batch_size
+        self.stdout = stdout or sys.stdout
+        self.rng = random.Random(seed)
+        self.today = as_of or DEFAULT_AS_OF
+        self.now = self.aware(datetime.combine(self.today, dt_time(hour=12)))
+        self.prefix = f'seed{seed}'
+
+    def run(self):
+        User = get_user_model()
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise ValueError(f'Data for seed {self.seed} already exists; use another --seed or an empty database')
+
+        counts = {}
+        with manual_timestamps(Listing, Booking, Payment):
+            counts['users'] = self.generate_users()
+            counts['listings'] = self.generate_listings()
+            counts['bookings'], counts['payments'] = self.generate_bookings()
+        return counts
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def progress(self, label, done, total):
+        self.stdout.write(f'{label}: {done}/{total} ({done * 100 // max(total, 1)}%)')
+
+    def chunks(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def generate_users(self):
+        User = get_user_model()
+        total = int(USERS_PER_UNIT * self.scale)
+        # Hashing is deliberately slow; every synthetic user shares one hash
+        password = make_password('password123')
+
+        for start, size in self.chunks(total):
+            users = []
+            for n in range(start, start + size):
+                first_name = self.rng.choice(FIRST_NAMES)
+                last_name = self.rng.choice(LAST_NAMES)
+                users.append(User(
+                    username=f'{self.prefix}-user{n:08d}',
+                    email=f'{first_name.lower()}.{last_name.lower()}.{n}@{self.prefix}.example.com',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password,
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.batch_size)
+            self.progress('users', start + size, total)
+
+        self.user_ids = array('q', User.objects.filter(
+            username__startswith=f'{self.prefix}-'
+        ).order_by('username').values_list('id', flat=True).iterator(chunk_size=self.batch_size))
+        self.host_count = max(1, int(len(self.user_ids) * HOST_SHARE))
+        return len(self.user_ids)
+
+    def generate_listings(self):
+        total = max(1, int(LISTINGS_PER_UNIT * self.scale))
+        self.listing_ids = []
+        self.listing_prices = array('d')
+        self.listing_guests = array('i')
+        # Day offset (from the start of the history window) each listing is free from
+        self.listing_free_from = array('i')
+
+        for start, size in self.chunks(total):
+            listings = []
+            for n in range(start, start + size):
+                city, country = self.rng.choices(CITIES, CITY_WEIGHTS)[0]
+                property_type = self.rng.choices(PROPERTY_TYPES, PROPERTY_WEIGHTS)[0]
+                bedrooms = self.rng.choices([1, 2, 3, 4, 5], [30, 35, 20, 10, 5])[0]
+                # Nightly prices are roughly log-normal around 100 with a long luxury tail
+                price = min(max(math.exp(self.rng.gauss(4.6, 0.55)) * (1 + 0.2 * (bedrooms - 1)), 15), 5000)
+                price = round(price, 2)
+                created = self.random_datetime(-HISTORY_DAYS - 365, -HISTORY_DAYS)
+                listing = Listing(
+                    id=self.uuid(),
+                    host_id=self.user_ids[self.rng.randrange(self.host_count)],
+                    title=f'{property_type.title()} in {city} #{n}',
+                    description=f'Synthetic {bedrooms} bedroom {property_type} in {city}.',
+                    property_type=property_type,
+                    price_per_night=Decimal(f'{price:.2f}'),
+                    max_guests=bedrooms * 2,
+                    bedrooms=bedrooms,
+                    bathrooms=max(1, bedrooms - self.rng.randint(0, 1)),
+                    address=f'{self.rng.randint(1, 999)} Synthetic Street',
+                    city=city,
+                    country=country,
+                    amenities=self.rng.sample(AMENITIES, self.rng.randint(2, 6)),
+                    created_at=created,
+                    updated_at=created,
+                )
+                listings.append(listing)
+                self.listing_ids.append(listing.id)
+                self.listing_prices.append(price)
+                self.listing_guests.append(listing.max_guests)
+                self.listing_free_from.append(self.rng.randint(0, int(self.mean_gap_days())))
+
+            with transaction.atomic():
+                Listing.objects.bulk_create(listings, batch_size=self.batch_size)
+            self.progress('listings', start + size, total)
+
+        return len(self.listing_ids)
+
+    def generate_bookings(self):
+        total = int(BOOKINGS_PER_UNIT * self.scale)
+        guest_ids = self.user_ids[self.host_count:] or self.user_ids
+        history_start = self.today - timedelta(days=HISTORY_DAYS)
+        mean_gap = self.mean_gap_days()
+        payments_total = 0
+
+        for start, size in self.chunks(total):
+            bookings = []
+            payments = []
+            for n in range(start, start + size):
+                listing_index = self.rng.randrange(len(self.listing_ids))
+                nights = self.rng.choices(STAY_LENGTHS, STAY_WEIGHTS)[0]
+
+                # Stays on a listing never overlap: each starts after the previous one ends
+                gap = int(self.rng.expovariate(1 / mean_gap))
+                check_in_offset = self.listing_free_from[listing_index] + gap
+                self.listing_free_from[listing_index] = check_in_offset + nights
+                check_in = history_start + timedelta(days=check_in_offset)
+                check_out = check_in + timedelta(days=nights)
+
+                lead_days = min(int(self.rng.expovariate(1 / 21)), 300)
+                created = self.as_datetime(check_in - timedelta(days=lead_days))
+                if created > self.now - PAYMENT_WINDOW:
+                    # Stays far ahead were booked recently, not in the future
+                    created = self.now - PAYMENT_WINDOW - timedelta(minutes=self.rng.randint(0, 24 * 60))
+                status = self.booking_status(check_in, check_out)
+                price = Decimal(f'{self.listing_prices[listing_index]:.2f}')
+
+                booking = Booking(
+                    id=self.uuid(),
+                    user_id=guest_ids[self.rng.randrange(len(guest_ids))],
+                    listing_id=self.listing_ids[listing_index],
+                    check_in=check_in,
+                    check_out=check_out,
+                    number_of_guests=self.rng.randint(1, self.listing_guests[listing_index]),
+                    total_price=price * nights,
+                    status=status,
+                    created_at=created,
+                    updated_at=created,
+                )
+                bookings.append(booking)
+
+                payment = self.payment_for(booking, n)
+                if payment is not None:
+                    payments.append(payment)
+
+            with transaction.atomic():
+                Booking.objects.bulk_create(bookings, batch_size=self.batch_size)
+                Payment.objects.bulk_create(payments, batch_size=self.batch_size)
+            payments_total += len(payments)
+            self.progress('bookings', start + size, total)
+
+        return total, payments_total
+
+    def mean_gap_days(self):
+        """Average idle days between stays so bookings span the whole window"""
+        average_nights = sum(n * w for n, w in zip(STAY_LENGTHS, STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+        bookings_per_listing = BOOKINGS_PER_UNIT / LISTINGS_PER_UNIT
+        return max(1.0, (HISTORY_DAYS + FUTURE_DAYS) / bookings_per_listing - average_nights)
+
+    def booking_status(self, check_in, check_out):
+        if check_out <= self.today:
+            return self.rng.choices(['completed', 'cancelled'], [90, 10])[0]
+        if check_in <= self.today:
+            return 'confirmed'
+        return self.rng.choices(['confirmed', 'pending', 'cancelled'], [75, 15, 10])[0]
+
+    def payment_for(self, booking, n):
+        if booking.status in ('confirmed', 'completed'):
+            status = 'success'
+        elif booking.status == 'pending':
+            if self.rng.random() < 0.5:
+                return None
+            status = 'pending'
+        else:
+            status = self.rng.choices(['failed', 'cancelled', 'expired'], [50, 30, 20])[0]
+
+        created = booking.created_at + timedelta(minutes=self.rng.randint(1, 90))
+        return Payment(
+            id=self.uuid(),
+            booking_id=booking.id,
+            user_id=booking.user_id,
+            tx_ref=f'{self.prefix.upper()}-{n:010d}',
+            amount=booking.total_price,
+            currency='ETB',
+            payment_method=self.rng.choices(['chapa', 'telebirr', 'bank'], [70, 25, 5])[0],
+            status=status,
+            chapa_transaction_id=f'CH{booking.id.hex[:12].upper()}' if status == 'success' else None,
+            customer_email=f'guest{booking.user_id}@{self.prefix}.example.com',
+            customer_first_name='Synthetic',
+            customer_last_name='Guest',
+            description=f'Payment for booking #{booking.id}',
+            metadata={'booking_id': str(booking.id), 'user_id': str(booking.user_id)},
+            created_at=created,
+            updated_at=created,
+            payment_date=created + timedelta(minutes=5) if status == 'success' else None,
+        )
+
+    def random_datetime(self, start_day, end_day):
+        day = self.today + timedelta(days=self.rng.randint(start_day, end_day))
+        return self.as_datetime(day)
+
+    def as_datetime(self, day):
+        moment = datetime.combine(day, dt_time(hour=self.rng.randint(6, 23), minute=self.rng.randint(0, 59)))
+        return self.aware(moment)
+
+    @staticmethod
+    def aware(moment):
+        return timezone.make_aware(moment) if settings.USE_TZ else moment
@@ -0,0 +1,215 @@
+from celery import current_app
+from celery.signals import before_task_publish, task_failure, task_postrun, task_prerun, task_retry
+from django.conf import settings
+from django.core.cache import cache
+from .metrics import DEFAULT_BUCKETS, REGISTRY, _format_labels, _format_value
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'celery:stats'
+# Histograms are shared through the cache, where sums must be integers
+MICROSECONDS = 1_000_000
+BUCKETS = DEFAULT_BUCKETS + (60.0, 300.0)
+
+TASK_WAIT = REGISTRY.histogram(
+    'celery_task_wait_seconds', 'Time from publish to start, this worker', ['task'], buckets=BUCKETS)
+TASK_RUNTIME = REGISTRY.histogram(
+    'celery_task_runtime_seconds', 'Task execution time, this worker', ['task'], buckets=BUCKETS)
+
+_started = {}
+
+
+def _key(*parts):
+    return ':'.join((KEY_PREFIX,) + tuple(str(part) for part in parts))
+
+
+def _incr(key, amount=1):
+    timeout = getattr(settings, 'CELERY_STATS_TTL', 7 * 24 * 3600)
+    try:
+        # add() creates the counter atomically; incr() fails if it expired meanwhile
+        if not cache.add(key, amount, timeout=timeout):
+            cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=timeout)
+    except Exception as e:
+        logger.warning(f"Could not record task metric {key}: {str(e)}")
+
+
+def _observe(task_name, metric, seconds):
+    index = next(i for i, bound in enumerate(BUCKETS + (math.inf,)) if seconds <= bound)
+    _incr(_key(task_name, metric, 'bucket', index))
+    _incr(_key(task_name, metric, 'sum_us'), int(seconds * MICROSECONDS))
+    _incr(_key(task_name, metric, 'count'))
+
+
+def record_event(task_name, event):
+    """Count a task outcome ('succeeded', 'failed', 'retried', ...) across all workers"""
+    _incr(_key(task_name, event))
+
+
+@before_task_publish.connect
+def _stamp_publish_time(sender=None, headers=None, **kwargs):
+    # Custom message headers are exposed to the worker as task.request attributes
+    if headers is not None:
+        headers['enqueued_at'] = time.time()
+
+
+@task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _started[task_id] = time.perf_counter()
+
+    enqueued_at = getattr(task.request, 'enqueued_at', None)
+    if enqueued_at and not task.request.is_eager:
+        wait = max(0.0, now - float(enqueued_at))
+        TASK_WAIT.observe(wait, task=task.name)
+        _observe(task.name, 'wait', wait)
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+
+    runtime = time.perf_counter() - started
+    TASK_RUNTIME.observe(runtime, task=task.name)
+    _observe(task.name, 'runtime', runtime)
+    if state == 'SUCCESS':
+        record_event(task.name, 'succeeded')
+
+
+@task_retry.connect
+def _task_retried(sender=None, request=None, **kwargs):
+    record_event(sender.name if sender else request.task, 'retried')
+
+
+@task_failure.connect
+def _task_failed(sender=None, **kwargs):
+    record_event(sender.name, 'failed')
+
+
+def monitored_queues():
+    queues = getattr(settings, 'CELERY_MONITORED_QUEUES', None)
+    if queues:
+        return list(queues)
+    return [current_app.conf.task_default_queue]
+
+
+def sample_queue_depths(app=None):
+    """Read the number of waiting messages in each monitored queue from the broker"""
+    app = app or current_app
+    depths = {}
+    with app.connection_for_read() as connection:
+        channel = connection.default_channel
+        for queue in monitored_queues():
+            try:
+                depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+            except Exception as e:
+                logger.warning(f"Could not read depth of queue {queue}: {str(e)}")
+                continue
+            cache.set(_key('queue', queue, 'depth'), depths[queue], timeout=None)
+            cache.set(_key('queue', queue, 'sampled_at'), time.time(), timeout=None)
+    return depths
+
+
+def task_names(app=None):
+    app = app or current_app
+    app.loader.import_default_modules()
+    return sorted(name for name in app.tasks if not name.startswith('celery.'))
+
+
+def histogram_summary(task_name, metric):
+    """count, mean and approximate p50/p95/p99 from the shared buckets"""
+    bounds = BUCKETS + (math.inf,)
+    keys = [_key(task_name, metric, 'bucket', i) for i in range(len(bounds))]
+    values = cache.get_many(keys + [_key(task_name, metric, 'sum_us'), _key(task_name, metric, 'count')])
+    counts = [values.get(key, 0) for key in keys]
+    total = values.get(_key(task_name, metric, 'count'), 0)
+
+    summary = {
+        'count': total,
+        'buckets': list(zip(bounds, counts)),
+        'mean': values.get(_key(task_name, metric, 'sum_us'), 0) / MICROSECONDS / total if total else 0.0,
+    }
+    for pct in (50, 95, 99):
+        target = math.ceil(total * pct / 100)
+        cumulative = 0
+        summary[f'p{pct}'] = 0.0
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            if total and cumulative >= target:
+                summary[f'p{pct}'] = bound
+                break
+    return summary
+
+
+def task_summary(task_name):
+    events = cache.get_many([_key(task_name, event) for event in ('succeeded', 'failed', 'retried')])
+    return {
+        'succeeded': events.get(_key(task_name, 'succeeded'), 0),
+        'failed': events.get(_key(task_name, 'failed'), 0),
+        'retried': events.get(_key(task_name, 'retried'), 0),
+        'wait': histogram_summary(task_name, 'wait'),
+        'runtime': histogram_summary(task_name, 'runtime'),
+    }
+
+
+def queue_summary():
+    summary = {}
+    for queue in monitored_queues():
+        values = cache.get_many([_key('queue', queue, 'depth'), _key('queue', queue, 'sampled_at')])
+        summary[queue] = {
+            'depth': values.get(_key('queue', queue, 'depth')),
+            'sampled_at': values.get(_key('queue', queue, 'sampled_at')),
+        }
+    return summary
+
+
+def reset_stats():
+    keys = []
+    for name in task_names():
+        keys.extend(_key(name, event) for event in ('succeeded', 'failed', 'retried'))
+        for metric in ('wait', 'runtime'):
+            keys.extend(_key(name, metric, 'bucket', i) for i in range(len(BUCKETS) + 1))
+            keys.extend([_key(name, metric, 'sum_us'), _key(name, metric, 'count')])
+    cache.delete_many(keys)
+
+
+def render_task_metrics():
+    """Prometheus lines for the fleet-wide task stats kept in the cache"""
+    lines = []
+    summaries = {name: task_summary(name) for name in task_names()}
+
+    for event in ('succeeded', 'failed', 'retried'):
+        name = f'celery_tasks_{event}_total'
+        lines.extend([f'# HELP {name} Tasks {event}, all workers', f'# TYPE {name} counter'])
+        for task_name, summary in summaries.items():
+            lines.append(f'{name}{_format_labels(["task"], [task_name])} {summary[event]}')
+
+    for metric, documentation in (('wait', 'Time from publish to start'), ('runtime', 'Task execution time')):
+        name = f'celery_fleet_task_{metric}_seconds'
+        lines.extend([f'# HELP {name} {documentation}, all workers', f'# TYPE {name} histogram'])
+        for task_name, summary in summaries.items():
+            histogram = summary[metric]
+            cumulative = 0
+            for bound, count in histogram['buckets']:
+                cumulative += count
+                labels = _format_labels(['task'], [task_name], ('le', _format_value(bound)))
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = _format_labels(['task'], [task_name])
+            lines.append(f'{name}_sum{labels} {_format_value(histogram["mean"] * histogram["count"])}')
+            lines.append(f'{name}_count{labels} {histogram["count"]}')
+
+    lines.extend(['# HELP celery_queue_depth Messages waiting in the queue at the last sample',
+                  '# TYPE celery_queue_depth gauge'])
+    for queue, sample in queue_summary().items():
+        if sample['depth'] is not None:
+            lines.append(f'celery_queue_depth{_format_labels(["queue"], [queue])} {sample["depth"]}')
+    return lines
+
+
+REGISTRY.add_collector(render_task_metrics)
@@ -0,0 +1,78 @@
+"""
+Celery result retention.
+
+Results go to the database (``django-db``), one TaskResult row per stored
+run. Tasks ignore their results by default (CELERY_TASK_IGNORE_RESULT) and
+only failures are kept; a task whose return value is worth looking at opts
+in with ``@shared_task(ignore_result=False, result_ttl=<seconds>)``.
+purge_expired_results deletes rows past their task's result_ttl, or
+TASK_RESULT_TTL for everything else, in small batches so no DELETE holds
+its locks for long.
+"""
+from datetime import timedelta
+from celery import current_app
+from django.conf import settings
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+from .metrics import REGISTRY
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+RESULTS_PURGED = REGISTRY.counter(
+    'celery_task_results_purged_total', 'Expired Celery result rows deleted by the purge task')
+
+
+def result_ttls():
+    """{task name: seconds} for registered tasks declaring a result_ttl"""
+    return {
+        name: task.result_ttl
+        for name, task in current_app.tasks.items()
+        if getattr(task, 'result_ttl', None) is not None
+    }
+
+
+def expired_results(now=None):
+    """Querysets of expired TaskResult rows, one per retention policy"""
+    now = now or timezone.now()
+    ttls = result_ttls()
+    default_ttl = getattr(settings, 'TASK_RESULT_TTL', 86400)
+    querysets = [
+        TaskResult.objects.filter(task_name=name, date_done__lt=now - timedelta(seconds=ttl))
+        for name, ttl in ttls.items()
+    ]
+    querysets.append(
+        TaskResult.objects.exclude(task_name__in=ttls).filter(date_done__lt=now - timedelta(seconds=default_ttl))
+    )
+    return querysets
+
+
+def purge_expired_results(batch_size=None, max_batches=None, now=None):
+    """
+    Delete expired results ``batch_size`` rows at a time, each batch its own
+    short transaction, stopping after ``max_batches`` (the next run resumes).
+    """
+    batch_size = batch_size or getattr(settings, 'TASK_RESULT_PURGE_BATCH_SIZE', 500)
+    max_batches = max_batches or getattr(settings, 'TASK_RESULT_PURGE_MAX_BATCHES', 200)
+    stats = {'deleted': 0, 'batches': 0, 'slowest_batch_ms': 0.0}
+
+    for queryset in expired_results(now):
+        while stats['batches'] < max_batches:
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            started = time.perf_counter()
+            deleted, _ = TaskResult.objects.filter(pk__in=ids).delete()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            stats['deleted'] += deleted
+            stats['batches'] += 1
+            stats['slowest_batch_ms'] = max(stats['slowest_batch_ms'], round(elapsed_ms, 3))
+            RESULTS_PURGED.inc(deleted)
+            if len(ids) < batch_size:
+                break
+
+    if stats['batches'] >= max_batches:
+        logger.info(f"Task result purge stopped after {max_batches} batches; the rest waits for the next run")
+    return stats
@@ -1,67 +1,46 @@
 from celery import shared_task
-from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from .models import Payment, Booking
+from django.db import transaction
+from django.utils import timezone
+from .models import Payment, Booking, WebhookEvent
 import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
+# Results are ignored unless a task opts in with ignore_result=False and a
+# result_ttl (see task_results.py); failures are stored either way
+
+@shared_task(ignore_result=True)
 def send_payment_confirmation_email(payment_id, user_email):
-    """Send payment confirmation email"""
+    """Queue a payment confirmation email for the batching pipeline"""
+    from .emails import enqueue_confirmation
+    
     try:
-        payment = Payment.objects.get(id=payment_id)
-        booking = payment.booking
-        
-        subject = f"Payment Confirmation - Booking #{booking.id}"
-        
-        # Render HTML email
-        html_message = render_to_string('listings/emails/payment_confirmation.html', {
-            'booking': booking,
-            'payment': payment,
-            'user_email': user_email,
-        })
-        
-        # Plain text version
-        message = f"""
-        Dear {payment.customer_first_name} {payment.customer_last_name},
-        
-        Your payment of {payment.amount} {payment.currency} has been confirmed.
-        
-        Booking Details:
-        - Booking ID: {booking.id}
-        - Check-in: {booking.check_in}
-        - Check-out: {booking.check_out}
-        - Total Paid: {payment.amount} {payment.currency}
-        - Payment Method: {payment.get_payment_method_display()}
-        
-        Thank you for choosing our service!
-        
-        Best regards,
-        Travel Booking Team
-        """
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        
-        logger.info(f"Payment confirmation email sent to {user_email}")
+        enqueue_confirmation(payment_id, user_email)
         return True
-        
-    except Payment.DoesNotExist:
-        logger.error(f"Payment with ID {payment_id} not found")
-        return False
     except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
+        logger.error(f"Failed to queue confirmation email for {payment_id}: {str(e)}")
         return False
 
-@shared_task
+@shared_task(ignore_result=True)
+def flush_confirmation_emails(max_batches=None):
+    """Send queued confirmation emails in batches over reused SMTP connections"""
+    from .emails import send_confirmation_batch
+    
+    max_batches = max_batches or getattr(settings, 'EMAIL_MAX_BATCHES_PER_FLUSH', 50)
+    total_sent = total_failed = 0
+    try:
+        for _ in range(max_batches):
+            sent, failed = send_confirmation_batch()
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                break
+    except Exception as e:
+        logger.error(f"Confirmation email flush failed: {str(e)}")
+    return {'sent': total_sent, 'failed': total_failed}
+
+@shared_task(ignore_result=True)
 def verify_payment_status(payment_id):
     """Background task to verify payment status"""
     from .views import verify_chapa_payment
@@ -76,4 +55,83 @@ def verify_payment_status(payment_id):
         return False
     except Exception as e:
         logger.error(f"Payment verification failed: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=10, ignore_result=True)
+def process_webhook_event(self, event_id):
+    """Apply a stored webhook to its payment exactly once"""
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.select_for_update().get(id=event_id)
+            if event.processed_at:
+                return False
+            
+            try:
+                payment = Payment.objects.select_related('booking').get(tx_ref=event.tx_ref)
+            except Payment.DoesNotExist:
+                logger.error(f"Payment with tx_ref {event.tx_ref} not found")
+                payment = None
+            
+            if payment is not None and payment.status == 'pending':
+                if event.status == 'success':
+                    payment.mark_as_paid(
+                        transaction_id=event.payload.get('id'),
+                        payment_date=timezone.now()
+                    )
+                elif event.status == 'failed':
+                    payment.mark_as_failed('Payment failed via webhook')
+            
+            event.processed_at = timezone.now()
+            event.save(update_fields=['processed_at'])
+        
+        if payment is not None:
+            # Schedule verification task for additional safety
+            verify_payment_status.delay(str(payment.id))
+        return payment is not None
+        
+    except WebhookEvent.DoesNotExist:
+        logger.error(f"Webhook event {event_id} not found")
+        return False
+    except Exception as e:
+        logger.error(f"Webhook event {event_id} processing failed: {str(e)}")
+        raise self.retry(exc=e)
+
+@shared_task(ignore_result=False, result_ttl=7 * 24 * 3600)
+def reconcile_pending_payments():
+    """Periodic sweep verifying payments whose webhook never arrived"""
+    from .reconciliation import reconcile_pending_payments as reconcile
+    
+    try:
+        return reconcile()
+    except Exception as e:
+        logger.error(f"Payment reconciliation failed: {str(e)}")
+        return False
+
+@shared_task(ignore_result=False, result_ttl=24 * 3600)
+def refresh_listing_aggregates():
+    """Fold bookings and payments written since the last run into the daily stats"""
+    from .analytics import refresh_aggregates
+    
+    return refresh_aggregates()
+
+@shared_task(ignore_result=True)
+def sample_queue_depths():
+    """Record broker queue depths for the task metrics"""
+    from .task_metrics import sample_queue_depths as sample
+    
+    try:
+        return sample()
+    except Exception as e:
+        logger.error(f"Queue depth sampling failed: {str(e)}")
+        return False
+
+@shared_task(ignore_result=True)
+def purge_task_results():
+    """Delete expired Celery results in small batches"""
+    from .task_results import purge_expired_results
+    
+    try:
+        return purge_expired_results()
+    except Exception as e:
+        logger.error(f"Task result purge failed: {str(e)}")
+        return False
@@ -0,0 +1,336 @@
+from base64 import urlsafe_b64encode
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from . import transitions, views
+from .gateway import AsyncChapaClient, ChapaClient
+from .models import Booking, ConfirmationEmail, Payment
+from .query_budget import QUERY_BUDGETS, budget_endpoints, build_sample_graph
+from .resilience import CLOSED, HALF_OPEN, OPEN, Bulkhead, CircuitBreaker, GatewayUnavailable
+import asyncio
+import httpx
+import requests
+
+# Page sizes a paginated endpoint is requested at; its query count must not change
+BUDGET_PAGE_SIZES = (1, 10, 50)
+
+
+class QueryBudgetTests(TestCase):
+    """Every endpoint in QUERY_BUDGETS runs exactly its budgeted queries, at any page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = build_sample_graph(60)
+
+    def setUp(self):
+        # A cached listing response would skip its query
+        caches[getattr(settings, 'LISTING_CACHE_ALIAS', 'default')].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+
+    def test_every_budget_is_routed(self):
+        self.assertEqual([name for name, _, _ in budget_endpoints()], list(QUERY_BUDGETS))
+
+    def test_endpoints_stay_within_budget(self):
+        for name, path, params in budget_endpoints():
+            # Detail views are not paginated, so one request is enough
+            sizes = BUDGET_PAGE_SIZES if params is not None else [None]
+            for size in sizes:
+                query = dict(params or {})
+                if size is not None:
+                    query['page_size'] = size
+                with self.subTest(endpoint=name, page_size=size):
+                    with self.assertNumQueries(QUERY_BUDGETS[name]):
+                        response = self.client.get(path, query)
+                    self.assertEqual(response.status_code, 200)
+
+
+class KeysetCursorTests(TestCase):
+    """Tampered cursors are a 404, never a server error"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = build_sample_graph(3, prefix='cursor')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+
+    def get_with_cursor(self, raw):
+        return self.client.get('/api/bookings/', {'cursor': urlsafe_b64encode(raw.encode()).decode()})
+
+    def test_pages_follow_next_links(self):
+        first = self.client.get('/api/bookings/', {'page_size': 2}).data
+        second = self.client.get(first['next']).data
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertIsNone(second['next'])
+
+    def test_malformed_pk_is_not_found(self):
+        response = self.get_with_cursor('2026-01-01T00:00:00+00:00|not-a-uuid|f')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_direction_is_not_found(self):
+        booking_id = self.client.get('/api/bookings/').data['results'][0]['id']
+        response = self.get_with_cursor(f'2026-01-01T00:00:00+00:00|{booking_id}|x')
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerProbeTests(SimpleTestCase):
+    """A half-open probe that never reaches an outcome must not wedge the breaker"""
+
+    def half_open_breaker(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=30, clock=clock)
+        breaker.record_failure()
+        clock.now += 31
+        return breaker
+
+    def client_kwargs(self, breaker):
+        return dict(secret_key='test', initialize_url='http://chapa.test/init',
+                    verify_url='http://chapa.test/verify/', breaker=breaker)
+
+    def test_cancelled_async_probe_is_handed_back(self):
+        breaker = self.half_open_breaker()
+        client = AsyncChapaClient(**self.client_kwargs(breaker))
+        sent = asyncio.Event()
+
+        async def hang(request):
+            sent.set()
+            await asyncio.sleep(60)
+
+        async def ok(request):
+            return httpx.Response(200, json={'status': 'success'})
+
+        async def scenario():
+            client.client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+            probe = asyncio.ensure_future(client.verify('tx-1'))
+            await sent.wait()
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+            self.assertEqual((breaker.state, breaker.probes), (HALF_OPEN, 0))
+
+            # The next call is admitted as a probe and closes the circuit
+            client.client = httpx.AsyncClient(transport=httpx.MockTransport(ok))
+            response = await client.verify('tx-1')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(breaker.state, CLOSED)
+
+        asyncio.run(scenario())
+
+    def test_unexpected_sync_error_hands_the_probe_back(self):
+        breaker = self.half_open_breaker()
+        client = ChapaClient(**self.client_kwargs(breaker))
+        with mock.patch.object(client.session, 'request', side_effect=RuntimeError('bug')):
+            with self.assertRaises(RuntimeError):
+                client.verify('tx-1')
+        self.assertEqual((breaker.state, breaker.probes), (HALF_OPEN, 0))
+
+    def test_gateway_error_reopens_the_circuit(self):
+        breaker = self.half_open_breaker()
+        client = ChapaClient(**self.client_kwargs(breaker))
+        with mock.patch.object(client.session, 'request', side_effect=requests.ConnectionError('down')):
+            with self.assertRaises(requests.ConnectionError):
+                client.verify('tx-1')
+        with self.assertRaises(GatewayUnavailable):
+            client.verify('tx-1')
+
+
+class CircuitBreakerStateTests(SimpleTestCase):
+    """Closed -> open -> half-open -> closed/open, and the bulkhead's cap"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=30, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(GatewayUnavailable) as raised:
+            self.breaker.acquire()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_half_open_admits_one_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 31
+        self.breaker.acquire()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(GatewayUnavailable):
+            self.breaker.acquire()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 31
+        self.breaker.acquire()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(GatewayUnavailable):
+            self.breaker.check()
+
+    def test_server_errors_count_as_failures(self):
+        client = ChapaClient(secret_key='test', initialize_url='http://chapa.test/init',
+                             verify_url='http://chapa.test/verify/', breaker=self.breaker)
+        failure = requests.Response()
+        failure.status_code = 502
+        with mock.patch.object(client.session, 'request', return_value=failure):
+            client.verify('tx-1')
+            client.verify('tx-1')
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_full_bulkhead_refuses_until_released(self):
+        bulkhead = Bulkhead('test', max_concurrent=2)
+        bulkhead.acquire()
+        bulkhead.acquire()
+        with self.assertRaises(GatewayUnavailable):
+            bulkhead.acquire()
+        bulkhead.release()
+        bulkhead.acquire()
+
+    def test_full_bulkhead_hands_the_probe_back(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 31
+        bulkhead = Bulkhead('test', max_concurrent=1)
+        bulkhead.acquire()
+        client = ChapaClient(secret_key='test', initialize_url='http://chapa.test/init',
+                             verify_url='http://chapa.test/verify/', breaker=self.breaker, bulkhead=bulkhead)
+        with self.assertRaises(GatewayUnavailable):
+            client.verify('tx-1')
+        self.assertEqual((self.breaker.state, self.breaker.probes), (HALF_OPEN, 0))
+
+
+def gateway_response(status_code, data):
+    return mock.Mock(status_code=status_code, json=mock.Mock(return_value=data))
+
+
+class PaymentTransitionTests(TestCase):
+    """Concurrent settlements of one payment: exactly one writer wins"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = build_sample_graph(1, prefix='transition')
+
+    def setUp(self):
+        self.payment = Payment.objects.select_related('booking').get(user=self.guest)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+
+    def test_payment_is_paid_once(self):
+        stale = Payment.objects.get(pk=self.payment.pk)
+        self.assertTrue(self.payment.mark_as_paid(transaction_id='chapa-1'))
+        self.assertFalse(stale.mark_as_paid(transaction_id='chapa-2'))
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.chapa_transaction_id, 'chapa-1')
+        self.assertEqual(self.payment.booking.status, 'confirmed')
+        self.assertEqual(ConfirmationEmail.objects.filter(payment=self.payment).count(), 1)
+
+    def test_failed_payment_is_not_paid(self):
+        stale = Payment.objects.get(pk=self.payment.pk)
+        self.assertTrue(self.payment.mark_as_failed('Declined'))
+        self.assertFalse(stale.mark_as_paid())
+
+        self.assertEqual(Payment.objects.get(pk=self.payment.pk).status, 'failed')
+        self.assertEqual(Booking.objects.get(pk=self.payment.booking_id).status, 'pending')
+        self.assertFalse(ConfirmationEmail.objects.exists())
+
+    def test_verify_reports_the_status_recorded_by_the_winner(self):
+        mark_paid = transitions.mark_paid
+
+        def webhook_wins(*args, **kwargs):
+            # The webhook fails the payment between the view's read and its UPDATE
+            Payment.objects.filter(pk=self.payment.pk).update(status='failed')
+            return mark_paid(*args, **kwargs)
+
+        client = mock.Mock()
+        client.verify.return_value = gateway_response(200, {'status': 'success', 'data': {'status': 'success', 'id': 'chapa-1'}})
+        with mock.patch.object(views, 'get_client', return_value=client), \
+                mock.patch.object(transitions, 'mark_paid', side_effect=webhook_wins):
+            response = self.client.get(f'/api/payments/verify/{self.payment.tx_ref}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertFalse(ConfirmationEmail.objects.exists())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class IdempotentInitiateTests(TestCase):
+    """Idempotency-Key replays, conflicts and mismatches on payment initiation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = build_sample_graph(2, prefix='idempotent')
+        cls.bookings = list(Booking.objects.filter(user=cls.guest).order_by('check_in'))
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.guest)
+        self.gateway = mock.Mock()
+        self.gateway.initialize.return_value = gateway_response(
+            200, {'status': 'success', 'data': {'checkout_url': 'https://checkout.test/1'}})
+        patcher = mock.patch.object(views, 'get_client', return_value=self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def initiate(self, booking, key):
+        return self.client.post('/api/payments/initiate/', {'booking_id': str(booking.id)},
+                                format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeat_is_replayed(self):
+        first = self.initiate(self.bookings[0], 'key-1')
+        second = self.initiate(self.bookings[0], 'key-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['payment_id'], first.data['payment_id'])
+        self.assertEqual(self.gateway.initialize.call_count, 1)
+
+    def test_key_reused_for_another_booking_is_rejected(self):
+        self.initiate(self.bookings[0], 'key-1')
+        response = self.initiate(self.bookings[1], 'key-1')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.gateway.initialize.call_count, 1)
+
+    def test_repeat_while_in_flight_conflicts(self):
+        repeats = []
+
+        def initialize(payload):
+            repeats.append(self.initiate(self.bookings[0], 'key-1'))
+            return gateway_response(200, {'status': 'success', 'data': {'checkout_url': 'https://checkout.test/1'}})
+
+        self.gateway.initialize.side_effect = initialize
+        response = self.initiate(self.bookings[0], 'key-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(repeats[0].status_code, 409)
+
+    def test_gateway_errors_are_not_replayed(self):
+        self.gateway.initialize.side_effect = requests.ConnectionError('down')
+        self.assertEqual(self.initiate(self.bookings[0], 'key-1').status_code, 503)
+
+        self.gateway.initialize.side_effect = None
+        response = self.initiate(self.bookings[0], 'key-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from .models import Booking, Payment
+from .emails import enqueue_confirmation, enqueue_confirmations
+
+
+def _confirm_bookings(booking_ids, now):
+    # Skipping already-confirmed rows avoids a write (and row lock) on hot bookings
+    return Booking.objects.filter(id__in=booking_ids).exclude(
+        status='confirmed'
+    ).update(status='confirmed', updated_at=now)
+
+
+def mark_paid(payment, transaction_id=None, payment_date=None):
+    """
+    Move a pending payment to success with one conditional UPDATE.
+
+    Returns True only for the caller that performed the transition; a
+    concurrent webhook and verify racing on the same payment cannot both
+    win, so the booking update and confirmation email happen once.
+    """
+    now = timezone.now()
+    changes = {'status': 'success', 'payment_date': payment_date or now, 'updated_at': now}
+    if transaction_id:
+        changes['chapa_transaction_id'] = transaction_id
+
+    with transaction.atomic():
+        updated = Payment.objects.filter(pk=payment.pk, status='pending').update(**changes)
+        if not updated:
+            return False
+
+        _confirm_bookings([payment.booking_id], now)
+        # Outbox row commits with the transition; the email pipeline sends it
+        enqueue_confirmation(payment.pk, payment.customer_email)
+
+    for field, value in changes.items():
+        setattr(payment, field, value)
+    if Payment.booking.is_cached(payment):
+        payment.booking.status = 'confirmed'
+    return True
+
+
+def mark_failed(payment, error_message=None):
+    """Move a pending payment to failed with one conditional UPDATE"""
+    changes = {'status': 'failed', 'updated_at': timezone.now()}
+    if error_message:
+        changes['error_message'] = error_message
+
+    updated = Payment.objects.filter(pk=payment.pk, status='pending').update(**changes)
+    if not updated:
+        return False
+
+    for field, value in changes.items():
+        setattr(payment, field, value)
+    return True
+
+
+def refresh_settled(payment):
+    """
+    Reload a payment whose transition lost to another writer, so callers
+    report the status that writer recorded instead of the stale one.
+    """
+    payment.refresh_from_db()
+    if Payment.booking.is_cached(payment):
+        payment.booking.refresh_from_db()
+
+
+def bulk_mark_paid(payments):
+    """
+    Confirm many pending payments at once.
+
+    ``payments`` is an iterable of (row, transaction_id) where row is a dict
+    with id, booking_id and customer_email. Returns the ids that changed.
+    """
+    now = timezone.now()
+    by_id = {row['id']: (row, transaction_id) for row, transaction_id in payments}
+
+    with transaction.atomic():
+        # Lock and re-check so a concurrent webhook cannot confirm the same payment
+        ids = list(
+            Payment.objects.select_for_update()
+            .filter(id__in=list(by_id), status='pending')
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return []
+
+        Payment.objects.filter(id__in=ids).update(
+            status='success',
+            chapa_transaction_id=Case(
+                *[When(id=pk, then=Value(by_id[pk][1])) for pk in ids if by_id[pk][1]],
+                default=F('chapa_transaction_id'),
+            ),
+            payment_date=now,
+            updated_at=now,
+        )
+        _confirm_bookings([by_id[pk][0]['booking_id'] for pk in ids], now)
+
+        enqueue_confirmations([(pk, by_id[pk][0]['customer_email']) for pk in ids])
+    return ids
+
+
+def bulk_mark_failed(payment_ids, error_message=None):
+    """Fail many pending payments in one UPDATE; returns the number changed"""
+    changes = {'status': 'failed', 'updated_at': timezone.now()}
+    if error_message:
+        changes['error_message'] = error_message
+    return Payment.objects.filter(id__in=list(payment_ids), status='pending').update(**changes)
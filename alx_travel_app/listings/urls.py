@@ -1,14 +1,23 @@
 # listings/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ListingViewSet, BookingViewSet
+from .views import AuthTokenView, ListingViewSet, BookingViewSet, PaymentViewSet
+from .metrics import metrics_view
+from . import async_views
 
 # Create a router and register our viewsets
 router = DefaultRouter()
 router.register(r'listings', ListingViewSet)
 router.register(r'bookings', BookingViewSet)
+router.register(r'payments', PaymentViewSet, basename='payment')
 
 # The API URLs are now determined automatically by the router
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('api/auth/token/', AuthTokenView.as_view(), name='auth-token'),
+    path('metrics/', metrics_view, name='metrics'),
+    # Async payment flows, for ASGI deployments (see listings/async_views.py)
+    path('api/async/payments/initiate/', async_views.initiate_payment, name='async-payment-initiate'),
+    path('api/async/payments/verify/<str:tx_ref>/', async_views.verify_payment, name='async-payment-verify'),
+    path('api/async/payments/webhook/', async_views.payment_webhook, name='async-payment-webhook'),
 ]
\ No newline at end of file
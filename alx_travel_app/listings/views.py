@@ -1,30 +1,208 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
 from django.conf import settings
 from django.shortcuts import get_object_or_404
-from .models import Booking, Payment, Listing
-from .serializers import BookingSerializer, PaymentSerializer, PaymentInitiateSerializer
+from django.db import IntegrityError, transaction
+from .models import ApiToken, Booking, Payment, Listing, WebhookEvent
+from .serializers import (
+    ListingSerializer, BookingSerializer, PaymentSerializer,
+    PaymentInitiateSerializer, AvailabilitySearchSerializer, QuoteSearchSerializer,
+    AnalyticsRangeSerializer, ExportFilterSerializer, TokenObtainSerializer,
+)
+from .availability import available_listings
+from .pricing import quote_listings
+from .analytics import listing_daily_series, listing_totals
+from .exports import (
+    BOOKING_EXPORT_FIELDS, EXPORT_RENDERERS, PAYMENT_EXPORT_FIELDS,
+    export_format, export_response, filter_export,
+)
+from .caching import cached_response, detail_key, list_key
+from .fastpaths import FastListMixin
+from .pagination import CreatedAtKeysetPagination
+from .gateway import get_client
+from .resilience import GatewayUnavailable
+from .idempotency import idempotent, reusable_payment
+from .transitions import refresh_settled
+from .authentication import CachedTokenAuthentication
+from .permissions import IsHostOrReadOnly
 import requests
-import json
 import logging
-from .tasks import verify_payment_status
+from .tasks import process_webhook_event
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+class ListingViewSet(FastListMixin, viewsets.ModelViewSet):
+    """Handle listing operations"""
+    queryset = Listing.objects.all()
+    serializer_class = ListingSerializer
+    permission_classes = [IsAuthenticated, IsHostOrReadOnly]
+    
+    def perform_create(self, serializer):
+        """Listings are always created under the requesting host"""
+        serializer.save(host=self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        """List listings from the read cache"""
+        return cached_response(
+            request, list_key(request), 'listing-list',
+            lambda: super(ListingViewSet, self).list(request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a listing from the read cache"""
+        return cached_response(
+            request, detail_key(kwargs.get('pk')), 'listing-detail',
+            lambda: super(ListingViewSet, self).retrieve(request, *args, **kwargs)
+        )
+    
+    @action(detail=False, methods=['get'], url_path='available')
+    def available(self, request):
+        """Listings free between check_in and check_out for the given guests/city"""
+        serializer = AvailabilitySearchSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        listings = available_listings(
+            check_in=serializer.validated_data['check_in'],
+            check_out=serializer.validated_data['check_out'],
+            guests=serializer.validated_data['guests'],
+            city=serializer.validated_data.get('city'),
+        )
+        return Response(ListingSerializer(listings, many=True).data, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], url_path='quotes')
+    def quotes(self, request):
+        """Price one stay at every available listing (or the ?listing= ids given)"""
+        serializer = QuoteSearchSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        listings = available_listings(
+            check_in=data['check_in'],
+            check_out=data['check_out'],
+            guests=data['guests'],
+            city=data.get('city'),
+        )
+        if data.get('listing'):
+            listings = listings.filter(pk__in=data['listing'])
+        limit = getattr(settings, 'QUOTE_MAX_LISTINGS', 500)
+        
+        return Response({
+            'check_in': data['check_in'],
+            'check_out': data['check_out'],
+            'results': quote_listings(
+                listings.order_by('price_per_night', 'id')[:limit], data['check_in'], data['check_out']
+            ),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='analytics', url_name='analytics')
+    def analytics(self, request, pk=None):
+        """Daily occupancy and revenue of one listing, for its host or staff"""
+        listing = self.get_object()
+        if listing.host_id != request.user.pk and not request.user.is_staff:
+            return Response({'error': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+        
+        serializer = AnalyticsRangeSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        start, end = serializer.validated_data['start'], serializer.validated_data['end']
+        totals = listing_totals([listing.pk], start, end)[0]
+        return Response({
+            **totals,
+            'start': start,
+            'end': end,
+            'days': listing_daily_series(listing.pk, start, end),
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], url_path='analytics', url_name='portfolio-analytics')
+    def portfolio_analytics(self, request):
+        """Occupancy and revenue totals per listing: the host's own, or all for staff"""
+        serializer = AnalyticsRangeSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        listings = Listing.objects.all()
+        if not request.user.is_staff:
+            listings = listings.filter(host=request.user)
+        listing_ids = list(listings.order_by('created_at', 'id').values_list('pk', flat=True))
+        
+        start, end = serializer.validated_data['start'], serializer.validated_data['end']
+        return Response({
+            'start': start,
+            'end': end,
+            'results': listing_totals(listing_ids, start, end),
+        }, status=status.HTTP_200_OK)
+
+class BookingViewSet(FastListMixin, viewsets.ModelViewSet):
+    """Handle booking operations"""
+    queryset = Booking.objects.all()
+    serializer_class = BookingSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
+    
+    def get_queryset(self):
+        """Return bookings for the authenticated user"""
+        if getattr(self, 'swagger_fake_view', False):
+            return Booking.objects.none()
+        return Booking.objects.filter(user=self.request.user).select_related('user', 'listing')
+    
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream bookings as NDJSON or CSV (?format=csv); staff export everyone's"""
+        serializer = ExportFilterSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Booking.objects.all() if request.user.is_staff else Booking.objects.filter(user=request.user)
+        queryset = filter_export(
+            queryset,
+            start=serializer.validated_data.get('start'),
+            end=serializer.validated_data.get('end'),
+            statuses=serializer.validated_data.get('status'),
+        )
+        return export_response(queryset, BOOKING_EXPORT_FIELDS, export_format(request), 'bookings')
+
 class PaymentViewSet(viewsets.ModelViewSet):
     """Handle payment operations"""
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination
     
     def get_queryset(self):
         """Return payments for the authenticated user"""
-        return Payment.objects.filter(user=self.request.user)
+        if getattr(self, 'swagger_fake_view', False):
+            return Payment.objects.none()
+        return Payment.objects.filter(user=self.request.user).select_related(
+            'user', 'booking__user', 'booking__listing'
+        )
+    
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=EXPORT_RENDERERS)
+    def export(self, request):
+        """Stream payments as NDJSON or CSV (?format=csv); staff export everyone's"""
+        serializer = ExportFilterSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        queryset = Payment.objects.all() if request.user.is_staff else Payment.objects.filter(user=request.user)
+        queryset = filter_export(
+            queryset,
+            start=serializer.validated_data.get('start'),
+            end=serializer.validated_data.get('end'),
+            statuses=serializer.validated_data.get('status'),
+        )
+        return export_response(queryset, PAYMENT_EXPORT_FIELDS, export_format(request), 'payments')
     
     @action(detail=False, methods=['post'], url_path='initiate')
+    @idempotent('payments-initiate')
     def initiate_payment(self, request):
         """Initiate payment with Chapa API"""
         serializer = PaymentInitiateSerializer(data=request.data)
@@ -37,6 +215,27 @@ class PaymentViewSet(viewsets.ModelViewSet):
             booking_id = serializer.validated_data['booking_id']
             booking = get_object_or_404(Booking, id=booking_id, user=request.user)
             
+            # Hand back a pending payment's live checkout instead of starting another
+            payment = reusable_payment(booking)
+            if payment is not None:
+                return Response({
+                    'success': True,
+                    'message': 'Payment already initiated',
+                    'payment_id': str(payment.id),
+                    'tx_ref': payment.tx_ref,
+                    'checkout_url': payment.checkout_url,
+                    'amount': payment.amount,
+                    'currency': payment.currency,
+                    'reused': True,
+                }, status=status.HTTP_200_OK)
+            
+            # Fail fast, without creating a payment, while the gateway is known to be down
+            client = get_client()
+            try:
+                client.ensure_available()
+            except GatewayUnavailable as e:
+                return gateway_unavailable_response(e)
+            
             # Create payment record
             payment = Payment.objects.create(
                 booking=booking,
@@ -55,11 +254,6 @@ class PaymentViewSet(viewsets.ModelViewSet):
             )
             
             # Prepare Chapa API request
-            headers = {
-                'Authorization': f'Bearer {settings.CHAPA_SECRET_KEY}',
-                'Content-Type': 'application/json',
-            }
-            
             payload = {
                 'amount': str(payment.amount),
                 'currency': payment.currency,
@@ -80,12 +274,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
             
             # Make API call to Chapa
             try:
-                response = requests.post(
-                    settings.CHAPA_API_URL,
-                    headers=headers,
-                    data=json.dumps(payload),
-                    timeout=30
-                )
+                response = client.initialize(payload)
                 
                 response_data = response.json()
                 
@@ -116,6 +305,13 @@ class PaymentViewSet(viewsets.ModelViewSet):
                         'details': response_data
                     }, status=status.HTTP_400_BAD_REQUEST)
                     
+            except GatewayUnavailable as e:
+                logger.warning(f"Chapa call refused for {payment.tx_ref}: {str(e)}")
+                payment.status = 'failed'
+                payment.error_message = str(e)
+                payment.save()
+                return gateway_unavailable_response(e)
+                
             except requests.exceptions.RequestException as e:
                 logger.error(f"Chapa API request failed: {str(e)}")
                 payment.status = 'failed'
@@ -141,18 +337,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
         """Verify payment status with Chapa API"""
         try:
             # Get payment
-            payment = get_object_or_404(Payment, tx_ref=tx_ref, user=request.user)
+            payment = get_object_or_404(self.get_queryset(), tx_ref=tx_ref)
             
             # Verify with Chapa API
-            headers = {
-                'Authorization': f'Bearer {settings.CHAPA_SECRET_KEY}',
-            }
-            
-            response = requests.get(
-                f"{settings.CHAPA_VERIFY_URL}{tx_ref}",
-                headers=headers,
-                timeout=30
-            )
+            response = get_client().verify(tx_ref)
             
             response_data = response.json()
             
@@ -161,11 +349,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 
                 # Update payment status
                 if transaction_data['status'] == 'success':
-                    payment.mark_as_paid(
+                    settled = payment.mark_as_paid(
                         transaction_id=transaction_data.get('id'),
                         payment_date=timezone.now()
                     )
-                    
+                elif transaction_data['status'] == 'failed':
+                    settled = payment.mark_as_failed('Payment failed at gateway')
+                else:
+                    settled = True
+                
+                if not settled:
+                    # A webhook or task settled it first; report what it recorded
+                    refresh_settled(payment)
+                
+                if payment.status == 'success':
                     return Response({
                         'success': True,
                         'message': 'Payment verified successfully',
@@ -174,16 +371,21 @@ class PaymentViewSet(viewsets.ModelViewSet):
                         'booking': BookingSerializer(payment.booking).data
                     }, status=status.HTTP_200_OK)
                     
-                elif transaction_data['status'] == 'failed':
-                    payment.mark_as_failed('Payment failed at gateway')
-                    
+                elif payment.status == 'failed':
                     return Response({
                         'success': False,
                         'message': 'Payment failed',
                         'status': 'failed',
                         'payment': PaymentSerializer(payment).data
                     }, status=status.HTTP_200_OK)
-                    
+
+                return Response({
+                    'success': False,
+                    'message': 'Payment is still pending',
+                    'status': transaction_data['status'],
+                    'payment': PaymentSerializer(payment).data
+                }, status=status.HTTP_200_OK)
+
             else:
                 error_msg = response_data.get('message', 'Verification failed')
                 return Response({
@@ -192,6 +394,8 @@ class PaymentViewSet(viewsets.ModelViewSet):
                     'details': response_data
                 }, status=status.HTTP_400_BAD_REQUEST)
                 
+        except GatewayUnavailable as e:
+            return gateway_unavailable_response(e)
         except Payment.DoesNotExist:
             return Response({
                 'success': False,
@@ -207,56 +411,86 @@ class PaymentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], url_path='webhook', permission_classes=[])
     def payment_webhook(self, request):
-        """Handle Chapa payment webhook"""
+        """Record a Chapa webhook and hand it to Celery; retries are acknowledged as duplicates"""
         try:
             # Verify webhook signature (implement based on Chapa documentation)
-            event_data = request.data
+            event_data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
             
             tx_ref = event_data.get('tx_ref')
-            status = event_data.get('status')
-            transaction_id = event_data.get('id')
-            
             if not tx_ref:
                 return Response({'error': 'Missing tx_ref'}, status=status.HTTP_400_BAD_REQUEST)
             
+            event = WebhookEvent(
+                tx_ref=tx_ref,
+                event_id=WebhookEvent.event_id_from(event_data),
+                status=str(event_data.get('status') or '')[:20],
+                payload=event_data,
+            )
             try:
-                payment = Payment.objects.get(tx_ref=tx_ref)
-                
-                if status == 'success':
-                    payment.mark_as_paid(
-                        transaction_id=transaction_id,
-                        payment_date=timezone.now()
-                    )
-                elif status == 'failed':
-                    payment.mark_as_failed('Payment failed via webhook')
-                
-                # Schedule verification task for additional safety
-                verify_payment_status.delay(str(payment.id))
-                
-                return Response({'success': True}, status=status.HTTP_200_OK)
-                
-            except Payment.DoesNotExist:
-                logger.error(f"Payment with tx_ref {tx_ref} not found")
-                return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
+                with transaction.atomic():
+                    event.save(force_insert=True)
+            except IntegrityError:
+                return Response({'success': True, 'duplicate': True}, status=status.HTTP_200_OK)
+            
+            # The state transition is applied by the consumer, off the request path
+            transaction.on_commit(lambda: process_webhook_event.delay(str(event.id)))
+            
+            return Response({'success': True}, status=status.HTTP_200_OK)
                 
         except Exception as e:
             logger.error(f"Webhook processing error: {str(e)}")
             return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class AuthTokenView(APIView):
+    """Exchange a username and password for an API token once, or revoke the token in use"""
+    
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [AllowAny()]
+        return [IsAuthenticated()]
+    
+    def post(self, request):
+        """Log in; the key is only ever shown in this response"""
+        serializer = TokenObtainSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        token, key = ApiToken.issue(
+            serializer.validated_data['user'],
+            name=serializer.validated_data.get('name', ''),
+            ttl=getattr(settings, 'AUTH_TOKEN_TTL', None),
+        )
+        return Response({
+            'token': key,
+            'token_type': CachedTokenAuthentication.keyword,
+            'expires_at': token.expires_at,
+        }, status=status.HTTP_201_CREATED)
+    
+    def delete(self, request):
+        """Log out: revoke the token this request was made with"""
+        if not isinstance(request.successful_authenticator, CachedTokenAuthentication):
+            return Response({'error': 'Not authenticated with a token'}, status=status.HTTP_400_BAD_REQUEST)
+        # Deleting fires post_delete, which also drops the cached credential
+        ApiToken.objects.filter(pk=request.auth, user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+def gateway_unavailable_response(exc):
+    """503 for a gateway call refused by the circuit breaker or bulkhead"""
+    response = Response({
+        'success': False,
+        'message': 'Payment gateway temporarily unavailable',
+        'error': str(exc),
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
 def verify_chapa_payment(tx_ref):
     """Utility function to verify payment (can be called from tasks)"""
     try:
         payment = Payment.objects.get(tx_ref=tx_ref)
         
-        headers = {
-            'Authorization': f'Bearer {settings.CHAPA_SECRET_KEY}',
-        }
-        
-        response = requests.get(
-            f"{settings.CHAPA_VERIFY_URL}{tx_ref}",
-            headers=headers,
-            timeout=30
-        )
+        response = get_client().verify(tx_ref)
         
         response_data = response.json()
         
@@ -264,10 +498,12 @@ def verify_chapa_payment(tx_ref):
             transaction_data = response_data['data']
             
             if transaction_data['status'] == 'success' and payment.status != 'success':
-                payment.mark_as_paid(
+                if not payment.mark_as_paid(
                     transaction_id=transaction_data.get('id'),
                     payment_date=timezone.now()
-                )
+                ):
+                    refresh_settled(payment)
+                    return payment.status == 'success'
                 return True
             elif transaction_data['status'] == 'failed' and payment.status == 'pending':
                 payment.mark_as_failed('Payment verification failed')
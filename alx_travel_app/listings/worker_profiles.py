@@ -0,0 +1,35 @@
+"""
+Named Celery worker profiles (WORKER_PROFILES in settings).
+
+A profile says which queues a worker consumes, with how many slots and how
+much prefetching. Running one worker per profile keeps payment tasks off the
+workers busy with email and batch jobs.
+"""
+from django.conf import settings
+
+
+def profile_names():
+    return sorted(getattr(settings, 'WORKER_PROFILES', {}))
+
+
+def get_profile(name, **overrides):
+    """The options for profile ``name``, with any non-None ``overrides`` applied"""
+    profiles = getattr(settings, 'WORKER_PROFILES', {})
+    if name not in profiles:
+        raise ValueError(f"Unknown worker profile {name!r}; choose from {', '.join(profile_names())}")
+    profile = dict(profiles[name])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    return profile
+
+
+def worker_argv(name, loglevel='INFO', **overrides):
+    """``celery worker`` arguments for profile ``name``"""
+    profile = get_profile(name, **overrides)
+    return [
+        'worker',
+        f'--hostname={name}@%h',
+        f"--queues={','.join(profile['queues'])}",
+        f"--concurrency={profile['concurrency']}",
+        f"--prefetch-multiplier={profile['prefetch_multiplier']}",
+        f'--loglevel={loglevel}',
+    ]
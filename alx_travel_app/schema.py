@@ -0,0 +1,179 @@
+# alx_travel_app/schema.py
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, yaml_sane_dump
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import _SpecRenderer, SwaggerYAMLRenderer
+from drf_yasg.views import get_schema_view
+from importlib import import_module
+from importlib.util import find_spec
+from rest_framework import permissions
+import drf_yasg
+import hashlib
+import json
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="ALX Travel App API",
+    default_version='v1',
+    description="API documentation for ALX Travel App Listings and Bookings",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@alxtravel.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+# The schema only changes when a module of these packages does. Whole
+# packages, since paginators, renderers and URL confs shape it as well
+SOURCE_PACKAGES = ('listings', 'alx_travel_app')
+
+_document = None
+_document_lock = threading.Lock()
+
+
+def schema_file():
+    return getattr(settings, 'SCHEMA_FILE', None) or os.path.join(os.path.dirname(__file__), 'openapi.json')
+
+
+def source_files():
+    """
+    {name: path} for every Python file of SOURCE_PACKAGES, plus the root URL
+    conf wherever it lives. Names are relative to their package, so the same
+    sources checked out elsewhere (CI, an image build) fingerprint the same.
+    """
+    names = {}
+    for package in SOURCE_PACKAGES:
+        for location in getattr(import_module(package), '__path__', []):
+            for directory, subdirectories, files in os.walk(location):
+                subdirectories[:] = sorted(d for d in subdirectories if d != '__pycache__')
+                for filename in sorted(files):
+                    if filename.endswith('.py'):
+                        path = os.path.realpath(os.path.join(directory, filename))
+                        relative = os.path.relpath(path, os.path.realpath(location)).replace(os.sep, '/')
+                        names.setdefault(path, f'{package}/{relative}')
+
+    urlconf = find_spec(settings.ROOT_URLCONF)
+    if urlconf and urlconf.origin and os.path.exists(urlconf.origin):
+        names.setdefault(os.path.realpath(urlconf.origin), settings.ROOT_URLCONF)
+    return {name: path for path, name in sorted(names.items(), key=lambda item: item[1])}
+
+
+def source_fingerprint():
+    """Hash of the source files the schema is built from"""
+    digest = hashlib.sha256(drf_yasg.__version__.encode())
+    for name, path in source_files().items():
+        digest.update(name.encode())
+        with open(path, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def generate_schema():
+    """Introspect every endpoint and return the schema as JSON bytes"""
+    generator = OpenAPISchemaGenerator(API_INFO, url=getattr(settings, 'SCHEMA_API_URL', None))
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+def write_schema(path=None):
+    """Generate the schema and save it with its source fingerprint; returns the fingerprint"""
+    path = path or schema_file()
+    fingerprint = source_fingerprint()
+    content = generate_schema()
+    with open(path, 'wb') as f:
+        f.write(content)
+    with open(f'{path}.fingerprint', 'w') as f:
+        f.write(fingerprint)
+    return fingerprint
+
+
+def read_schema(path=None):
+    """The saved schema, or None when it is missing or its sources have changed"""
+    path = path or schema_file()
+    try:
+        with open(f'{path}.fingerprint') as f:
+            fingerprint = f.read().strip()
+        if fingerprint != source_fingerprint():
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+class SchemaDocument:
+    """One schema kept in memory in every served encoding, each with its ETag"""
+
+    def __init__(self, content):
+        data = json.loads(content)
+        self.encodings = {
+            'json': content,
+            'yaml': yaml_sane_dump(data, binary=True),
+        }
+        self.etags = {
+            encoding: f'"{hashlib.sha256(body).hexdigest()}"'
+            for encoding, body in self.encodings.items()
+        }
+
+
+def get_document():
+    """Load the schema once per process, regenerating it if the saved one is stale"""
+    global _document
+
+    if _document is None:
+        with _document_lock:
+            if _document is None:
+                content = read_schema()
+                if content is None:
+                    logger.info("Saved API schema is missing or stale; regenerating")
+                    content = generate_schema()
+                    try:
+                        write_schema()
+                    except OSError as e:
+                        logger.warning(f"Could not save API schema: {str(e)}")
+                _document = SchemaDocument(content)
+    return _document
+
+
+def reset_document():
+    global _document
+    _document = None
+
+
+_SchemaView = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+
+class PrecomputedSchemaView(_SchemaView):
+    """
+    Schema view serving the precomputed document instead of introspecting
+    every viewset per request. The UI pages are cheap and still render as
+    before; they fetch the spec from this same view.
+    """
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+
+        document = get_document()
+        encoding = 'yaml' if isinstance(renderer, SwaggerYAMLRenderer) else 'json'
+        etag = document.etags[encoding]
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(document.encodings[encoding], content_type=renderer.media_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+schema_view = PrecomputedSchemaView
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from kombu import Queue
 
 load_dotenv()
 
@@ -10,6 +11,32 @@ CHAPA_API_URL = os.getenv('CHAPA_API_URL')
 CHAPA_VERIFY_URL = os.getenv('CHAPA_VERIFY_URL')
 CHAPA_WEBHOOK_URL = os.getenv('CHAPA_WEBHOOK_URL')
 
+# Chapa HTTP client (see listings/gateway.py)
+CHAPA_POOL_SIZE = int(os.getenv('CHAPA_POOL_SIZE', 10))
+CHAPA_CONNECT_TIMEOUT = float(os.getenv('CHAPA_CONNECT_TIMEOUT', 3.05))
+CHAPA_READ_TIMEOUT = float(os.getenv('CHAPA_READ_TIMEOUT', 30))
+CHAPA_MAX_RETRIES = int(os.getenv('CHAPA_MAX_RETRIES', 2))
+CHAPA_BACKOFF_FACTOR = float(os.getenv('CHAPA_BACKOFF_FACTOR', 0.3))
+
+# Pending payments' checkout links are reused for this long (seconds)
+CHAPA_CHECKOUT_TTL = int(os.getenv('CHAPA_CHECKOUT_TTL', 3600))
+
+# Idempotency-Key handling for payment initiation (see listings/idempotency.py)
+IDEMPOTENCY_CACHE_ALIAS = os.getenv('IDEMPOTENCY_CACHE_ALIAS', 'default')
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+# Circuit breaker and bulkhead around Chapa calls (see listings/resilience.py)
+CHAPA_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CHAPA_BREAKER_FAILURE_THRESHOLD', 5))
+CHAPA_BREAKER_RECOVERY_TIMEOUT = float(os.getenv('CHAPA_BREAKER_RECOVERY_TIMEOUT', 30))
+CHAPA_BREAKER_HALF_OPEN_CALLS = int(os.getenv('CHAPA_BREAKER_HALF_OPEN_CALLS', 1))
+CHAPA_BULKHEAD_SIZE = int(os.getenv('CHAPA_BULKHEAD_SIZE', 5))
+CHAPA_BULKHEAD_WAIT = float(os.getenv('CHAPA_BULKHEAD_WAIT', 0))
+
+# Async Chapa client used by the ASGI payment endpoints (listings/async_views.py)
+CHAPA_ASYNC_MAX_CONNECTIONS = int(os.getenv('CHAPA_ASYNC_MAX_CONNECTIONS', 200))
+CHAPA_ASYNC_BULKHEAD_SIZE = int(os.getenv('CHAPA_ASYNC_BULKHEAD_SIZE', 200))
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = 'django-db'
@@ -17,6 +44,144 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Most tasks are fire-and-forget; the few worth keeping opt in per task with
+# a result_ttl (see listings/task_results.py). Failures are always stored.
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_STORE_ERRORS_EVEN_IF_IGNORED = True
+# Stores task_name with each result, which the per-task purge relies on
+CELERY_RESULT_EXTENDED = True
+# Celery's own cleanup deletes every expired row in one statement; the
+# batched purge-task-results task below replaces it
+CELERY_RESULT_EXPIRES = None
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-pending-payments': {
+        'task': 'listings.tasks.reconcile_pending_payments',
+        'schedule': float(os.getenv('PAYMENT_RECONCILE_INTERVAL', 300)),
+    },
+    'refresh-listing-aggregates': {
+        'task': 'listings.tasks.refresh_listing_aggregates',
+        'schedule': float(os.getenv('AGGREGATE_REFRESH_INTERVAL', 300)),
+    },
+    'sample-queue-depths': {
+        'task': 'listings.tasks.sample_queue_depths',
+        'schedule': 30.0,
+    },
+    # Safety net for retries; normal sends are scheduled as payments confirm
+    'flush-confirmation-emails': {
+        'task': 'listings.tasks.flush_confirmation_emails',
+        'schedule': 60.0,
+    },
+    'purge-task-results': {
+        'task': 'listings.tasks.purge_task_results',
+        'schedule': float(os.getenv('TASK_RESULT_PURGE_INTERVAL', 600)),
+    },
+}
+
+# Celery queues (see listings/worker_profiles.py). Payment tasks get their own
+# queue and workers, so they never wait behind slow SMTP or batch jobs.
+# Priorities follow the Redis broker: 0 is served first, 9 last.
+CELERY_TASK_DEFAULT_QUEUE = 'celery'
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_QUEUES = [
+    Queue('payments', routing_key='payments'),
+    Queue('emails', routing_key='emails'),
+    Queue('batch', routing_key='batch'),
+    Queue('celery', routing_key='celery'),
+]
+CELERY_TASK_ROUTES = {
+    'listings.tasks.process_webhook_event': {'queue': 'payments', 'priority': 0},
+    'listings.tasks.verify_payment_status': {'queue': 'payments', 'priority': 1},
+    # The sweep yields to payments users are waiting on
+    'listings.tasks.reconcile_pending_payments': {'queue': 'payments', 'priority': 6},
+    'listings.tasks.send_payment_confirmation_email': {'queue': 'emails', 'priority': 3},
+    'listings.tasks.flush_confirmation_emails': {'queue': 'emails', 'priority': 5},
+    'listings.tasks.refresh_listing_aggregates': {'queue': 'batch', 'priority': 5},
+    'listings.tasks.purge_task_results': {'queue': 'batch', 'priority': 9},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    # A worker on several queues drains them in the order given to it
+    'queue_order_strategy': 'priority',
+}
+
+# Named worker profiles: python manage.py run_worker <profile>. Prefetching
+# is per worker, so each queue gets its own via the profile consuming it.
+WORKER_PROFILES = {
+    # No prefetch: a verification never sits reserved behind a slow one
+    'payments': {
+        'queues': ['payments'],
+        'concurrency': int(os.getenv('CELERY_PAYMENTS_CONCURRENCY', 8)),
+        'prefetch_multiplier': 1,
+    },
+    # SMTP-bound; a few slots with some prefetch keep connections busy
+    'emails': {
+        'queues': ['emails'],
+        'concurrency': int(os.getenv('CELERY_EMAILS_CONCURRENCY', 4)),
+        'prefetch_multiplier': 4,
+    },
+    'batch': {
+        'queues': ['batch', 'celery'],
+        'concurrency': int(os.getenv('CELERY_BATCH_CONCURRENCY', 2)),
+        'prefetch_multiplier': 1,
+    },
+    # Everything on one worker, e.g. in development; payments are drained first
+    'all': {
+        'queues': ['payments', 'celery', 'emails', 'batch'],
+        'concurrency': int(os.getenv('CELERY_ALL_CONCURRENCY', 4)),
+        'prefetch_multiplier': 1,
+    },
+}
+
+# Celery result retention (see listings/task_results.py): stored results of
+# tasks without their own result_ttl, failures included, live this long
+TASK_RESULT_TTL = int(os.getenv('TASK_RESULT_TTL', 24 * 3600))
+TASK_RESULT_PURGE_BATCH_SIZE = int(os.getenv('TASK_RESULT_PURGE_BATCH_SIZE', 500))
+TASK_RESULT_PURGE_MAX_BATCHES = int(os.getenv('TASK_RESULT_PURGE_MAX_BATCHES', 200))
+
+# Pending payment reconciliation (see listings/reconciliation.py)
+PAYMENT_RECONCILE_AFTER_MINUTES = int(os.getenv('PAYMENT_RECONCILE_AFTER_MINUTES', 15))
+PAYMENT_RECONCILE_BATCH_SIZE = int(os.getenv('PAYMENT_RECONCILE_BATCH_SIZE', 200))
+# Capped at CHAPA_BULKHEAD_SIZE; lookups beyond the bulkhead would be refused
+PAYMENT_RECONCILE_WORKERS = int(os.getenv('PAYMENT_RECONCILE_WORKERS', 8))
+PAYMENT_RECONCILE_RATE_LIMIT = float(os.getenv('PAYMENT_RECONCILE_RATE_LIMIT', 20))
+# Older pending payments are expired instead of re-verified: checkout TTL plus an hour of sweeps
+PAYMENT_RECONCILE_MAX_AGE_MINUTES = int(os.getenv('PAYMENT_RECONCILE_MAX_AGE_MINUTES', CHAPA_CHECKOUT_TTL // 60 + 60))
+
+# Daily occupancy/revenue aggregates (see listings/analytics.py)
+AGGREGATE_REFRESH_LAG = int(os.getenv('AGGREGATE_REFRESH_LAG', 300))
+AGGREGATE_BATCH_SIZE = int(os.getenv('AGGREGATE_BATCH_SIZE', 200))
+ANALYTICS_MAX_DAYS = 366
+
+# Celery task metrics (see listings/task_metrics.py); stats are shared
+# between web and worker processes through the cache
+CELERY_MONITORED_QUEUES = [q for q in os.getenv('CELERY_MONITORED_QUEUES', 'payments,emails,batch,celery').split(',') if q]
+CELERY_STATS_TTL = int(os.getenv('CELERY_STATS_TTL', 7 * 24 * 3600))
+
+# Cache; set CACHE_BACKEND=django.core.cache.backends.locmem.LocMemCache for tests
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/1'),
+    }
+}
+
+# Precomputed OpenAPI schema (see alx_travel_app/schema.py)
+SCHEMA_FILE = os.getenv('SCHEMA_FILE')
+SCHEMA_API_URL = os.getenv('SCHEMA_API_URL')
+
+# Pricing (see listings/pricing.py); weekday() numbers of weekend nights
+PRICING_WEEKEND_NIGHTS = (4, 5)
+PRICING_WEEKLY_NIGHTS = 7
+PRICING_MONTHLY_NIGHTS = 28
+QUOTE_MAX_LISTINGS = int(os.getenv('QUOTE_MAX_LISTINGS', 500))
+
+# Rows fetched per round trip by the streaming exports (see listings/exports.py)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Listing read cache (see listings/caching.py)
+LISTING_CACHE_ALIAS = os.getenv('LISTING_CACHE_ALIAS', 'default')
+LISTING_CACHE_TIMEOUT = int(os.getenv('LISTING_CACHE_TIMEOUT', 300))
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -27,6 +192,22 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('EMAIL_HOST_USER')
 
+# Confirmation email batching (see listings/emails.py)
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_FLUSH_DELAY = int(os.getenv('EMAIL_FLUSH_DELAY', 5))
+EMAIL_MAX_BATCHES_PER_FLUSH = int(os.getenv('EMAIL_MAX_BATCHES_PER_FLUSH', 50))
+# Seconds before a batch claimed by a crashed flush is picked up again
+EMAIL_CLAIM_TIMEOUT = int(os.getenv('EMAIL_CLAIM_TIMEOUT', 600))
+
+# Read replicas (see listings/db_router.py): aliases in DATABASES that
+# replicate ``default``. Safe requests read them unless their client wrote
+# within DATABASE_PIN_SECONDS; tasks and commands always read the primary.
+DATABASE_ROUTERS = ['listings.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in os.getenv('DATABASE_REPLICAS', '').split(',') if alias]
+DATABASE_PIN_SECONDS = int(os.getenv('DATABASE_PIN_SECONDS', 15))
+DATABASE_PIN_CACHE_ALIAS = os.getenv('DATABASE_PIN_CACHE_ALIAS', 'default')
+
 # Add to INSTALLED_APPS
 INSTALLED_APPS = [
     # ... existing apps ...
@@ -35,13 +216,38 @@ INSTALLED_APPS = [
     'listings',
 ]
 
+# Add to MIDDLEWARE
+MIDDLEWARE = [
+    # First, so Server-Timing "total" covers the whole stack
+    'listings.middleware.PerformanceMiddleware',
+    # Before anything that reads the database
+    'listings.middleware.ReadYourWritesMiddleware',
+    # ... existing middleware ...
+]
+
+# Prometheus scrape endpoint (/metrics/) is only served to these addresses
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+
+# API tokens (see listings/authentication.py). Basic auth hashes the password
+# on every request; API_BASIC_AUTH=1 keeps it on while clients move to tokens.
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', 30 * 24 * 3600)) or None
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS', 'default')
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+# Keyset page size for bookings and payments (see listings/pagination.py)
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+
 # Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'listings.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-    ],
+    ] + (['rest_framework.authentication.BasicAuthentication'] if os.getenv('API_BASIC_AUTH') == '1' else []),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'listings.fastpaths.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
\ No newline at end of file
@@ -1,22 +1,7 @@
 # alx_travel_app/urls.py
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="ALX Travel App API",
-        default_version='v1',
-        description="API documentation for ALX Travel App Listings and Bookings",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@alxtravel.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from alx_travel_app.schema import schema_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),